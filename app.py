@@ -1,14 +1,70 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, abort
+import hashlib
+import json
+import queue
+import uuid
+from time import perf_counter
+from datetime import date
+from flask import Flask, render_template, request, redirect, url_for, jsonify, abort, make_response, g, Response, stream_template, stream_with_context
 from pathlib import Path
 from config import DB_PATH
 from repos import products as products_repo
 from repos import sellers as sellers_repo
+from repos import customers as customers_repo
 from repos import base as db_base
-from repos.sales import get_sale
-from services.sales_service import alta_venta
+from repos import profiling
+import metrics
+from repos import reports as reports_repo
+from repos import statement as statement_repo
+from repos.sales import get_sale, get_stamp
+from repos.catalog import cache as catalog_cache
+from services.sales_service import alta_venta, abonar, importar_ventas, leer_ventas, PAYMENT_METHODS
+from services.print_service import imprimir_ticket
+from printing.spooler import spooler
+from services.ticket_cache import html_cache, escpos_cache
+from services.statement_service import estado_cuenta_csv, concepto
+from services import export_service
+from services import billing_service
+from services.pricing_service import cotizar
+from services import draft_service
 
 def create_app():
     app = Flask(__name__, template_folder="templates", static_folder="static")
+    app.config["READY"] = False  # lo pone services.warmup.warmup()
+    app.jinja_env.globals["payment_methods"] = PAYMENT_METHODS
+
+    # --------- Tiempos por request (ruta + SQL) ----------
+    @app.before_request
+    def _start_timer():
+        g.t0 = perf_counter()
+        profiling.begin_request()
+
+    @app.after_request
+    def _record_timing(resp):
+        elapsed = perf_counter() - g.pop("t0", perf_counter())
+        n_sql, sql_s = profiling.end_request()
+        route = request.url_rule.rule if request.url_rule else "(sin ruta)"
+        metrics.http_latency.observe(elapsed, request.method, route, resp.status_code)
+        metrics.http_sql_statements.observe(n_sql, route)
+        metrics.http_sql_seconds.observe(sql_s, route)
+        resp.headers["Server-Timing"] = (f'app;dur={elapsed * 1000:.2f}, '
+                                         f'sql;dur={sql_s * 1000:.2f};desc="{n_sql} queries"')
+        return resp
+
+    # --------- Terminal (cookie): a cada caja su carrito en borrador ----------
+    def _terminal() -> str:
+        if "terminal" not in g:
+            g.terminal = request.cookies.get("pos_terminal") or uuid.uuid4().hex
+        return g.terminal
+
+    @app.after_request
+    def _terminal_cookie(resp):
+        if "terminal" in g and request.cookies.get("pos_terminal") != g.terminal:
+            resp.set_cookie("pos_terminal", g.terminal, max_age=365 * 24 * 3600, httponly=True, samesite="Lax")
+        return resp
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
     @app.get("/")
     def home():
@@ -17,57 +73,109 @@ def create_app():
     # --------- Nueva Venta (formulario) ----------
     @app.get("/sales/new")
     def new_sale():
-        # combos base (puedes paginarlos luego)
-        with db_base.get_conn() as conn:
-            customers = db_base.many(conn.execute(
-                "SELECT id, enrollment, first_name || ' ' || IFNULL(second_name,'') AS name FROM customers WHERE active=1 ORDER BY second_name, first_name LIMIT 200"
-            ))
+        # alumnos: se buscan con /api/customers/search (no se precargan)
         sellers = sellers_repo.list_active()
-        return render_template("new_sale.html", customers=customers, sellers=sellers)
+        return render_template("new_sale.html", sellers=sellers, salon=customers_repo.salon_catalogs(),
+                               draft=draft_service.carrito(_terminal()))
+
+    # Buscar alumnos (HTMX typeahead, paginado por id)
+    @app.get("/api/customers/search")
+    def api_customers_search():
+        q = request.args.get("q", "").strip()
+        rows, next_after = customers_repo.search(
+            q,
+            grade_id=request.args.get("grade_id", type=int),
+            group_id=request.args.get("group_id", type=int),
+            shift_id=request.args.get("shift_id", type=int),
+            after_id=request.args.get("after", 0, type=int),
+        )
+        return render_template("partials/_customer_list.html", customers=rows,
+                               next_after=next_after, first_page=not request.args.get("after"))
 
     # Buscar productos (HTMX autocomplete)
     @app.get("/api/products/search")
     def api_products_search():
         q = request.args.get("q", "").strip()
-        print(q)
+        app.logger.debug("busqueda productos q=%r", q)
         if not q:
             return render_template("partials/_product_list.html", products=[])
-        with db_base.get_conn() as conn:
-            rows = db_base.many(conn.execute(
-                "SELECT sku, description, price, tax_rate FROM products WHERE active=1 AND (sku LIKE ? OR description LIKE ?) ORDER BY description LIMIT 20",
-                (f"%{q}%", f"%{q}%")
-            ))
+        rows = products_repo.search(q)
         return render_template("partials/_product_list.html", products=rows)
 
-    # Crear venta
-    @app.post("/sales")
-    def create_sale():
-        data = request.form        
-        # Construir items desde el form (campos arrays)
+    # Catálogo completo para la búsqueda local del navegador (IndexedDB, ver
+    # static/js/catalog.js) y su delta por versión. El JSON se arma una vez por versión.
+    snapshot_body: dict = {}
+
+    @app.get("/api/catalog/snapshot")
+    def api_catalog_snapshot():
+        etag = f"catalog-{products_repo.version()}"
+        if etag in request.if_none_match:
+            resp = make_response("", 304)
+        else:
+            if snapshot_body.get("etag") != etag:
+                snap = products_repo.snapshot()
+                snapshot_body.update(etag=f"catalog-{snap['version']}", body=json.dumps(
+                    snap, ensure_ascii=False, separators=(",", ":")))
+            resp = Response(snapshot_body["body"], mimetype="application/json")
+            etag = snapshot_body["etag"]
+        resp.set_etag(etag)
+        resp.cache_control.no_cache = True
+        return resp
+
+    @app.get("/api/catalog/changes")
+    def api_catalog_changes():
+        since = request.args.get("since", type=int)
+        if since is None or since < 0:
+            abort(400, "Falta since (versión del catálogo)")
+        return jsonify(products_repo.changes(since))
+
+    # Renglones del form de venta (campos arrays); `row` = posición en la tabla
+    def _items_from_form(data) -> list[dict]:
         items = []
-        skus = request.form.getlist("sku[]")
-        descs = request.form.getlist("desc[]")
-        qtys = request.form.getlist("qty[]")
-        prices = request.form.getlist("price[]")
-        taxes = request.form.getlist("tax[]")
+        skus = data.getlist("sku[]")
+        descs = data.getlist("desc[]")
+        qtys = data.getlist("qty[]")
+        prices = data.getlist("price[]")
+        taxes = data.getlist("tax[]")
         for i in range(len(descs)):
             if not descs[i] and not skus[i]:
                 continue
             items.append({
+                "row": i,
                 "sku": skus[i] or None,
                 "descripcion": descs[i] or (skus[i] or ""),
                 "qty": float(qtys[i] or 0),
                 "unit_price": float(prices[i] or 0),
                 "tax_rate": float(taxes[i] or 0),
             })
+        return items
+
+    # Cotización del carrito mientras se captura (htmx): totales con los
+    # descuentos de las reglas; el detalle por renglón va en el evento cart-priced
+    @app.post("/api/cart/price")
+    def api_cart_price():
+        try:
+            items = _items_from_form(request.form)
+        except ValueError:
+            abort(400, "Cantidad o precio inválido")
+        quote = cotizar(items, request.form.get("customer_id", type=int))
+        resp = make_response(render_template("partials/_cart_totals.html", quote=quote))
+        resp.headers["HX-Trigger"] = json.dumps({"cart-priced": {
+            "total": round(quote["total"], 2),
+            "lines": [{"row": it["row"], "discount": round(ln["discount"], 2), "total": round(ln["total"], 2),
+                       "percent": ln["percent"], "rules": ln["rules"]} for it, ln in zip(items, quote["lines"])],
+        }})  # ASCII: va en un header
+        return resp
 
+    # Crear venta
+    @app.post("/sales")
+    def create_sale():
+        data = request.form
+        items = _items_from_form(data)
         if not items:
             abort(400, "No hay renglones")
 
-        # Pago único (luego habilitamos split payments)
-        payment_amount = float(data.get("payment_amount") or 0)
-        payment_method = data.get("payment_method") or "cash"
-        payments = [{"method": payment_method, "amount": payment_amount}]
+        payments = _tenders_from_form(data)
 
         # Alumno / Vendedor
         customer_id = int(data["customer_id"]) if data.get("customer_id") else None
@@ -75,25 +183,329 @@ def create_app():
         customer_name = data.get("customer_name") or "Alumno"
         seller_name = data.get("seller_name") or "Mostrador"
 
-        result = alta_venta(
-            customer_name=customer_name,
-            seller_name=seller_name,
-            items_ui=items,
-            customer_id=customer_id,
-            seller_id=seller_id,
-            payments=payments
-        )
+        try:
+            result = alta_venta(
+                customer_name=customer_name,
+                seller_name=seller_name,
+                items_ui=items,
+                customer_id=customer_id,
+                seller_id=seller_id,
+                payments=payments,
+                series=data.get("series") or None,
+            )
+        except ValueError as e:
+            abort(400, str(e))
         # Redirige al ticket
         return redirect(url_for("ticket", sale_id=result["id"]))
 
-    # Ticket
+    # --------- Carrito en borrador (services/draft_service.py) ----------
+    # Cada cambio regresa sólo lo que cambió: el renglón (nuevo, actualizado o
+    # borrado, hx-swap-oob) y los totales; el total va además en cart-priced.
+    def _draft_delta(view: dict, added=(), updated=(), removed: int | None = None, all_rows: bool = False):
+        resp = make_response(render_template("partials/_draft_delta.html", quote=view["quote"], view=view,
+                                             added=added, updated=updated, removed=removed, all_rows=all_rows))
+        resp.headers["HX-Trigger"] = json.dumps({"cart-priced": {"total": round(view["quote"]["total"], 2)}})
+        return resp
+
+    def _draft_row(view: dict, line_id: int) -> list[dict]:
+        return [r for r in view["rows"] if r["id"] == line_id]
+
+    @app.post("/drafts/lines")
+    def draft_add_line():
+        sku = request.form.get("sku", "").strip()
+        if not sku:
+            abort(400, "Falta sku")
+        try:
+            view, line_id, created = draft_service.agregar(_terminal(), sku, request.form.get("qty", 1))
+        except ValueError as e:
+            abort(400, str(e))
+        row = _draft_row(view, line_id)
+        return _draft_delta(view, added=row) if created else _draft_delta(view, updated=row)
+
+    @app.post("/drafts/lines/<int:line_id>")
+    def draft_update_line(line_id: int):
+        try:
+            view = draft_service.cambiar_cantidad(_terminal(), line_id, request.form.get("qty", ""))
+        except ValueError:
+            abort(400, "Cantidad inválida")
+        except KeyError:
+            abort(404)
+        return _draft_delta(view, updated=_draft_row(view, line_id))
+
+    @app.delete("/drafts/lines/<int:line_id>")
+    def draft_remove_line(line_id: int):
+        try:
+            view = draft_service.quitar(_terminal(), line_id)
+        except KeyError:
+            abort(404)
+        return _draft_delta(view, removed=line_id)
+
+    # Alumno / vendedor: sólo los campos que vengan; vacío = sin asignar
+    @app.post("/drafts/header")
+    def draft_header():
+        data, fields = request.form, {}
+        try:
+            for key in ("customer_id", "seller_id"):
+                if key in data:
+                    fields[key] = int(data[key]) if data[key] else None
+        except ValueError:
+            abort(400, "Id inválido")
+        for key in ("customer_name", "seller_name"):
+            if key in data:
+                fields[key] = data[key] or None
+        try:
+            view, customer_changed = draft_service.asignar(_terminal(), **fields)
+        except ValueError as e:
+            abort(400, str(e))
+        return _draft_delta(view, all_rows=customer_changed)  # becas y hermanos dependen del alumno
+
+    @app.post("/drafts/checkout")
+    def draft_checkout():
+        try:
+            result = draft_service.cobrar(_terminal(), _tenders_from_form(request.form),
+                                          series=request.form.get("series") or None)
+        except ValueError as e:
+            abort(400, str(e))
+        return redirect(url_for("ticket", sale_id=result["id"]))
+
+    @app.post("/drafts/discard")
+    def draft_discard():
+        draft_service.descartar(_terminal())
+        return redirect(url_for("new_sale"))
+
+    # Formas de pago del form (pay_method[] / pay_amount[] / pay_ref[]); acepta
+    # también el pago único anterior (payment_method / payment_amount)
+    def _tenders_from_form(data) -> list[dict]:
+        methods = data.getlist("pay_method[]")
+        amounts = data.getlist("pay_amount[]")
+        refs = data.getlist("pay_ref[]")
+        if not methods and data.get("payment_method"):
+            methods, amounts, refs = [data["payment_method"]], [data.get("payment_amount")], []
+        tenders = []
+        for i, method in enumerate(methods):
+            try:
+                amount = float(amounts[i] or 0) if i < len(amounts) else 0.0
+            except ValueError:
+                abort(400, "Importe de pago inválido")
+            if amount > 0:  # renglones de pago vacíos se ignoran
+                tenders.append({"method": method, "amount": amount,
+                                "reference": (refs[i] if i < len(refs) else "") or None})
+        return tenders
+
+    # Pago posterior (abono) a una venta: form desde el ticket o JSON
+    # {"payments": [{method, amount, reference?}, ...]}
+    @app.post("/sales/<int:sale_id>/payments")
+    def add_sale_payments(sale_id: int):
+        if request.is_json:
+            tenders = (request.get_json(silent=True) or {}).get("payments") or []
+        else:
+            tenders = _tenders_from_form(request.form)
+        try:
+            if not tenders:
+                raise ValueError("Sin pagos")
+            res = abonar(sale_id, tenders)
+        except (ValueError, TypeError, AttributeError) as e:
+            if request.is_json:
+                return jsonify({"ok": False, "msg": str(e)}), 400
+            abort(400, str(e))
+        if res is None:
+            abort(404)
+        if request.is_json:
+            return jsonify({"ok": True, **res})
+        return redirect(url_for("ticket", sale_id=sale_id))
+
+    # Alta masiva (tickets capturados sin red): JSON o NDJSON
+    @app.post("/api/sales/batch")
+    def api_sales_batch():
+        body = request.get_data(as_text=True)
+        try:
+            results = list(importar_ventas(leer_ventas(body.splitlines())))
+        except ValueError as e:
+            return jsonify({"ok": False, "msg": f"JSON inválido: {e}"}), 400
+        return jsonify({
+            "ok": True,
+            "created": sum(1 for r in results if r.get("duplicate") is False),
+            "duplicates": sum(1 for r in results if r.get("duplicate") is True),
+            "errors": sum(1 for r in results if "error" in r),
+            "results": results,
+        })
+
+    # Ticket: la venta sólo cambia vía UPDATE de sales (rev), así que el HTML se
+    # cachea por (id, rev) y el navegador revalida con ETag fuerte -> 304.
+    ticket_tag = hashlib.sha1(b"".join(
+        (Path(app.root_path) / app.template_folder / name).read_bytes()
+        for name in ("base.html", "ticket.html"))).hexdigest()[:8]
+
     @app.get("/sales/<int:sale_id>/ticket")
     def ticket(sale_id: int):
-        sale, items, pays = get_sale(sale_id)
-        print(sale)
-        if not sale:
+        stamp = get_stamp(sale_id)
+        if stamp is None:
+            abort(404)
+        can_print = bool(spooler.workers)
+        etag = f"t{sale_id}-{stamp}-{ticket_tag}{'-p' if can_print else ''}"
+        if etag in request.if_none_match:
+            resp = make_response("", 304)
+        else:
+            def render():
+                sale, items, pays = get_sale(sale_id)
+                if not sale:
+                    return None
+                return render_template("ticket.html", sale=sale, items=items, pays=pays, can_print=can_print)
+            html = html_cache.get_or_render((sale_id, stamp, can_print), render)
+            if html is None:
+                abort(404)
+            resp = make_response(html)
+        resp.set_etag(etag)
+        resp.cache_control.private = True
+        resp.cache_control.no_cache = True  # siempre revalidar: un pago nuevo cambia el ticket
+        return resp
+
+    # Impresión en segundo plano: encola y regresa el id del trabajo
+    @app.post("/sales/<int:sale_id>/print")
+    def print_ticket(sale_id: int):
+        printer = request.values.get("printer") or None
+        try:
+            job_id = imprimir_ticket(sale_id, printer)
+        except KeyError:
+            return jsonify({"ok": False, "msg": f"Impresora no configurada: {printer or '(ninguna)'}"}), 400
+        except queue.Full:
+            return jsonify({"ok": False, "msg": "Cola de impresión llena"}), 503
+        if job_id is None:
+            abort(404)
+        return jsonify({"ok": True, "job_id": job_id}), 202
+
+    # Reporte diario (resúmenes incrementales; ?format=json para la API)
+    @app.get("/reports/daily")
+    def reports_daily():
+        today = date.today().isoformat()
+        date_from = request.args.get("from") or today
+        date_to = request.args.get("to") or date_from
+        r = reports_repo.daily(date_from, date_to)
+        if request.args.get("format") == "json":
+            return jsonify(r)
+        return render_template("reports_daily.html", r=r)
+
+    # Cobro mensual en lote (colegiaturas): GET con sku = vista previa, POST = cobrar
+    def _billing_args(src) -> dict:
+        return {"period": src.get("period") or billing_service.periodo_actual(), "sku": src.get("sku") or "",
+                "grade_id": src.get("grade_id", type=int), "group_id": src.get("group_id", type=int),
+                "shift_id": src.get("shift_id", type=int), "seller_id": src.get("seller_id", type=int)}
+
+    def _billing_page(args: dict, dry_run: bool):
+        result, error = None, None
+        if args["sku"]:
+            try:
+                result = billing_service.facturar(**args, dry_run=dry_run)
+            except ValueError as e:
+                error = str(e)
+        return render_template("billing.html", args=args, result=result, error=error, dry_run=dry_run,
+                               products=products_repo.list_active(), sellers=sellers_repo.list_active(),
+                               salon=customers_repo.salon_catalogs()), 400 if error else 200
+
+    @app.get("/billing")
+    def billing():
+        return _billing_page(_billing_args(request.args), dry_run=True)
+
+    @app.post("/billing")
+    def billing_run():
+        return _billing_page(_billing_args(request.form), dry_run=False)
+
+    # Estado de cuenta del alumno (keyset por fecha; el cursor lleva el saldo)
+    def _statement_page(customer_id: int) -> dict:
+        try:
+            return statement_repo.page(customer_id, request.args.get("cursor") or None,
+                                       min(request.args.get("limit", statement_repo.PAGE, type=int), 500))
+        except ValueError as e:
+            abort(400, str(e))
+
+    @app.get("/customers/<int:customer_id>/statement")
+    def customer_statement(customer_id: int):
+        customer = customers_repo.get(customer_id)
+        if not customer:
+            abort(404)
+        st = _statement_page(customer_id)
+        if request.args.get("cursor"):  # siguiente página (HTMX)
+            return render_template("partials/_statement_rows.html", st=st, customer=customer, concepto=concepto)
+        return render_template("statement.html", st=st, customer=customer, concepto=concepto)
+
+    @app.get("/api/customers/<int:customer_id>/statement")
+    def api_customer_statement(customer_id: int):
+        if not customers_repo.get(customer_id):
+            abort(404)
+        return jsonify(_statement_page(customer_id))
+
+    @app.get("/customers/<int:customer_id>/statement.csv")
+    def customer_statement_csv(customer_id: int):
+        customer = customers_repo.get(customer_id)
+        if not customer:
+            abort(404)
+        resp = Response(stream_with_context(estado_cuenta_csv(customer_id)), mimetype="text/csv")
+        resp.headers["Content-Disposition"] = f'attachment; filename="estado_cuenta_{customer["enrollment"]}.csv"'
+        return resp
+
+    # Versión imprimible (guardar como PDF desde el navegador), en streaming
+    @app.get("/customers/<int:customer_id>/statement/print")
+    def customer_statement_print(customer_id: int):
+        customer = customers_repo.get(customer_id)
+        if not customer:
+            abort(404)
+        return Response(stream_template("statement_print.html", customer=customer, concepto=concepto,
+                                        summary=statement_repo.summary(customer_id),
+                                        rows=statement_repo.iter_rows(customer_id)))
+
+    # Extractos para contabilidad (default: mes en curso), en streaming
+    def _export_range() -> tuple[str, str]:
+        today = date.today()
+        try:
+            date_from = date.fromisoformat(request.args.get("from") or today.replace(day=1).isoformat())
+            date_to = date.fromisoformat(request.args.get("to") or today.isoformat())
+        except ValueError:
+            abort(400, "Fechas en formato YYYY-MM-DD")
+        return date_from.isoformat(), date_to.isoformat()
+
+    @app.get("/exports/sales.csv")
+    def export_sales_csv():
+        date_from, date_to = _export_range()
+        kind = request.args.get("kind", "sales")
+        try:
+            body = export_service.ventas_csv(kind, date_from, date_to)
+        except ValueError as e:
+            abort(400, str(e))
+        resp = Response(stream_with_context(body), mimetype="text/csv")
+        resp.headers["Content-Disposition"] = f'attachment; filename="ventas_{kind}_{date_from}_{date_to}.csv"'
+        return resp
+
+    @app.get("/exports/sales.xlsx")
+    def export_sales_xlsx():
+        date_from, date_to = _export_range()
+        resp = Response(stream_with_context(export_service.ventas_xlsx_stream(date_from, date_to)),
+                        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        resp.headers["Content-Disposition"] = f'attachment; filename="ventas_{date_from}_{date_to}.xlsx"'
+        return resp
+
+    # Readiness: 503 hasta terminar el calentamiento
+    @app.get("/healthz/ready")
+    def ready():
+        body = {"ready": app.config["READY"], "warmup_ms": app.config.get("WARMUP"), "pool": db_base.pool_stats()}
+        return jsonify(body), 200 if app.config["READY"] else 503
+
+    @app.get("/api/stats/cache")
+    def cache_stats():
+        return jsonify({"catalog": catalog_cache.stats(),
+                        "ticket_html": html_cache.stats(),
+                        "ticket_escpos": escpos_cache.stats(),
+                        "drafts": draft_service.store.stats()})
+
+    @app.get("/api/print/status")
+    def print_status():
+        return jsonify(spooler.status())
+
+    @app.get("/api/print/jobs/<job_id>")
+    def print_job(job_id: str):
+        job = spooler.job(job_id)
+        if job is None:
             abort(404)
-        return render_template("ticket.html", sale=sale, items=items, pays=pays)
+        return jsonify(job)
 
     return app
 
@@ -0,0 +1 @@
+# bench/ — micro-benchmarks sobre una BD desechable (nunca toca data/app.db)
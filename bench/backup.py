@@ -0,0 +1,90 @@
+# bench/backup.py
+"""
+Latencia de alta_venta mientras corre un respaldo en caliente.
+
+Compara: sin respaldo, respaldo en un solo paso (pages=-1) y por pasos
+(pages/sleep de config). Un hilo da altas continuas; se mide cada venta.
+
+    python -m bench.backup --sales 50000
+"""
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from config import BACKUP_PAGES, BACKUP_SLEEP_MS
+from repos import base as db_base
+from services.backup_service import respaldar
+from .common import temp_db, percentiles
+
+
+def alta_during(do_sale, pages: int | None, sleep_ms: float = BACKUP_SLEEP_MS,
+                idle_seconds: float = 1.0) -> dict:
+    """Altas continuas en otro hilo mientras respalda (pages=None: sin respaldo,
+    sólo `idle_seconds` de altas como referencia)."""
+    lat: list[float] = []
+    stop = threading.Event()
+
+    def cashier():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            do_sale()
+            lat.append((time.perf_counter() - t0) * 1000)
+
+    th = threading.Thread(target=cashier)
+    th.start()
+    time.sleep(0.05)
+    out = {}
+    tmp = Path(tempfile.mkdtemp(prefix="posbench_bk_"))
+    try:
+        if pages is None:
+            time.sleep(idle_seconds)
+        else:
+            res = respaldar(dst=tmp / "b.db.gz", pages=pages, sleep_ms=sleep_ms)
+            out = {"backup_s": res["seconds"], "steps": res["steps"], "restarts": res["restarts"],
+                   "one_step": res["one_step"]}
+    finally:
+        stop.set()
+        th.join()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {**percentiles(lat), **out}
+
+
+def run(sales: int, customers: int = 500, products: int = 2000) -> dict:
+    from .suite import fill_products, fill_customers, fill_sales, random_sale
+    from services.sales_service import alta_venta
+    temp_db()
+    fill_products(products)
+    fill_customers(customers)
+    with db_base.get_conn() as conn:
+        skus = [r[0] for r in conn.execute("SELECT sku FROM products")]
+    fill_sales(sales, skus, customers)
+    rnd = random.Random(7)
+
+    def do_sale():
+        header, items, pays = random_sale(rnd, skus, customers)
+        alta_venta(customer_name=header["customer"], seller_name=header["seller"],
+                   items_ui=[{"sku": it["sku"], "descripcion": it["description_snapshot"], "qty": it["qty"],
+                              "unit_price": it["unit_price"], "tax_rate": it["tax_rate"]} for it in items],
+                   customer_id=header["customer_id"], payments=pays)
+
+    return {
+        "db_mb": round(Path(db_base.pool.db_path).stat().st_size / 1e6, 1),
+        "no_backup": alta_during(do_sale, None),
+        "one_step": alta_during(do_sale, -1),
+        "paged": alta_during(do_sale, BACKUP_PAGES, BACKUP_SLEEP_MS),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sales", type=int, default=50_000)
+    args = ap.parse_args()
+    print(json.dumps(run(args.sales), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
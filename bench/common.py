@@ -0,0 +1,52 @@
+# bench/common.py
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from repos import base as db_base
+from db.init import init_db, schema_path
+from db.migrate import apply_migrations
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "db" / "migrations"
+SEED_FILE = Path(__file__).resolve().parent.parent / "db" / "seed.sql"
+
+
+def temp_db(prefix: str = "posbench_") -> Path:
+    """Crea una BD vacía con schema + migraciones + seed y apunta el pool a ella."""
+    path = Path(tempfile.mkdtemp(prefix=prefix)) / "bench.db"
+    db_base.reset_pool(str(path))
+    init_db(schema_path())
+    apply_migrations(MIGRATIONS_DIR)
+    with db_base.get_conn() as conn:
+        conn.executescript(SEED_FILE.read_text(encoding="utf-8"))
+    return path
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Percentiles (y máximo) de latencias ya medidas, en milisegundos."""
+    samples = sorted(samples)
+    if not samples:
+        return {"n": 0}
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))]
+    return {"n": len(samples), "p50_ms": round(pick(0.50), 3), "p95_ms": round(pick(0.95), 3),
+            "p99_ms": round(pick(0.99), 3), "max_ms": round(samples[-1], 3)}
+
+
+def timeit(fn, repeat: int = 200) -> dict:
+    """Ejecuta fn() `repeat` veces; regresa percentiles en milisegundos y ops/s."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))]
+    total = sum(samples)
+    return {
+        "n": repeat,
+        "p50_ms": round(pick(0.50), 4),
+        "p95_ms": round(pick(0.95), 4),
+        "p99_ms": round(pick(0.99), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "ops_per_s": round(repeat / total * 1000, 1) if total else 0.0,
+    }
@@ -0,0 +1,76 @@
+# bench/drafts.py
+"""
+Carrito en borrador (/drafts/*) contra el form completo (/api/cart/price):
+por cada cambio de cantidad, bytes del request, bytes de la respuesta y
+tiempo dentro del app (Server-Timing), con un carrito de `--lines` renglones.
+
+Con --persist 0 mide sólo el LRU en memoria; con 1 (default) incluye el
+UPSERT en draft_sales de cada cambio.
+
+    python -m bench.drafts --lines 20 --iterations 1000
+"""
+import argparse
+import json
+import random
+from urllib.parse import urlencode
+from .common import temp_db, percentiles
+
+
+def _app_ms(resp) -> float:
+    return float(resp.headers["Server-Timing"].split("app;dur=")[1].split(",")[0])
+
+
+def run(lines: int = 20, iterations: int = 1000, persist: bool = True) -> dict:
+    from .suite import fill_products
+    from app import create_app
+    from services import draft_service
+    temp_db(prefix="posdrafts_")
+    fill_products(max(lines, 100))
+    from repos.catalog import cache as catalog
+    products = catalog.list_active()[:lines]
+    draft_service.store = draft_service.DraftStore(persist=persist)
+    client = create_app().test_client()
+    rnd = random.Random(7)
+
+    for p in products:
+        client.post("/drafts/lines", data={"sku": p["sku"]})
+    draft = {"req": [], "resp": [], "app": []}
+    for _ in range(iterations):
+        body = {"qty": rnd.randint(1, 5)}
+        resp = client.post(f"/drafts/lines/{rnd.randint(1, lines)}", data=body)
+        assert resp.status_code == 200
+        draft["req"].append(len(urlencode(body)))
+        draft["resp"].append(len(resp.data))
+        draft["app"].append(_app_ms(resp))
+
+    full = {"req": [], "resp": [], "app": []}
+    qtys = [1] * lines
+    for _ in range(iterations):
+        qtys[rnd.randrange(lines)] = rnd.randint(1, 5)
+        form = {"sku[]": [p["sku"] for p in products], "desc[]": [p["description"] for p in products],
+                "qty[]": qtys, "price[]": [p["price"] for p in products], "tax[]": [p["tax_rate"] for p in products]}
+        resp = client.post("/api/cart/price", data=form)
+        assert resp.status_code == 200
+        full["req"].append(len(urlencode(form, doseq=True)))
+        full["resp"].append(len(resp.data) + len(resp.headers["HX-Trigger"]))
+        full["app"].append(_app_ms(resp))
+
+    def summary(d: dict) -> dict:
+        return {"request_bytes": round(sum(d["req"]) / len(d["req"])),
+                "response_bytes": round(sum(d["resp"]) / len(d["resp"])), "app": percentiles(d["app"])}
+
+    return {"lines": lines, "persist": persist, "draft": summary(draft), "full_form": summary(full),
+            "store": draft_service.store.stats()}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lines", type=int, default=20)
+    ap.add_argument("--iterations", type=int, default=1000)
+    ap.add_argument("--persist", type=int, choices=(0, 1), default=1)
+    args = ap.parse_args()
+    print(json.dumps(run(args.lines, args.iterations, bool(args.persist)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
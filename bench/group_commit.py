@@ -0,0 +1,75 @@
+# bench/group_commit.py
+"""
+Altas de venta concurrentes (N "cajeros") con y sin group commit.
+Reporta ventas/s, latencia por venta y, con group commit, tamaños de lote
+y fsyncs por venta.
+
+    python -m bench.group_commit --cashiers 8 --sales 50
+"""
+import argparse
+import json
+import threading
+import time
+from repos import sales as sales_repo
+from services.group_commit import GroupCommitWriter
+from .common import temp_db
+from .sale_totals import make_sale
+
+
+def run_mode(cashiers: int, per_cashier: int, lines: int, writer: GroupCommitWriter | None) -> dict:
+    temp_db()
+    header, items, payments = make_sale(lines)
+    lat: list[float] = []
+    lock = threading.Lock()
+
+    def cashier():
+        mine = []
+        for _ in range(per_cashier):
+            t0 = time.perf_counter()
+            its = [dict(it) for it in items]
+            if writer is None:
+                sales_repo.create_sale(header, its, payments)
+            else:
+                writer.submit(header, its, payments).result()
+            mine.append((time.perf_counter() - t0) * 1000)
+        with lock:
+            lat.extend(mine)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=cashier) for _ in range(cashiers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    lat.sort()
+    out = {
+        "mode": "direct" if writer is None else "group_commit",
+        "sales": len(lat),
+        "sales_per_s": round(len(lat) / elapsed, 1),
+        "p50_ms": round(lat[len(lat) // 2], 3),
+        "p95_ms": round(lat[int(len(lat) * 0.95) - 1], 3),
+    }
+    if writer is not None:
+        writer.stop()
+        out.update(writer.stats())
+    else:
+        out["fsyncs_per_sale"] = 1.0
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--cashiers", type=int, default=8)
+    ap.add_argument("--sales", type=int, default=50, help="ventas por cajero")
+    ap.add_argument("--lines", type=int, default=3)
+    ap.add_argument("--max-batch", type=int, default=32)
+    ap.add_argument("--max-wait-ms", type=float, default=2)
+    args = ap.parse_args()
+    print(json.dumps(run_mode(args.cashiers, args.sales, args.lines, None)))
+    gc = GroupCommitWriter(args.max_batch, args.max_wait_ms)
+    print(json.dumps(run_mode(args.cashiers, args.sales, args.lines, gc)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# bench/lanes.py
+"""
+Varias cajas vendiendo y consultando a la vez mientras otro proceso retiene
+el lock de escritura (p.ej. un import o un cobro masivo).
+
+Lectores (ticket, búsqueda de productos y alumnos) van por el carril de sólo
+lectura; cajeros por tx() con busy_timeout + reintentos. Reporta latencia de
+lecturas y altas, errores y los contadores de SQLITE_BUSY del pool.
+
+    python -m bench.lanes --cashiers 4 --readers 8 --hold-ms 200
+"""
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+from repos import base as db_base
+from .common import temp_db, percentiles
+
+
+def run(cashiers: int = 4, readers: int = 8, seconds: float = 3.0, hold_ms: float = 200,
+        customers: int = 500, products: int = 2000, sales: int = 5000) -> dict:
+    from .suite import fill_products, fill_customers, fill_sales, random_sale
+    from repos import customers as customers_repo
+    from repos import products as products_repo
+    from repos import sales as sales_repo
+    from services.sales_service import alta_venta
+    db_path = temp_db(prefix="poslanes_")
+    fill_products(products)
+    fill_customers(customers)
+    with db_base.get_conn() as conn:
+        skus = [r[0] for r in conn.execute("SELECT sku FROM products")]
+    fill_sales(sales, skus, customers)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    lat = {"read": [], "sale": []}
+    errors = {"read": 0, "sale": 0}
+
+    def hog():
+        # otro proceso: toma el lock de escritura y lo suelta cada hold_ms
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        while not stop.is_set():
+            conn.execute("BEGIN IMMEDIATE")
+            time.sleep(hold_ms / 1000)
+            conn.execute("COMMIT")
+            time.sleep(0.005)
+        conn.close()
+
+    def loop(kind: str, fn):
+        mine, errs = [], 0
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                fn()
+            except sqlite3.OperationalError:
+                errs += 1
+            mine.append((time.perf_counter() - t0) * 1000)
+        with lock:
+            lat[kind].extend(mine)
+            errors[kind] += errs
+
+    def cashier(seed: int):
+        rnd = random.Random(seed)
+
+        def sale():
+            header, items, pays = random_sale(rnd, skus, customers)
+            alta_venta(customer_name=header["customer"], seller_name=header["seller"],
+                       items_ui=[{"sku": it["sku"], "descripcion": it["description_snapshot"], "qty": it["qty"],
+                                  "unit_price": it["unit_price"], "tax_rate": it["tax_rate"]} for it in items],
+                       customer_id=header["customer_id"], payments=pays)
+        loop("sale", sale)
+
+    def reader(seed: int):
+        rnd = random.Random(seed)
+
+        def read():
+            sales_repo.get_stamp(rnd.randint(1, sales))
+            sales_repo.get_sale(rnd.randint(1, sales))
+            products_repo.search(rnd.choice(["cuaderno", "lap", "P-00"]))
+            customers_repo.search(rnd.choice(["ana", "lop", "mar"]))
+        loop("read", read)
+
+    threads = ([threading.Thread(target=hog)] if hold_ms > 0 else []) + \
+        [threading.Thread(target=cashier, args=(i,)) for i in range(cashiers)] + \
+        [threading.Thread(target=reader, args=(100 + i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    st = db_base.pool_stats()
+    return {
+        "cashiers": cashiers, "readers": readers, "hold_ms": hold_ms, "seconds": seconds,
+        "reads": {**percentiles(lat["read"]), "errors": errors["read"]},
+        "sales": {**percentiles(lat["sale"]), "errors": errors["sale"]},
+        "busy": {"retries": st["retries"], "failures": st["failures"], "lock_wait_s": round(st["wait_s"], 3)},
+        "connections": {"write": st["open"], "read": st["read"]["open"]},
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cashiers", type=int, default=4)
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--hold-ms", type=float, default=200)
+    args = ap.parse_args()
+    print(json.dumps(run(args.cashiers, args.readers, args.seconds, args.hold_ms), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
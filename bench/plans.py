@@ -0,0 +1,354 @@
+# bench/plans.py
+"""
+Catálogo de planes de consulta: corre cada ruta del app (repos / services)
+sobre una BD desechable con datos sintéticos, junta todos los textos de SQL
+distintos que emite (repos.profiling) y revisa su EXPLAIN QUERY PLAN.
+
+Falla (exit 1) si alguna sentencia recorre una tabla completa ("SCAN tabla"
+sin índice), salvo en los escenarios marcados como lectura completa a
+propósito. Los recorridos de índice completo ("SCAN t USING INDEX") y los
+"USE TEMP B-TREE" se reportan pero no fallan.
+
+    python cli.py check-plans [--out catalogo.json] [-v]
+    python -m bench.plans
+"""
+import random
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable
+from repos import base as db_base
+from repos import discounts
+from repos import profiling
+from .common import temp_db
+
+_EXPLAINABLE = ("select", "insert", "update", "delete", "with", "replace")
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+_INDEX_SCAN = re.compile(r"^SCAN (\w+) USING (?:COVERING )?INDEX (\w+)")
+
+# Sentencias que leen la tabla completa a propósito aunque salgan de una ruta caliente
+ALLOWED_SQL = {
+    "SELECT * FROM products": "carga del caché de catálogo, una vez por versión",
+    " ".join(discounts.RULES_SQL.split()): "compilación de reglas de descuento, una vez por versión",
+    " ".join(discounts.YOUNGER_SIBLINGS_SQL.split()): "hermanos para la regla sibling, una vez por versión",
+}
+
+
+class _Ctx:
+    """Datos del seed a la mano de los escenarios."""
+
+    def __init__(self, skus: list[str], customers: int, app):
+        self.rnd = random.Random(5)
+        self.skus = skus
+        self.customers = customers
+        self.app = app
+        with db_base.get_conn() as conn:
+            self.last_sale = conn.execute("SELECT max(id) FROM sales").fetchone()[0]
+            self.day = conn.execute("SELECT substr(max(created_at), 1, 10) FROM sales").fetchone()[0]
+
+    def sale_id(self) -> int:
+        return self.rnd.randint(1, self.last_sale)
+
+    def customer_id(self) -> int:
+        return self.rnd.randint(1, self.customers)
+
+
+def _without_catalog_cache(fn: Callable[[], object]) -> None:
+    """Fuerza el camino SQL de las búsquedas (sin caché de catálogo)."""
+    from repos.catalog import cache
+    max_items = cache.max_items
+    cache.max_items = 0
+    cache.invalidate()
+    try:
+        fn()
+    finally:
+        cache.max_items = max_items
+        cache.invalidate()
+
+
+# ---- escenarios: (nombre, función, motivo si la lectura completa es a propósito) ----
+def _alta_venta(c: _Ctx) -> None:
+    from services.sales_service import alta_venta
+    alta_venta(customer_name="Alumno", seller_name="Caja", customer_id=c.customer_id(), seller_id=1,
+               items_ui=[{"sku": c.rnd.choice(c.skus), "descripcion": "Artículo", "qty": 1, "unit_price": 10.0,
+                          "tax_rate": 0.16}],
+               payments=[{"method": "cash", "amount": 11.6}])
+
+def _abonar(c: _Ctx) -> None:
+    from services.sales_service import alta_venta, abonar
+    sale = alta_venta(customer_name="Alumno", seller_name="Caja", customer_id=c.customer_id(), seller_id=1,
+                      items_ui=[{"sku": c.rnd.choice(c.skus), "descripcion": "Artículo", "qty": 1, "unit_price": 100.0}],
+                      payments=[{"method": "card", "amount": 40.0}])
+    abonar(sale["id"], [{"method": "cash", "amount": 100.0}])
+
+def _folio_series(c: _Ctx) -> None:
+    from services.sales_service import alta_venta, importar_ventas
+    alta_venta(customer_name="Alumno", seller_name="Caja 2", customer_id=c.customer_id(), series="C2",
+               items_ui=[{"sku": c.rnd.choice(c.skus), "descripcion": "Artículo", "qty": 1, "unit_price": 10.0}],
+               payments=[{"method": "cash", "amount": 10.0}])
+    list(importar_ventas([{"customer_name": "Alumno", "seller_name": "Caja 2", "series": "C2",
+                           "idempotency_key": f"plan-c2-{i}",
+                           "items": [{"sku": c.skus[0], "descripcion": "Artículo", "qty": 1, "unit_price": 5.0}]}
+                          for i in range(2)]))
+
+def _cart_price(c: _Ctx) -> None:
+    from repos import discounts
+    from services.sales_service import alta_venta
+    customer_id = c.customer_id()
+    discounts.add_rule("scholarship", 50, customer_id=customer_id, sku=c.skus[0])
+    discounts.add_rule("sibling", 10)
+    discounts.add_rule("early_payment", 5, sku=c.skus[0], until_day=31)
+    form = {"customer_id": customer_id, "sku[]": c.skus[:3], "desc[]": ["a", "b", "c"],
+            "qty[]": [1, 2, 1], "price[]": [100, 20, 5], "tax[]": [0, 0.16, 0.16]}
+    c.app.test_client().post("/api/cart/price", data=form)
+    alta_venta(customer_name="Alumno", seller_name="Caja", customer_id=customer_id,
+               items_ui=[{"sku": c.skus[0], "descripcion": "Colegiatura", "qty": 1, "unit_price": 100.0}],
+               payments=[{"method": "cash", "amount": 100.0}])
+    discounts.list_rules(include_inactive=True)
+    discounts.set_active(1, False)
+
+def _drafts(c: _Ctx) -> None:
+    from services.draft_service import DraftStore
+    from services import draft_service
+    draft_service.store = DraftStore(persist=True)
+    client = c.app.test_client()
+    client.post("/drafts/lines", data={"sku": c.skus[0]})
+    client.post("/drafts/lines/1", data={"qty": 2})
+    client.post("/drafts/header", data={"customer_id": c.customer_id(), "customer_name": "Alumno"})
+    draft_service.store = DraftStore(persist=True)  # recarga de draft_sales
+    client.post("/drafts/checkout", data={"pay_method[]": ["cash"], "pay_amount[]": [10000]})
+
+def _importar_ventas(c: _Ctx) -> None:
+    from services.sales_service import importar_ventas
+    list(importar_ventas([{"customer_name": "Alumno", "seller_name": "Caja", "customer_id": c.customer_id(),
+                           "idempotency_key": f"plan-{i}",
+                           "items": [{"sku": c.skus[0], "descripcion": "Artículo", "qty": 1, "unit_price": 5.0,
+                                      "tax_rate": 0.16}],
+                           "payments": [{"method": "card", "amount": 5.8}]} for i in range(3)]))
+
+def _billing(c: _Ctx) -> None:
+    from services.billing_service import facturar
+    facturar("2026-01", c.skus[0], grade_id=1, dry_run=True)
+    facturar("2026-01", c.skus[0], grade_id=1, group_id=1, shift_id=1, seller_id=1, series="COL")
+
+def _billing_all(c: _Ctx) -> None:
+    from services.billing_service import facturar
+    facturar("2026-01", c.skus[0], dry_run=True)
+    facturar("2026-01", c.skus[0], chunk=200)
+
+def _ticket(c: _Ctx) -> None:
+    from flask import render_template
+    from repos.sales import get_sale, get_stamp
+    from services.print_service import ticket_bytes
+    sale_id = c.sale_id()
+    get_stamp(sale_id)
+    sale, items, pays = get_sale(sale_id)
+    with c.app.test_request_context():
+        render_template("ticket.html", sale=sale, items=items, pays=pays, can_print=False)
+    ticket_bytes(sale_id)
+
+def _product_search(c: _Ctx) -> None:
+    from repos import products
+    for q in ("cuaderno", "P-0001", "lap azu"):
+        products.search(q)
+    _without_catalog_cache(lambda: [products.search(q) for q in ("cuaderno", "P-0001", "lap azu")])
+    _without_catalog_cache(products.list_active)
+    products.get(c.skus[0])
+
+def _catalog_sync(c: _Ctx) -> None:
+    from repos import products
+    products.version()
+    products.snapshot()
+    _without_catalog_cache(products.snapshot)
+    products.changes(0, limit=50)
+    products.changes(products.version() - 5)
+
+def _customers(c: _Ctx) -> None:
+    from repos import customers
+    customers.search("ana")
+    customers.search("lo", grade_id=1, group_id=1)
+    customers.search("", grade_id=2, shift_id=1)
+    customers.search("", group_id=2, after_id=10)
+    customers.get(c.customer_id())
+    customers.get_by_matricula("100010")
+    customers.list_by_salon(1, 1, 1)
+    customers.list_by_salon(2, None, None)
+    customers.list_by_salon(None, None, None)
+
+def _sellers(c: _Ctx) -> None:
+    from repos import sellers
+    sellers.list_active()
+    sellers.upsert("E-PLAN", "Plan", "Prueba", "Calle", "Caja")
+
+def _products_admin(c: _Ctx) -> None:
+    from repos import products
+    products.upsert("PLAN-1", "Producto de prueba", 10.0, 0.16)
+
+def _reports(c: _Ctx) -> None:
+    from repos import reports
+    reports.daily(c.day, c.day)
+
+def _statement(c: _Ctx) -> None:
+    from repos import statement
+    page = statement.page(c.customer_id(), limit=5)
+    if page["next"]:
+        statement.page(page["customer_id"], page["next"], limit=5)
+    for _ in statement.iter_rows(c.customer_id(), chunk=5):
+        pass
+
+def _exports(c: _Ctx) -> None:
+    from services import export_service
+    for kind in export_service.KINDS:
+        for _ in export_service.ventas_csv(kind, c.day, c.day):
+            pass
+
+def _importar_alumnos(c: _Ctx) -> None:
+    from services.customers_service import importar_alumnos, iter_source
+    from .suite import customers_csv
+    tmp = Path(tempfile.mkdtemp(prefix="posplan_"))
+    try:
+        importar_alumnos(iter_source(customers_csv(20, tmp / "alumnos.csv")))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def _config(c: _Ctx) -> None:
+    from repos import business, customers, folios
+    business.get_config()
+    customers.salon_catalogs()
+    folios.list_series()
+
+def _warmup(c: _Ctx) -> None:
+    from services.warmup import WARM_QUERIES
+    with db_base.get_conn() as conn:
+        for q in WARM_QUERIES:
+            conn.execute(q).fetchall()
+
+def _catalog_load(c: _Ctx) -> None:
+    from repos.catalog import cache
+    cache.invalidate()
+    cache.list_active()
+
+def _rebuild(c: _Ctx) -> None:
+    from repos import reports
+    reports.rebuild(check_only=True)
+
+
+SCENARIOS: list[tuple[str, Callable[[_Ctx], None], str | None]] = [
+    ("alta_venta", _alta_venta, None),
+    ("abonar", _abonar, None),
+    ("folio_series", _folio_series, None),
+    ("cart_price", _cart_price, None),
+    ("drafts", _drafts, None),
+    ("importar_ventas", _importar_ventas, None),
+    ("billing", _billing, None),
+    ("ticket", _ticket, None),
+    ("product_search", _product_search, None),
+    ("catalog_sync", _catalog_sync, None),
+    ("customers", _customers, None),
+    ("sellers", _sellers, None),
+    ("products_admin", _products_admin, None),
+    ("reports", _reports, None),
+    ("statement", _statement, None),
+    ("exports", _exports, None),
+    ("importar_alumnos", _importar_alumnos, None),
+    ("warmup", _warmup, None),
+    # lecturas completas a propósito (van al final: una sentencia se atribuye al primer escenario que la emite)
+    ("config", _config, "catálogos de pocas filas que se leen completos"),
+    ("billing_all", _billing_all, "cobro a toda la escuela: cuenta todos los alumnos activos"),
+    ("catalog_load", _catalog_load, "el caché de catálogo carga products completo una vez por versión"),
+    ("rebuild_reports", _rebuild, "recálculo total de los resúmenes (mantenimiento)"),
+]
+
+
+def _explain(conn, sql: str, params) -> list[str]:
+    if params is None:  # executemany: el plan no depende de los valores
+        params = (None,) * sql.count("?")
+    return [("  " * (r[1] > 0)) + r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def run(customers: int = 1000, products: int = 1000, sales: int = 3000, keep_db: bool = False) -> dict:
+    """{"statements": [{scenario, sql, plan, scans, temp_btree, allowed}], "failures": n}"""
+    from app import create_app
+    from .suite import fill_products, fill_customers, fill_sales
+    original_db = db_base.pool.db_path
+    db_base.pool.factory = profiling.ProfiledConnection  # el catálogo sale del perfilado
+    db_path = temp_db(prefix="posplan_")
+    try:
+        fill_products(products)
+        fill_customers(customers)
+        with db_base.get_conn() as conn:
+            skus = [r[0] for r in conn.execute("SELECT sku FROM products")]
+        fill_sales(sales, skus, customers)
+        with db_base.get_conn() as conn:
+            conn.execute("ANALYZE")  # como PRAGMA optimize en producción
+        ctx = _Ctx(skus, customers, create_app())
+
+        # sentencia -> (primer escenario, parámetros, motivo); basta que una ruta
+        # caliente la emita para que no cuente como lectura completa permitida
+        seen: dict[str, tuple[str, object, str | None]] = {}
+        for name, fn, allowed in SCENARIOS:
+            profiling.start_catalog()
+            try:
+                fn(ctx)
+            finally:
+                for sql, params in profiling.stop_catalog().items():
+                    prev = seen.setdefault(sql, (name, params, allowed))
+                    if prev[2] and not allowed:
+                        seen[sql] = (prev[0], prev[1], None)
+
+        out, failures = [], 0
+        with db_base.get_conn() as conn:
+            for sql, (scenario, params, allowed) in seen.items():
+                if profiling._kind(sql) not in _EXPLAINABLE:
+                    continue
+                plan = _explain(conn, sql, params)
+                text = " ".join(sql.split())
+                allowed = allowed or ALLOWED_SQL.get(text)
+                scans = [m.group(1) for line in plan if (m := _FULL_SCAN.match(line.strip()))]
+                row = {"scenario": scenario, "sql": text, "plan": plan, "scans": scans,
+                       "index_scans": [m.group(2) for line in plan if (m := _INDEX_SCAN.match(line.strip()))],
+                       "temp_btree": any("TEMP B-TREE" in line for line in plan)}
+                if scans and allowed:
+                    row["allowed"] = allowed
+                elif scans:
+                    failures += 1
+                out.append(row)
+    finally:
+        db_base.reset_pool(original_db)
+        if not keep_db:
+            shutil.rmtree(db_path.parent, ignore_errors=True)
+    return {"statements": out, "failures": failures}
+
+
+def report(result: dict, verbose: bool = False) -> list[str]:
+    lines = []
+    for st in result["statements"]:
+        if st["scans"] and "allowed" not in st:
+            status = "SCAN"
+        elif st["scans"]:
+            status = "ok*"
+        else:
+            status = "ok"
+        if verbose or status == "SCAN":
+            lines.append(f"[{status}] {st['scenario']}: {st['sql'][:160]}")
+            lines += [f"    {line}" for line in st["plan"]]
+    n = len(result["statements"])
+    lines.append(f"{n} sentencias, {result['failures']} con recorrido completo de tabla, "
+                 f"{sum(bool(s['index_scans']) for s in result['statements'])} recorren un índice completo, "
+                 f"{sum(s['temp_btree'] for s in result['statements'])} con TEMP B-TREE")
+    return lines
+
+
+def main() -> None:
+    import argparse
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+    result = run()
+    print("\n".join(report(result, args.verbose)))
+    raise SystemExit(1 if result["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench/pricing.py
+"""
+Cotización del carrito (/api/cart/price) con reglas de descuento: becas por
+alumno, hermanos (familias sintéticas) y pronto pago.
+
+Mide la cotización en el servicio (repos/discounts.py ya compilado: una
+lectura de pricing_version por carrito), el request de htmx dentro del app
+(Server-Timing: form + cotización + partial) y la vuelta completa con el test
+client de Flask, más lo que cuesta compilar las reglas.
+
+    python -m bench.pricing --customers 2000 --scholarships 300 --lines 10
+"""
+import argparse
+import json
+import random
+import time
+from repos import base as db_base
+from .common import temp_db, percentiles
+
+
+def run(customers: int = 2000, products: int = 2000, scholarships: int = 300, lines: int = 10,
+        iterations: int = 2000) -> dict:
+    from .suite import fill_products, fill_customers
+    from app import create_app
+    from repos import discounts
+    from services.pricing_service import cotizar
+    temp_db(prefix="pospricing_")
+    fill_products(products)
+    fill_customers(customers)
+    rnd = random.Random(7)
+    with db_base.tx() as conn:
+        # ~1 de cada 4 alumnos comparte papás con otro
+        conn.execute("UPDATE customers SET fullname_mom = 'Mamá ' || (id / 2), fullname_dad = 'Papá ' || (id / 2) "
+                     "WHERE id % 4 < 2")
+        skus = [r[0] for r in conn.execute("SELECT sku FROM products")]
+    for cid in rnd.sample(range(1, customers + 1), scholarships):
+        discounts.add_rule("scholarship", rnd.choice([25, 50, 100]), customer_id=cid, sku=rnd.choice([None, skus[0]]))
+    discounts.add_rule("sibling", 10)
+    discounts.add_rule("early_payment", 5, sku=skus[0], until_day=31)
+
+    t0 = time.perf_counter()
+    discounts.cache.rules()
+    compile_ms = (time.perf_counter() - t0) * 1000
+
+    def cart():
+        return [{"sku": rnd.choice(skus), "qty": rnd.randint(1, 3), "unit_price": round(rnd.uniform(10, 500), 2),
+                 "tax_rate": 0.16} for _ in range(lines)]
+
+    service = []
+    for _ in range(iterations):
+        items, cid = cart(), rnd.randint(1, customers)
+        t0 = time.perf_counter()
+        cotizar(items, cid)
+        service.append((time.perf_counter() - t0) * 1000)
+
+    client = create_app().test_client()
+    http, app_ms = [], []
+    for _ in range(iterations):
+        items = cart()
+        form = {"customer_id": rnd.randint(1, customers), "sku[]": [it["sku"] for it in items],
+                "desc[]": ["Artículo"] * lines, "qty[]": [it["qty"] for it in items],
+                "price[]": [it["unit_price"] for it in items], "tax[]": [it["tax_rate"] for it in items]}
+        t0 = time.perf_counter()
+        resp = client.post("/api/cart/price", data=form)
+        http.append((time.perf_counter() - t0) * 1000)
+        assert resp.status_code == 200 and "cart-priced" in resp.headers["HX-Trigger"]
+        app_ms.append(float(resp.headers["Server-Timing"].split("app;dur=")[1].split(",")[0]))
+
+    return {"customers": customers, "scholarships": scholarships, "lines": lines,
+            "compile_ms": round(compile_ms, 3), "service": percentiles(service), "app": percentiles(app_ms),
+            "http": percentiles(http), "cache": discounts.cache.stats()}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--customers", type=int, default=2000)
+    ap.add_argument("--scholarships", type=int, default=300)
+    ap.add_argument("--lines", type=int, default=10)
+    ap.add_argument("--iterations", type=int, default=2000)
+    args = ap.parse_args()
+    print(json.dumps(run(args.customers, scholarships=args.scholarships, lines=args.lines,
+                         iterations=args.iterations), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# bench/products_search.py
+"""
+Latencia de la búsqueda de productos conforme crece el catálogo.
+
+    python -m bench.products_search --sizes 1000 10000 50000
+"""
+import argparse
+import json
+import random
+from repos import base as db_base
+from repos import products as products_repo
+from repos.catalog import cache
+from .common import temp_db, timeit
+
+WORDS = ["Colegiatura", "Comedor", "Uniforme", "Playera", "Crédito", "Cuaderno", "Lápiz",
+         "Mochila", "Inscripción", "Excursión", "Material", "Deportivo", "Gala", "Suéter"]
+QUERIES = ["credito", "P-0004", "unif", "mochila gala", "xyz"]
+
+
+def fill_products(n: int, start: int = 0) -> None:
+    rnd = random.Random(n)
+    rows = [(f"P-{i:06d}", " ".join(rnd.sample(WORDS, 3)) + f" {i}", round(rnd.uniform(10, 3000), 2))
+            for i in range(start, n)]
+    with db_base.tx() as conn:
+        conn.executemany("INSERT INTO products(sku, description, price, tax_rate) VALUES(?,?,?,0.16)", rows)
+
+
+def like_search(q: str) -> list:
+    with db_base.get_conn() as conn:
+        return conn.execute(
+            "SELECT sku, description, price, tax_rate FROM products WHERE active=1 AND (sku LIKE ? OR description LIKE ?) ORDER BY description LIMIT 20",
+            (f"%{q}%", f"%{q}%")).fetchall()
+
+
+def run(sizes: list[int], repeat: int) -> list[dict]:
+    temp_db()
+    out, filled = [], 0
+    for size in sorted(sizes):
+        fill_products(size, filled)
+        filled = size
+        for q in QUERIES:
+            cache.max_items = size * 2
+            cache.invalidate()
+            products_repo.search(q)  # carga el caché fuera de la medición
+            out.append({"products": size, "q": q, "impl": "cache",
+                        **timeit(lambda: products_repo.search(q), repeat)})
+            cache.max_items = 0  # fuerza la ruta SQLite (FTS5)
+            cache.invalidate()
+            out.append({"products": size, "q": q, "impl": "fts",
+                        **timeit(lambda: products_repo.search(q), repeat)})
+            out.append({"products": size, "q": q, "impl": "like",
+                        **timeit(lambda: like_search(q), repeat)})
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    ap.add_argument("--repeat", type=int, default=100)
+    args = ap.parse_args()
+    for row in run(args.sizes, args.repeat):
+        print(json.dumps(row, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
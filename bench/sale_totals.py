@@ -0,0 +1,104 @@
+# bench/sale_totals.py
+"""
+Costo de dar de alta una venta de 1, 20 y 200 renglones:
+  - set:    create_sale actual (executemany + una pasada de totales)
+  - legacy: inserción por renglón con los triggers trg_items_ai / trg_pay_ai
+
+    python -m bench.sale_totals --lines 1 20 200
+"""
+import argparse
+import json
+from repos import base as db_base
+from repos import sales as sales_repo
+from .common import temp_db, timeit
+
+# Triggers originales (schema.sql antes de la migración 003)
+LEGACY_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS trg_items_ai AFTER INSERT ON sale_items
+BEGIN
+  UPDATE sales
+  SET subtotal       = (SELECT sub  FROM v_sales_calc WHERE sale_id = NEW.sale_id),
+      discount_total = (SELECT disc FROM v_sales_calc WHERE sale_id = NEW.sale_id),
+      tax_total      = (SELECT iva  FROM v_sales_calc WHERE sale_id = NEW.sale_id),
+      total          = (SELECT tot  FROM v_sales_calc WHERE sale_id = NEW.sale_id)
+  WHERE id = NEW.sale_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_pay_ai AFTER INSERT ON payments
+BEGIN
+  UPDATE sales
+  SET payment_status = CASE
+    WHEN (SELECT total_paid FROM v_sales_paid WHERE sale_id = NEW.sale_id) >= total THEN 'paid'
+    WHEN (SELECT total_paid FROM v_sales_paid WHERE sale_id = NEW.sale_id) > 0    THEN 'partial'
+    ELSE 'unpaid'
+  END
+  WHERE id = NEW.sale_id;
+END;
+"""
+
+
+def make_sale(n: int) -> tuple[dict, list[dict], list[dict]]:
+    items = [{"sku": "P-001", "description_snapshot": f"Renglón {i}", "qty": 1 + i % 3,
+              "unit_price": 10.0 + i, "discount": float(i % 2), "tax_rate": 0.16} for i in range(n)]
+    total = sum((it["qty"] * it["unit_price"] - it["discount"]) * 1.16 for it in items)
+    header = {"customer": "Bench", "seller": "Bench"}
+    return header, items, [{"method": "cash", "amount": round(total / 2, 2)},
+                           {"method": "card", "amount": round(total, 2)}]
+
+
+def legacy_create_sale(header: dict, items: list[dict], payments: list[dict]) -> None:
+    with db_base.tx() as conn:
+        sale_id = conn.execute("INSERT INTO sales (customer, seller) VALUES (?, ?)",
+                               (header["customer"], header["seller"])).lastrowid
+        for it in items:
+            line_total = (it["qty"] * it["unit_price"] - it["discount"]) * (1 + it["tax_rate"])
+            conn.execute("""
+                INSERT INTO sale_items (sale_id, sku, description_snapshot, qty, unit_price, discount, tax_rate, line_total)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (sale_id, it["sku"], it["description_snapshot"], it["qty"], it["unit_price"],
+                  it["discount"], it["tax_rate"], line_total))
+        for p in payments:
+            conn.execute("INSERT INTO payments (sale_id, method, amount) VALUES (?, ?, ?)",
+                         (sale_id, p["method"], p["amount"]))
+
+
+def mismatches() -> int:
+    """Ventas cuyo total / estado guardado difiere de v_sales_calc / v_sales_paid."""
+    with db_base.get_conn() as conn:
+        return conn.execute("""
+            SELECT count(*) FROM sales s
+            JOIN v_sales_calc v ON v.sale_id = s.id
+            JOIN v_sales_paid vp ON vp.sale_id = s.id
+            WHERE s.subtotal <> v.sub OR s.discount_total <> v.disc
+               OR s.tax_total <> v.iva OR s.total <> v.tot
+               OR s.payment_status <> CASE WHEN vp.total_paid >= s.total THEN 'paid'
+                                           WHEN vp.total_paid > 0 THEN 'partial'
+                                           ELSE 'unpaid' END
+        """).fetchone()[0]
+
+
+def run(lines: list[int], repeat: int) -> list[dict]:
+    out = []
+    for impl in ("set", "legacy"):
+        temp_db()
+        if impl == "legacy":
+            with db_base.get_conn() as conn:
+                conn.executescript(LEGACY_TRIGGERS)
+        fn = sales_repo.create_sale if impl == "set" else legacy_create_sale
+        for n in lines:
+            header, items, payments = make_sale(n)
+            stats = timeit(lambda: fn(header, [dict(it) for it in items], payments), repeat)
+            out.append({"impl": impl, "lines": n, **stats, "mismatches": mismatches()})
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--lines", type=int, nargs="+", default=[1, 20, 200])
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+    for row in run(args.lines, args.repeat):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
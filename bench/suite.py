@@ -0,0 +1,229 @@
+# bench/suite.py
+"""
+Micro-benchmarks de las rutas calientes del POS sobre una BD desechable con
+datos sintéticos. Resultado en JSON (p50/p95/p99, ops/s, memoria pico);
+`compare` marca regresiones entre dos corridas.
+
+    python cli.py bench --out base.json
+    python cli.py bench --baseline base.json      # corre y compara
+    python cli.py bench-compare base.json new.json
+"""
+import csv
+import platform
+import shutil
+import random
+import resource
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from config import BACKUP_PAGES
+from repos import base as db_base
+from repos import products as products_repo
+from repos import sales as sales_repo
+from repos.catalog import cache as catalog_cache
+from .backup import alta_during
+from .common import temp_db, timeit
+from .products_search import fill_products, QUERIES
+
+FIRST_NAMES = ["Ana", "Luis", "María", "José", "Sofía", "Diego", "Valeria", "Mateo", "Regina", "Emiliano"]
+LAST_NAMES = ["López", "García", "Hernández", "Martínez", "Pérez", "Sánchez", "Ramírez", "Núñez"]
+
+# Diferencias menores a esto (ms) son ruido aunque el porcentaje sea alto
+NOISE_MS = 0.05
+
+
+def fill_customers(n: int) -> None:
+    rnd = random.Random(n)
+    rows = [(f"{100000 + i}", rnd.choice(FIRST_NAMES), f"{rnd.choice(LAST_NAMES)} {rnd.choice(LAST_NAMES)}",
+             rnd.randint(1, 3), rnd.randint(1, 2), rnd.randint(1, 2), f"CURP{i:014d}", f"REF{i:08d}")
+            for i in range(n)]
+    with db_base.tx() as conn:
+        conn.executemany("""
+            INSERT INTO customers(enrollment, first_name, second_name, grade_id, group_id, shift_id, curp, pay_reference)
+            VALUES(?,?,?,?,?,?,?,?)""", rows)
+
+
+def random_sale(rnd: random.Random, skus: list[str], customers: int) -> tuple[dict, list[dict], list[dict]]:
+    items = [{"sku": rnd.choice(skus), "description_snapshot": "Artículo", "qty": float(rnd.randint(1, 3)),
+              "unit_price": round(rnd.uniform(10, 500), 2), "discount": 0.0, "tax_rate": 0.16}
+             for _ in range(rnd.randint(1, 4))]
+    total = sum(it["qty"] * it["unit_price"] * 1.16 for it in items)
+    header = {"customer_id": rnd.randint(1, customers), "seller_id": 1, "customer": "Alumno", "seller": "Caja"}
+    return header, items, [{"method": rnd.choice(["cash", "card", "transfer"]), "amount": round(total, 2)}]
+
+
+def fill_sales(n: int, skus: list[str], customers: int, chunk: int = 1000) -> None:
+    rnd = random.Random(n)
+    for start in range(0, n, chunk):
+        batch = [random_sale(rnd, skus, customers) for _ in range(min(chunk, n - start))]
+        with db_base.tx() as conn:
+            sales_repo.create_sales(conn, batch)
+
+
+def customers_csv(n: int, path: Path) -> Path:
+    rnd = random.Random(n)
+    with path.open("w", encoding="utf-8", newline="") as fh:
+        w = csv.writer(fh)
+        w.writerow(["MATRICULA", "NOMBRE", "APELLIDO PATERNO", "APELLIDO MATERNO", "GRADO", "GRUPO",
+                    "HORARIO", "SEXO", "CURP"])
+        for i in range(n):
+            w.writerow([f"{900000 + i}", rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES), rnd.choice(LAST_NAMES),
+                        rnd.randint(1, 3), rnd.choice("AB"), rnd.choice(["MATUTINO", "VESPERTINO"]),
+                        rnd.choice("HM"), f"IMP{i:015d}"])
+    return path
+
+
+def peak_alloc_kb(fn, repeat: int = 5) -> float:
+    """Memoria pico asignada por Python (tracemalloc) durante `repeat` llamadas."""
+    tracemalloc.start()
+    try:
+        for _ in range(repeat):
+            fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def run(customers: int = 2000, products: int = 2000, sales: int = 20000, repeat: int = 300,
+        import_rows: int = 2000, keep_db: bool = False) -> dict:
+    from flask import render_template
+    from app import create_app
+    from printing.escpos_print import render_ticket
+    from repos import business as business_repo
+    from services.customers_service import importar_alumnos, iter_source
+    from services.sales_service import alta_venta
+
+    t0 = time.perf_counter()
+    original_db = db_base.pool.db_path
+    db_path = temp_db()
+    fill_products(products)
+    fill_customers(customers)
+    with db_base.get_conn() as conn:
+        skus = [r[0] for r in conn.execute("SELECT sku FROM products WHERE active=1")]
+    fill_sales(sales, skus, customers)
+    setup_s = time.perf_counter() - t0
+
+    rnd = random.Random(1)
+    app = create_app()
+    cfg = business_repo.get_config()
+
+    def do_alta():
+        header, items, pays = random_sale(rnd, skus, customers)
+        alta_venta(customer_name=header["customer"], seller_name=header["seller"],
+                   items_ui=[{"sku": it["sku"], "descripcion": it["description_snapshot"], "qty": it["qty"],
+                              "unit_price": it["unit_price"], "tax_rate": it["tax_rate"]} for it in items],
+                   customer_id=header["customer_id"], seller_id=1, payments=pays)
+
+    with db_base.get_conn() as conn:
+        top = conn.execute("SELECT max(id) FROM sales").fetchone()[0]
+    do_get_sale = lambda: sales_repo.get_sale(rnd.randint(1, top))
+    do_search = lambda: products_repo.search(rnd.choice(QUERIES))
+
+    def do_search_sql():
+        max_items = catalog_cache.max_items
+        catalog_cache.max_items = 0  # fuerza la consulta FTS5 / rango por SKU
+        catalog_cache.invalidate()
+        try:
+            products_repo.search(rnd.choice(QUERIES))
+        finally:
+            catalog_cache.max_items = max_items
+            catalog_cache.invalidate()
+
+    def do_ticket_html():
+        sale, items, pays = sales_repo.get_sale(rnd.randint(1, top))
+        with app.test_request_context():
+            render_template("ticket.html", sale=sale, items=items, pays=pays, can_print=False)
+
+    def do_ticket_escpos():
+        sale, items, _ = sales_repo.get_sale(rnd.randint(1, top))
+        render_ticket(cfg, sale, [{**it, "description": it["description_snapshot"]} for it in items])
+
+    cases = {
+        "alta_venta": do_alta,
+        "get_sale": do_get_sale,
+        "product_search": do_search,
+        "product_search_sql": do_search_sql,
+        "ticket_html": do_ticket_html,
+        "ticket_escpos": do_ticket_escpos,
+    }
+    results = {}
+    for name, fn in cases.items():
+        for _ in range(min(20, repeat)):  # calentamiento
+            fn()
+        results[name] = {**timeit(fn, repeat), "peak_alloc_kb": peak_alloc_kb(fn)}
+
+    # alta_venta con un respaldo por pasos corriendo al mismo tiempo
+    results["alta_venta_during_backup"] = alta_during(do_alta, BACKUP_PAGES)
+
+    # import-customers: filas/s del archivo completo (primera corrida inserta, la segunda actualiza)
+    src = customers_csv(import_rows, Path(tempfile.mkdtemp(prefix="posbench_")) / "alumnos.csv")
+    for label in ("import_customers_insert", "import_customers_update"):
+        tracemalloc.start()
+        st = importar_alumnos(iter_source(src))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[label] = {"n": st["rows"], "seconds": st["seconds"], "ops_per_s": st["rows_per_s"],
+                          "errors": st["errors"], "peak_alloc_kb": round(peak / 1024, 1)}
+
+    db_base.reset_pool(original_db)
+    shutil.rmtree(src.parent, ignore_errors=True)
+    if not keep_db:
+        shutil.rmtree(db_path.parent, ignore_errors=True)
+
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "customers": customers, "products": products, "sales": sales,
+            "repeat": repeat, "import_rows": import_rows,
+            "setup_s": round(setup_s, 2), "db": str(db_path) if keep_db else None,
+        },
+        "results": results,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def compare(old: dict, new: dict, threshold: float = 0.10) -> list[dict]:
+    """Casos comunes a ambas corridas. `regression` si p50 (u ops/s en los que
+    sólo miden rendimiento) empeora más de `threshold` y más que el ruido.
+    p95/p99 se reportan pero no cuentan: con fsync de por medio varían demasiado."""
+    out = []
+    for name in sorted(old["results"].keys() & new["results"].keys()):
+        a, b = old["results"][name], new["results"][name]
+        row = {"case": name, "regression": False}
+        if "p50_ms" in a and "p50_ms" in b:
+            for k in ("p50_ms", "p95_ms", "p99_ms"):
+                if k not in a or k not in b:
+                    continue
+                ratio = b[k] / a[k] if a[k] else 1.0
+                row[k] = [a[k], b[k], round(ratio, 3)]
+                if k == "p50_ms" and ratio > 1 + threshold and b[k] - a[k] > NOISE_MS:
+                    row["regression"] = True
+        else:
+            ratio = b["ops_per_s"] / a["ops_per_s"] if a["ops_per_s"] else 1.0
+            row["ops_per_s"] = [a["ops_per_s"], b["ops_per_s"], round(ratio, 3)]
+            row["regression"] = ratio < 1 - threshold
+        out.append(row)
+    return out
+
+
+def main() -> None:
+    import argparse
+    import json
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--customers", type=int, default=2000)
+    ap.add_argument("--products", type=int, default=2000)
+    ap.add_argument("--sales", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=300)
+    ap.add_argument("--import-rows", type=int, default=2000)
+    args = ap.parse_args()
+    print(json.dumps(run(args.customers, args.products, args.sales, args.repeat, args.import_rows),
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,14 @@
 # cli.py
 from datetime import datetime
-import typer, shutil
+import typer, shutil, os
 from pathlib import Path
 import sqlite3
-from config import DB_PATH
+from config import (DB_PATH, SERVE_HOST, SERVE_PORT, SERVE_THREADS,
+                    SERVE_CONNECTION_LIMIT, SERVE_CHANNEL_TIMEOUT,
+                    BACKUP_DIR, BACKUP_COMPRESS, BACKUP_PAGES, BACKUP_SLEEP_MS, BACKUP_KEEP, BACKUP_KEEP_DAILY)
 from db.init import init_db, schema_path, get_connection
 from db.migrate import apply_migrations
 from typing import Optional
-import math
 try:
     import openpyxl  # para .xlsx
 except Exception:
@@ -59,227 +60,412 @@ def vacuum():
     typer.secho("OK: VACUUM.", fg=typer.colors.GREEN)
 
 @app.command("backup")
-def backup(dst: Optional[Path] = typer.Option(  # <-- Optional[Path]
-    None,
-    help="Ruta del archivo destino. Si se omite, se crea data/backup_YYYY-MM-DD.db",
-)):
-    """Copia en caliente usando backup API de sqlite3"""
-
+def backup(
+    dst: Optional[Path] = typer.Option(None, help="Archivo destino exacto (sin rotación); la compresión sale del sufijo .gz/.zst"),
+    dir: Path = typer.Option(BACKUP_DIR, help="Carpeta de respaldos (backup_YYYYmmdd-HHMMSS.db.gz)"),
+    compress: str = typer.Option(BACKUP_COMPRESS, help="gzip | zstd | none"),
+    pages: int = typer.Option(BACKUP_PAGES, help="Páginas por paso (-1 = en un solo paso)"),
+    sleep_ms: float = typer.Option(BACKUP_SLEEP_MS, help="Pausa entre pasos"),
+    keep: int = typer.Option(BACKUP_KEEP, help="Respaldos recientes a conservar"),
+    keep_daily: int = typer.Option(BACKUP_KEEP_DAILY, help="Además, el último de cada día (días)"),
+    every: Optional[int] = typer.Option(None, help="Modo programado: repetir cada N segundos (3600 = cada hora)"),
+):
+    """Respaldo en caliente por pasos, comprimido y verificado (SHA-256), con rotación."""
+    from services.backup_service import respaldar, rotar, programar, BackupError
+
+    def report(res):
+        if isinstance(res, Exception):
+            typer.secho(f"[{datetime.now():%H:%M:%S}] Respaldo FALLÓ: {res}", fg="red"); return
+        extra = " (copia en un paso tras reinicios)" if res["one_step"] else ""
+        typer.secho(f"[{datetime.now():%H:%M:%S}] Backup creado en: {res['file']} "
+                    f"({res['db_bytes'] / 1e6:.1f} MB -> {res['bytes'] / 1e6:.1f} MB, {res['seconds']}s, "
+                    f"{res['steps']} pasos, {res['restarts']} reinicios{extra})", fg="green")
+        for p in res.get("removed", []):
+            typer.echo(f"  rotado: {p}")
+
+    kwargs = dict(compress=compress, pages=pages, sleep_ms=sleep_ms)
+    if every:
+        typer.echo(f"Respaldo cada {every}s en {dir} (Ctrl+C para salir)")
+        try:
+            programar(every, report, dest_dir=dir, keep=keep, keep_daily=keep_daily, **kwargs)
+        except KeyboardInterrupt:
+            return
+    try:
+        res = respaldar(dest_dir=dir, dst=dst, **kwargs)
+    except BackupError as e:
+        typer.secho(str(e), fg="red"); raise typer.Exit(1)
     if dst is None:
-        dst = Path("data") / f"backup_{datetime.now():%Y-%m-%d}.db"
+        res["removed"] = [str(p) for p in rotar(dir, keep, keep_daily)]
+    report(res)
 
-    dst.parent.mkdir(exist_ok=True)
-    
-    with get_connection() as src_conn, sqlite3.connect(dst) as dst_conn:
-        src_conn.backup(dst_conn)
-    typer.secho(f"Backup creado en: {dst}", fg=typer.colors.GREEN)
+
+@app.command("restore")
+def restore(
+    src: Path = typer.Argument(..., help="Respaldo .db / .db.gz / .db.zst"),
+    yes: bool = typer.Option(False, "--yes", "-y", help="No pedir confirmación"),
+):
+    """Restaura un respaldo verificado sobre DB_PATH (detén el servidor antes)."""
+    from services.backup_service import restaurar, BackupError
+    if not src.exists():
+        typer.secho(f"No existe: {src}", fg="red"); raise typer.Exit(code=1)
+    if not yes:
+        typer.confirm(f"Se reemplazará {DB_PATH} con {src}. ¿Continuar?", abort=True)
+    try:
+        res = restaurar(src)
+    except BackupError as e:
+        typer.secho(str(e), fg="red"); raise typer.Exit(1)
+    typer.secho(f"Restaurado {res['restored']} desde {res['from']}", fg="green")
+    if res["previous"]:
+        typer.echo(f"BD anterior conservada en {res['previous']}")
 
 
 @app.command("import-customers")
 def import_customers_xlsx(
-    src: Path = typer.Argument(..., help="Ruta al Excel Alumnos.xlsx (hoja ControlUnico)"),
+    src: Path = typer.Argument(..., help="Ruta al Excel Alumnos.xlsx (hoja ControlUnico) o a un .csv con los mismos encabezados"),
     sheet: str = typer.Option("ControlUnico", help="Nombre de la hoja"),
     dry_run: bool = typer.Option(False, help="Solo mostrar acciones; no escribe en BD"),
+    chunk: int = typer.Option(1000, help="Filas por transacción"),
 ):
     """
     Importa/actualiza alumnos (customers) a partir del Excel real que compartiste.
     Upsert por 'enrollment' (MATRICULA). Crea grades/groups/shifts por 'code' si faltan.
+    Lee en streaming y escribe por bloques: memoria constante aunque el archivo sea grande.
     """
-    if openpyxl is None:
+    from services.customers_service import importar_alumnos, iter_source
+    if openpyxl is None and src.suffix.lower() != ".csv":
         typer.secho("Falta openpyxl. Instala con: pip install openpyxl", fg="red")
         raise typer.Exit(code=1)
     if not src.exists():
         typer.secho(f"No existe: {src}", fg="red"); raise typer.Exit(code=1)
 
-    wb = openpyxl.load_workbook(src, data_only=True)
-    if sheet not in wb.sheetnames:
-        typer.secho(f"La hoja '{sheet}' no existe. Hojas: {wb.sheetnames}", fg="red"); raise typer.Exit(1)
-    ws = wb[sheet]
-
-    # Header map: nombre exacto de tus columnas → clave interna
-    header_map = {
-        "MATRICULA": "enrollment",
-        "NOMBRE": "first_name",
-        "APELLIDO PATERNO": "ap_paterno",
-        "APELLIDO MATERNO": "ap_materno",
-        "DOMICILIO": "address",
-        "GRADO": "grade_code",
-        "GRUPO": "group_code",
-        "HORARIO": "shift_text",     # MATUTINO / VESPERTINO
-        "SEXO": "gender",
-        "NOMBRE MAMÁ": "fullname_mom",
-        "NOMBRE PAPÁ": "fullname_dad",
-        "DIA FNAC": "birth_day",
-        "MES FNAC": "birth_month_es",
-        "AÑO FNAC": "birth_year",
-        "CURP": "curp",
-        "CELULAR 1": "phone",
-        "CELULAR 2": "mobile_phone",
-        "REFERENCIA": "pay_reference",
-    }
-
-    # Lee encabezados
-    headers = [str(ws.cell(row=1, column=c).value or "").strip() for c in range(1, ws.max_column+1)]
-    idx = {}
-    for k_excel, k_int in header_map.items():
-        try:
-            idx[k_int] = headers.index(k_excel) + 1
-        except ValueError:
-            idx[k_int] = None  # columna opcional ausente
-
-    def cell(row, key):
-        col = idx.get(key)
-        if not col: return None
-        v = ws.cell(row=row, column=col).value
-        if v is None: return None
-        if isinstance(v, str): return v.strip()
-        return v
-
-    # Normalizadores
-    MONTHS_ES = {
-        "ENERO": 1, "FEBRERO": 2, "MARZO": 3, "ABRIL": 4, "MAYO": 5, "JUNIO": 6,
-        "JULIO": 7, "AGOSTO": 8, "SEPTIEMBRE": 9, "SETIEMBRE": 9, "OCTUBRE": 10, "NOVIEMBRE": 11, "DICIEMBRE": 12
-    }
-    def to_birth_date(day, month_es, year):
-        if day in (None, "", 0) or year in (None, "", 0) or not month_es:
-            return None
-        try:
-            d = int(day) if not isinstance(day, float) else int(day)
-            y = int(year) if not isinstance(year, float) else int(year)
-            if isinstance(month_es, (int, float)) and not math.isnan(month_es):
-                m = int(month_es)
-            else:
-                m = MONTHS_ES.get(str(month_es).strip().upper())
-            if not m: return None
-            return datetime(y, m, d).strftime("%Y-%m-%d")
-        except Exception:
-            return None
-
-    def to_shift_code(txt):
-        if not txt: return None
-        t = str(txt).strip().upper()
-        if t.startswith("MAT"): return "MAT"
-        if t.startswith("VES"): return "VES"
-        return None
-
-    def to_gender(g):
-        if not g: return None
-        gg = str(g).strip().upper()
-        if gg.startswith("M"): return "F"
-        if gg.startswith("H"): return "M"
-        return None
-
-    def to_text(x):
-        if x is None: return None
-        s = str(x).strip()
-        return s if s != "" else None
-
-    # Conexión
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # Helpers: obtener/crear IDs de catálogos
-    def get_or_create(table, code) -> Optional[int]:
-        if not code: return None
-        r = cur.execute(f"SELECT id FROM {table} WHERE code=?", (code,)).fetchone()
-        if r: return r[0]
-        cur.execute(f"INSERT INTO {table}(code, name) VALUES(?, ?)", (code, code))
-        return cur.lastrowid
-
-    inserts = updates = errors = 0
-
-    for r in range(2, ws.max_row+1):
+    def on_error(r, msg):
+        typer.secho(f"[fila {r}] ERROR: {msg}", fg="red")
+
+    def on_progress(st):
+        typer.echo(f"  {st['rows']:,} filas  {st['rows_per_s']:,.0f} filas/s")
+
+    try:
+        st = importar_alumnos(iter_source(src, sheet), dry_run=dry_run, chunk_size=chunk,
+                              on_error=on_error, on_progress=on_progress)
+    except ValueError as e:
+        typer.secho(str(e), fg="red"); raise typer.Exit(1)
+
+    summary = (f"inserts={st['inserts']}, updates={st['updates']}, errores={st['errors']} "
+               f"({st['rows_per_s']:,.0f} filas/s, {st['seconds']}s)")
+    if dry_run:
+        typer.secho(f"Dry-run: {summary}", fg="yellow")
+    else:
+        typer.secho(f"Import OK: {summary}", fg="green")
+
+
+@app.command("import-sales")
+def import_sales(
+    src: Path = typer.Argument(..., help="Archivo .json (lista) o .ndjson (una venta por línea)"),
+    chunk: int = typer.Option(500, help="Ventas por transacción"),
+    out: Optional[Path] = typer.Option(None, help="Guarda el resultado por venta (NDJSON)"),
+):
+    """
+    Alta masiva de ventas capturadas sin red. Cada venta lleva `idempotency_key`:
+    reenviar el mismo archivo no duplica ventas.
+    """
+    import json, time
+    from services.sales_service import importar_ventas, leer_ventas
+    if not src.exists():
+        typer.secho(f"No existe: {src}", fg="red"); raise typer.Exit(code=1)
+
+    created = duplicates = errors = 0
+    t0 = time.perf_counter()
+    with src.open(encoding="utf-8") as fh, (out.open("w", encoding="utf-8") if out else open(os.devnull, "w")) as fout:
         try:
-            enrollment = cell(r, "enrollment")
-            # enrollment podría venir como número → conviértelo a texto sin decimales
-            if enrollment is None or str(enrollment).strip() == "":
-                # fila vacía, continúa
-                continue
-            if isinstance(enrollment, float):
-                enrollment = str(int(enrollment))
-            else:
-                enrollment = str(enrollment).strip()
-
-            first_name = to_text(cell(r, "first_name"))
-            ap1 = to_text(cell(r, "ap_paterno"))
-            ap2 = to_text(cell(r, "ap_materno"))
-            second_name = " ".join([x for x in [ap1, ap2] if x]).strip() or None
-
-            address = to_text(cell(r, "address"))
-            grade_code = to_text(cell(r, "grade_code"))
-            group_code = to_text(cell(r, "group_code"))
-            shift_text = to_text(cell(r, "shift_text"))
-            shift_code = to_shift_code(shift_text)
-
-            gender = to_gender(cell(r, "gender"))
-            mom = to_text(cell(r, "fullname_mom"))
-            dad = to_text(cell(r, "fullname_dad"))
-
-            birth_day = cell(r, "birth_day")
-            birth_month_es = cell(r, "birth_month_es")
-            birth_year = cell(r, "birth_year")
-            birth_date = to_birth_date(birth_day, birth_month_es, birth_year)
-
-            phone = cell(r,"phone")
-            mobile_phone = cell (r, "mobile_phone")
-
-            curp = to_text(cell(r, "curp"))
-            pay_ref = to_text(cell(r, "pay_reference"))
-
-            # Resuelve catálogos (crea si no existen)
-            grade_id = get_or_create("grades", grade_code) if grade_code else None
-            group_id = get_or_create("groups", group_code) if group_code else None
-            shift_id = get_or_create("shifts", shift_code) if shift_code else None
-
-            fields = {
-                "enrollment": enrollment,
-                "first_name": first_name,
-                "second_name": second_name,     # apellidos concatenados
-                "address": address,
-                "grade_id": grade_id,
-                "group_id": group_id,
-                "shift_id": shift_id,
-                "gender": gender,
-                "fullname_mom": mom,
-                "fullname_dad": dad,
-                "birth_date": birth_date,
-                "curp": curp,
-                "phone": phone,
-                "mobile_phone": mobile_phone,
-                "pay_reference": pay_ref,
-                "active": 1,
-            }
-
-            # Validación mínima
-            if not first_name:
-                raise ValueError("NOMBRE vacío")
-            # Upsert por enrollment
-            exists = cur.execute("SELECT id FROM customers WHERE enrollment=?", (enrollment,)).fetchone()
-            if dry_run:
-                action = "UPDATE" if exists else "INSERT"
-                typer.echo(f"[fila {r}] {action} {enrollment} → {fields}")
-            else:
-                if exists:
-                    sets = ", ".join([f"{k}=?" for k in fields.keys() if k != "enrollment"])
-                    params = [fields[k] for k in fields.keys() if k != "enrollment"] + [enrollment]
-                    cur.execute(f"UPDATE customers SET {sets} WHERE enrollment=?", params)
-                    updates += 1
+            for r in importar_ventas(leer_ventas(fh), chunk_size=chunk):
+                if "error" in r:
+                    errors += 1
+                    typer.secho(f"[{r['index']}] {r.get('key')}: ERROR {r['error']}", fg="red")
+                elif r["duplicate"]:
+                    duplicates += 1
                 else:
-                    cols = ",".join(fields.keys())
-                    qs = ",".join(["?"]*len(fields))
-                    cur.execute(f"INSERT INTO customers({cols}) VALUES({qs})", tuple(fields.values()))
-                    inserts += 1
-
-        except Exception as e:
+                    created += 1
+                fout.write(json.dumps(r, ensure_ascii=False) + "\n")
+        except ValueError as e:  # JSON ilegible (leer_ventas): lo que sigue ya no se puede leer
+            r = {"index": created + duplicates + errors, "key": None, "error": f"JSON inválido: {e}"}
             errors += 1
-            typer.secho(f"[fila {r}] ERROR: {e}", fg="red")
-
+            typer.secho(f"[{r['index']}] ERROR {r['error']}", fg="red")
+            fout.write(json.dumps(r, ensure_ascii=False) + "\n")
+    elapsed = time.perf_counter() - t0
+    total = created + duplicates + errors
+    typer.secho(f"Import OK: nuevas={created}, duplicadas={duplicates}, errores={errors} "
+                f"({total / elapsed if elapsed else 0:,.0f} ventas/s)", fg="green")
+
+
+@app.command("bill")
+def bill(
+    sku: str = typer.Argument(..., help="Producto a cobrar (colegiatura, comedor, ...)"),
+    period: Optional[str] = typer.Option(None, "--period", help="YYYY-MM (default: mes en curso)"),
+    grade_id: Optional[int] = typer.Option(None, "--grade"),
+    group_id: Optional[int] = typer.Option(None, "--group"),
+    shift_id: Optional[int] = typer.Option(None, "--shift"),
+    seller_id: Optional[int] = typer.Option(None, "--seller"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Sólo muestra a quién se cobraría"),
+    chunk: int = typer.Option(1000, help="Alumnos por transacción"),
+    series: Optional[str] = typer.Option(None, "--series", help="Serie de folios (default: FOLIO_SERIES)"),
+):
+    """
+    Cobro mensual en lote: una venta sin pago por alumno activo del salón.
+    Repetir el mismo periodo y SKU sólo cobra a los que faltan.
+    """
+    from services.billing_service import facturar, periodo_actual
+    try:
+        r = facturar(period or periodo_actual(), sku, grade_id, group_id, shift_id, seller_id, dry_run, chunk,
+                     series)
+    except ValueError as e:
+        typer.secho(str(e), fg="red"); raise typer.Exit(code=1)
+    typer.echo(f"{r['description']}: {r['amount']:,.2f} precio de lista; "
+               f"{r['students']} alumnos, {r['billed']} ya cobrados")
     if dry_run:
-        conn.rollback()
-        typer.secho(f"Dry-run: inserts={inserts}, updates={updates}, errores={errors}", fg="yellow")
+        for c in r["preview"]:
+            typer.echo(f"  {c['enrollment']:<10} {c['name']:<40} {c['amount']:>10,.2f}  {' · '.join(c['rules'])}")
+        pending = r["students"] - r["billed"]
+        if pending > len(r["preview"]):
+            typer.echo(f"  ... {pending - len(r['preview'])} más")
+        typer.secho(f"Vista previa: {pending} ventas por {r['total']:,.2f} (sin cambios)", fg="yellow")
+        return
+    if not r["created"]:
+        typer.secho("Nada que cobrar", fg="green"); return
+    typer.secho(f"Cobro OK: {r['created']} ventas por {r['total']:,.2f}, folios {r['first_folio']} a "
+                f"{r['last_folio']} en {r['seconds']:.3f} s ({r['per_s']:,} ventas/s)", fg="green")
+
+
+@app.command("folio-series")
+def folio_series(
+    series: Optional[str] = typer.Argument(None, help="Serie a dar de alta o ajustar (sin argumento: lista)"),
+    prefix: Optional[str] = typer.Option(None, "--prefix", help="Default: '<serie>-'"),
+    width: Optional[int] = typer.Option(None, "--width", min=1, max=12, help="Dígitos del número (alta: 6)"),
+    next_number: Optional[int] = typer.Option(None, "--next", help="Siguiente número (sólo avanza)"),
+):
+    """
+    Series de folios por caja/terminal. Cada caja vende con la suya
+    (FOLIO_SERIES en su entorno) y no choca con las demás. Una serie acepta
+    folios de hasta --width dígitos; al llegar al límite hay que ampliarlo.
+    """
+    from repos import folios
+    if series:
+        try:
+            folios.upsert_series(series, prefix, width, next_number)
+        except ValueError as e:
+            typer.secho(str(e), fg="red"); raise typer.Exit(code=1)
+    for s in folios.list_series():
+        typer.echo(f"{s['series']:<16} {s['prefix']}{s['next']:0{s['width']}d}  (siguiente)")
+
+
+@app.command("discounts")
+def discounts(all_rules: bool = typer.Option(False, "--all", help="Incluye las desactivadas")):
+    """Reglas de descuento (beca, hermanos, pronto pago)."""
+    from repos import discounts as discounts_repo
+    for r in discounts_repo.list_rules(all_rules):
+        scope = f"alumno {r['enrollment']} {r['customer']}" if r["customer_id"] else "todos"
+        when = f", hasta el día {r['until_day']}" if r["until_day"] else ""
+        typer.echo(f"{r['id']:>4} {'' if r['active'] else '(inactiva) '}{r['name']} {r['percent']:g}% "
+                   f"[{r['kind']}] {r['sku'] or 'todos los productos'}; {scope}{when}")
+
+
+@app.command("discount-add")
+def discount_add(
+    kind: str = typer.Argument(..., help="scholarship | sibling | early_payment"),
+    percent: float = typer.Argument(..., help="Porcentaje sobre el precio (0-100]"),
+    name: Optional[str] = typer.Option(None, "--name"),
+    customer_id: Optional[int] = typer.Option(None, "--customer", help="Alumno (beca)"),
+    sku: Optional[str] = typer.Option(None, "--sku", help="Producto (default: todos)"),
+    until_day: Optional[int] = typer.Option(None, "--until-day", help="Pronto pago: hasta el día N del mes"),
+):
+    """Alta de una regla de descuento; aplica desde la siguiente cotización."""
+    from repos import discounts as discounts_repo
+    try:
+        rule_id = discounts_repo.add_rule(kind, percent, name, customer_id, sku, until_day)
+    except (ValueError, sqlite3.IntegrityError) as e:
+        typer.secho(str(e), fg="red"); raise typer.Exit(code=1)
+    typer.secho(f"Regla {rule_id} creada", fg="green")
+
+
+@app.command("discount-off")
+def discount_off(rule_id: int = typer.Argument(...), on: bool = typer.Option(False, "--on", help="Reactivar")):
+    """Desactiva (o reactiva con --on) una regla de descuento."""
+    from repos import discounts as discounts_repo
+    if not discounts_repo.set_active(rule_id, on):
+        typer.secho(f"No existe la regla {rule_id}", fg="red"); raise typer.Exit(code=1)
+    typer.secho(f"Regla {rule_id} {'activa' if on else 'desactivada'}", fg="green")
+
+
+@app.command("report")
+def report(
+    date_from: Optional[str] = typer.Option(None, "--from", help="YYYY-MM-DD (default: hoy)"),
+    date_to: Optional[str] = typer.Option(None, "--to", help="YYYY-MM-DD (default: --from)"),
+    as_json: bool = typer.Option(False, "--json", help="Salida JSON"),
+):
+    """Ventas del rango por día, vendedor, forma de pago y categoría (desde los resúmenes diarios)."""
+    import json
+    from repos import reports
+    date_from = date_from or datetime.now().strftime("%Y-%m-%d")
+    r = reports.daily(date_from, date_to or date_from)
+    if as_json:
+        typer.echo(json.dumps(r, ensure_ascii=False, indent=2)); return
+
+    typer.secho(f"Ventas {r['from']} a {r['to']}", bold=True)
+    for d in r["days"]:
+        typer.echo(f"  {d['day']}  {d['sales_count']:>5} ventas  {d['total']:>12,.2f}")
+    t = r["totals"]
+    typer.echo(f"  {'TOTAL':<10}  {t['sales_count']:>5} ventas  {t['total']:>12,.2f}  (cobrado {t['collected']:,.2f})")
+    for title, rows, label, amount in (("Por vendedor", r["by_seller"], "seller", "total"),
+                                       ("Por forma de pago", r["by_method"], "method", "amount"),
+                                       ("Por categoría", r["by_category"], "category", "total")):
+        typer.secho(title, bold=True)
+        for row in rows:
+            typer.echo(f"  {str(row[label]):<30} {row[amount]:>12,.2f}")
+
+
+@app.command("rebuild-reports")
+def rebuild_reports(check: bool = typer.Option(False, "--check", help="Sólo compara, no reescribe")):
+    """Recalcula los resúmenes diarios desde las ventas y reporta diferencias."""
+    from repos import reports
+    diffs = reports.rebuild(check_only=check)
+    bad = 0
+    for table, rows in diffs.items():
+        bad += len(rows)
+        for d in rows[:20]:
+            typer.secho(f"{table} {d['key']}: guardado={d['stored']} esperado={d['expected']}", fg="yellow")
+        if len(rows) > 20:
+            typer.secho(f"{table}: ... {len(rows) - 20} diferencias más", fg="yellow")
+    if not bad:
+        typer.secho("Resúmenes OK: coinciden con las ventas", fg="green")
+    elif check:
+        typer.secho(f"{bad} diferencias (sin cambios; correr sin --check para corregir)", fg="red")
+        raise typer.Exit(1)
     else:
-        conn.commit()
-        typer.secho(f"Import OK: inserts={inserts}, updates={updates}, errores={errors}", fg="green")
+        typer.secho(f"{bad} diferencias corregidas", fg="green")
+
+
+@app.command("export-sales")
+def export_sales(
+    out: Path = typer.Argument(..., help="Archivo destino: .csv (un tipo) o .xlsx (Ventas, Renglones y Pagos)"),
+    date_from: Optional[str] = typer.Option(None, "--from", help="YYYY-MM-DD (default: inicio del mes)"),
+    date_to: Optional[str] = typer.Option(None, "--to", help="YYYY-MM-DD (default: hoy)"),
+    kind: str = typer.Option("sales", "--kind", help="Para CSV: sales | items | payments"),
+):
+    """Extracto de ventas para contabilidad, en memoria constante."""
+    import time
+    from services import export_service
+    today = datetime.now()
+    date_from = date_from or today.strftime("%Y-%m-01")
+    date_to = date_to or today.strftime("%Y-%m-%d")
+    t0 = time.perf_counter()
+    try:
+        if out.suffix.lower() == ".xlsx":
+            if openpyxl is None:
+                typer.secho("Falta openpyxl. Instala con: pip install openpyxl", fg="red")
+                raise typer.Exit(1)
+            export_service.ventas_xlsx(out, date_from, date_to)
+        else:
+            with out.open("w", encoding="utf-8", newline="") as fh:
+                for part in export_service.ventas_csv(kind, date_from, date_to):
+                    fh.write(part)
+    except ValueError as e:
+        typer.secho(str(e), fg="red")
+        raise typer.Exit(1)
+    typer.secho(f"OK: {out} ({out.stat().st_size / 1e6:.1f} MB, {time.perf_counter() - t0:.1f} s)", fg="green")
+
+
+@app.command("check-plans")
+def check_plans(
+    out: Optional[Path] = typer.Option(None, "--out", help="Guardar el catálogo (SQL + plan) en JSON"),
+    verbose: bool = typer.Option(False, "-v", "--verbose", help="Mostrar el plan de todas las sentencias"),
+    keep_db: bool = typer.Option(False, "--keep-db", help="Conservar la BD sintética"),
+):
+    """EXPLAIN QUERY PLAN de cada sentencia que emite el app; falla si alguna recorre una tabla completa."""
+    import json
+    from bench import plans
+    result = plans.run(keep_db=keep_db)
+    for line in plans.report(result, verbose):
+        typer.echo(line)
+    if out:
+        out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        typer.echo(f"catálogo: {out}")
+    if result["failures"]:
+        raise typer.Exit(1)
+
+
+@app.command("serve")
+def serve(
+    host: str = typer.Option(SERVE_HOST),
+    port: int = typer.Option(SERVE_PORT),
+    threads: int = typer.Option(SERVE_THREADS, help="Hilos de waitress (= conexiones SQLite)"),
+    connection_limit: int = typer.Option(SERVE_CONNECTION_LIMIT, help="Conexiones HTTP simultáneas"),
+    channel_timeout: int = typer.Option(SERVE_CHANNEL_TIMEOUT, help="Segundos de inactividad antes de cerrar"),
+    warmup: bool = typer.Option(True, help="Calentar antes de aceptar tráfico"),
+):
+    """Servidor de producción (waitress) sobre create_app()."""
+    import logging
+    from waitress import serve as waitress_serve
+    from app import create_app
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    flask_app = create_app()
+    if warmup:
+        from services.warmup import warmup as do_warmup
+        steps = do_warmup(flask_app, connections=threads)
+        typer.echo("Warmup: " + ", ".join(f"{k}={v}ms" for k, v in steps.items()))
+    else:
+        flask_app.config["READY"] = True
+    typer.secho(f"Sirviendo en http://{host}:{port} (threads={threads}, "
+                f"connection_limit={connection_limit}, channel_timeout={channel_timeout}s)", fg="green")
+    waitress_serve(flask_app, host=host, port=port, threads=threads,
+                   connection_limit=connection_limit, channel_timeout=channel_timeout)
+
+
+@app.command("bench")
+def bench(
+    customers: int = typer.Option(2000, help="Alumnos sintéticos"),
+    products: int = typer.Option(2000, help="Productos sintéticos"),
+    sales: int = typer.Option(20000, help="Ventas históricas sintéticas"),
+    repeat: int = typer.Option(300, help="Repeticiones por caso"),
+    import_rows: int = typer.Option(2000, help="Filas del CSV para import-customers"),
+    out: Optional[Path] = typer.Option(None, help="Guarda el resultado JSON"),
+    baseline: Optional[Path] = typer.Option(None, help="Compara contra una corrida anterior"),
+    threshold: float = typer.Option(0.10, help="Empeoramiento tolerado (0.10 = 10%)"),
+    keep_db: bool = typer.Option(False, help="Conserva la BD temporal"),
+):
+    """Micro-benchmarks de las rutas calientes sobre una BD desechable (no toca DB_PATH)."""
+    import json
+    from bench.suite import run
+    result = run(customers, products, sales, repeat, import_rows, keep_db)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if out:
+        out.write_text(text, encoding="utf-8")
+        typer.secho(f"Resultado en {out}", fg="green")
+    else:
+        typer.echo(text)
+    if baseline:
+        _report_compare(json.loads(baseline.read_text(encoding="utf-8")), result, threshold)
+
+
+@app.command("bench-compare")
+def bench_compare(
+    old: Path = typer.Argument(..., help="Corrida base (JSON de cli.py bench)"),
+    new: Path = typer.Argument(..., help="Corrida nueva"),
+    threshold: float = typer.Option(0.10, help="Empeoramiento tolerado (0.10 = 10%)"),
+):
+    """Compara dos corridas de `bench`; sale con código 1 si hay regresiones."""
+    import json
+    _report_compare(json.loads(old.read_text(encoding="utf-8")),
+                    json.loads(new.read_text(encoding="utf-8")), threshold)
+
+
+def _report_compare(old: dict, new: dict, threshold: float) -> None:
+    from bench.suite import compare
+    rows = compare(old, new, threshold)
+    for r in rows:
+        metrics = "  ".join(f"{k}={v[0]}→{v[1]} (x{v[2]})" for k, v in r.items() if isinstance(v, list))
+        typer.secho(f"{'REGRESIÓN' if r['regression'] else 'ok':<10} {r['case']:<26} {metrics}",
+                    fg="red" if r["regression"] else None)
+    if any(r["regression"] for r in rows):
+        raise typer.Exit(1)
 
 
 @app.command("test-sale")
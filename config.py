@@ -10,9 +10,74 @@ DATA_DIR.mkdir(exist_ok=True)
 
 DB_PATH = os.getenv("DB_PATH", str(DATA_DIR / "app.db"))
 
+# Espera máxima de SQLite por un lock (ms) antes de regresar SQLITE_BUSY
+BUSY_TIMEOUT_MS = int(os.getenv("BUSY_TIMEOUT_MS", "3000"))
+
 # Ajustes de SQLite de robustez
 PRAGMAS_STARTUP = [
     "PRAGMA foreign_keys=ON;",
     "PRAGMA journal_mode=WAL;",
     "PRAGMA synchronous=FULL;",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS};",
+]
+# Carril de lectura (repos.base.read_conn): mode=ro + query_only
+PRAGMAS_READ = [
+    "PRAGMA query_only=ON;",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS};",
 ]
+
+# Reintentos de BEGIN IMMEDIATE si aun con busy_timeout sale SQLITE_BUSY
+# (backoff exponencial con jitter a partir de TX_BACKOFF_MS)
+TX_RETRIES = int(os.getenv("TX_RETRIES", "3"))
+TX_BACKOFF_MS = float(os.getenv("TX_BACKOFF_MS", "25"))
+
+# Caché en memoria del catálogo de productos (máximo de SKUs que se cargan completos)
+CATALOG_CACHE_MAX = int(os.getenv("CATALOG_CACHE_MAX", "20000"))
+
+# Group commit de ventas: un hilo escritor agrupa varias altas en una sola
+# transacción (un fsync por lote con synchronous=FULL). Desactivado por defecto.
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "0") == "1"
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "32"))
+GROUP_COMMIT_MAX_WAIT_MS = float(os.getenv("GROUP_COMMIT_MAX_WAIT_MS", "2"))
+
+# Serie de folios de esta caja/terminal (repos/folios.py); 'F' = serie histórica.
+# Cada caja que comparte la BD usa la suya: A-000001, B-000001, ...
+FOLIO_SERIES = os.getenv("FOLIO_SERIES", "F")
+
+# Carritos en borrador del lado del servidor (services/draft_service.py), uno
+# por terminal: LRU en memoria con vida máxima; DRAFT_PERSIST=1 los guarda en
+# draft_sales para que sobrevivan un reinicio.
+DRAFT_CACHE_MAX = int(os.getenv("DRAFT_CACHE_MAX", "256"))
+DRAFT_TTL_S = int(os.getenv("DRAFT_TTL_S", str(12 * 3600)))
+DRAFT_PERSIST = os.getenv("DRAFT_PERSIST", "1") == "1"
+
+# Impresoras de tickets (spooler). Formato: "nombre=uri,..." con uri
+#   tcp://HOST:PUERTO?paper=58[&status=0] | usb://VENDOR:PRODUCT | serial:///dev/ttyUSB0?baud=19200
+# La primera es la impresora por defecto.
+PRINTERS = os.getenv("PRINTERS", "")
+PRINT_QUEUE_SIZE = int(os.getenv("PRINT_QUEUE_SIZE", "50"))
+PRINT_MAX_RETRIES = int(os.getenv("PRINT_MAX_RETRIES", "5"))
+PRINT_BACKOFF_S = float(os.getenv("PRINT_BACKOFF_S", "0.5"))
+PRINT_TIMEOUT_S = float(os.getenv("PRINT_TIMEOUT_S", "5"))
+
+# Caché de tickets renderizados (HTML y ESC/POS), entradas por tipo
+TICKET_CACHE_MAX = int(os.getenv("TICKET_CACHE_MAX", "512"))
+
+# Servidor de producción (cli.py serve, waitress)
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+SERVE_THREADS = int(os.getenv("SERVE_THREADS", "8"))
+SERVE_CONNECTION_LIMIT = int(os.getenv("SERVE_CONNECTION_LIMIT", "100"))
+SERVE_CHANNEL_TIMEOUT = int(os.getenv("SERVE_CHANNEL_TIMEOUT", "120"))
+
+# Perfilado de SQL (repos.profiling) y umbral del log de consultas lentas
+SQL_PROFILE = os.getenv("SQL_PROFILE", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "50"))
+
+# Respaldos (cli.py backup / restore)
+BACKUP_DIR = Path(os.getenv("BACKUP_DIR", str(DATA_DIR / "backups")))
+BACKUP_COMPRESS = os.getenv("BACKUP_COMPRESS", "gzip")   # gzip | zstd | none
+BACKUP_PAGES = int(os.getenv("BACKUP_PAGES", "256"))     # páginas por paso
+BACKUP_SLEEP_MS = float(os.getenv("BACKUP_SLEEP_MS", "5"))  # pausa entre pasos
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "48"))         # respaldos recientes a conservar
+BACKUP_KEEP_DAILY = int(os.getenv("BACKUP_KEEP_DAILY", "14"))  # además, el último de cada día
@@ -2,22 +2,17 @@ from pathlib import Path
 import sqlite3
 from contextlib import closing
 from typing import Iterable
-from config import DB_PATH, PRAGMAS_STARTUP
-
-def _apply_pragmas(conn: sqlite3.Connection) -> None:
-    for q in PRAGMAS_STARTUP:
-        conn.execute(q)
+from config import DB_PATH
+from repos import base as db_base
 
 def execute_script(conn: sqlite3.Connection, sql: str) -> None:
     with closing(conn.cursor()) as cur:
         cur.executescript(sql)
     conn.commit()
 
-def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    _apply_pragmas(conn)
-    return conn
+def get_connection():
+    """Mismo pool que repos.base. Uso: `with get_connection() as conn:`"""
+    return db_base.get_conn()
 
 def init_db(schema_file: Path) -> None:
     sql = schema_file.read_text(encoding="utf-8")
@@ -0,0 +1,28 @@
+-- =========================================
+-- FTS5: índice de búsqueda de productos (sin acentos, por prefijo)
+-- =========================================
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+  sku, description,
+  content='products', content_rowid='rowid',
+  tokenize="unicode61 remove_diacritics 2",
+  prefix='2 3 4'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_products_fts_ai AFTER INSERT ON products
+BEGIN
+  INSERT INTO products_fts(rowid, sku, description) VALUES (NEW.rowid, NEW.sku, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_fts_ad AFTER DELETE ON products
+BEGIN
+  INSERT INTO products_fts(products_fts, rowid, sku, description) VALUES ('delete', OLD.rowid, OLD.sku, OLD.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_fts_au AFTER UPDATE OF sku, description ON products
+BEGIN
+  INSERT INTO products_fts(products_fts, rowid, sku, description) VALUES ('delete', OLD.rowid, OLD.sku, OLD.description);
+  INSERT INTO products_fts(rowid, sku, description) VALUES (NEW.rowid, NEW.sku, NEW.description);
+END;
+
+-- Indexa lo que ya existía antes de crear los triggers
+INSERT INTO products_fts(products_fts) VALUES ('rebuild');
@@ -0,0 +1,24 @@
+-- =========================================
+-- Versión del catálogo: la incrementan los triggers en cada cambio a products
+-- (cualquier proceso/conexión), así el caché en memoria sabe cuándo recargar.
+-- =========================================
+CREATE TABLE IF NOT EXISTS catalog_version (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO catalog_version(id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_ai AFTER INSERT ON products
+BEGIN
+  UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_au AFTER UPDATE ON products
+BEGIN
+  UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_ad AFTER DELETE ON products
+BEGIN
+  UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
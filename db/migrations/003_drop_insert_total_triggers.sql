@@ -0,0 +1,9 @@
+-- =========================================
+-- Totales por venta: trg_items_ai / trg_pay_ai re-agregaban toda la venta
+-- (4 subconsultas a v_sales_calc) por CADA renglón/pago insertado: O(n²)
+-- dentro del lock de escritura. Ahora repos.sales.refresh_totals hace una
+-- sola pasada por venta después de insertar renglones y pagos.
+-- Los triggers de UPDATE/DELETE se conservan para ediciones manuales.
+-- =========================================
+DROP TRIGGER IF EXISTS trg_items_ai;
+DROP TRIGGER IF EXISTS trg_pay_ai;
@@ -0,0 +1,6 @@
+-- =========================================
+-- Llave de idempotencia por venta (alta masiva / reenvíos sin duplicados)
+-- =========================================
+ALTER TABLE sales ADD COLUMN idempotency_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_idempotency
+  ON sales(idempotency_key) WHERE idempotency_key IS NOT NULL;
@@ -0,0 +1,32 @@
+-- =========================================
+-- FTS5: búsqueda de alumnos por matrícula, nombre, CURP y referencia de pago
+-- =========================================
+CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+  enrollment, first_name, second_name, curp, pay_reference,
+  content='customers', content_rowid='id',
+  tokenize="unicode61 remove_diacritics 2",
+  prefix='2 3 4'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_fts_ai AFTER INSERT ON customers
+BEGIN
+  INSERT INTO customers_fts(rowid, enrollment, first_name, second_name, curp, pay_reference)
+  VALUES (NEW.id, NEW.enrollment, NEW.first_name, NEW.second_name, NEW.curp, NEW.pay_reference);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_fts_ad AFTER DELETE ON customers
+BEGIN
+  INSERT INTO customers_fts(customers_fts, rowid, enrollment, first_name, second_name, curp, pay_reference)
+  VALUES ('delete', OLD.id, OLD.enrollment, OLD.first_name, OLD.second_name, OLD.curp, OLD.pay_reference);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_fts_au
+AFTER UPDATE OF enrollment, first_name, second_name, curp, pay_reference ON customers
+BEGIN
+  INSERT INTO customers_fts(customers_fts, rowid, enrollment, first_name, second_name, curp, pay_reference)
+  VALUES ('delete', OLD.id, OLD.enrollment, OLD.first_name, OLD.second_name, OLD.curp, OLD.pay_reference);
+  INSERT INTO customers_fts(rowid, enrollment, first_name, second_name, curp, pay_reference)
+  VALUES (NEW.id, NEW.enrollment, NEW.first_name, NEW.second_name, NEW.curp, NEW.pay_reference);
+END;
+
+INSERT INTO customers_fts(customers_fts) VALUES ('rebuild');
@@ -0,0 +1,14 @@
+-- =========================================
+-- Marca de cambio por venta (caché de tickets / ETag)
+-- Toda modificación de una venta pasa por un UPDATE de sales (totales,
+-- payment_status), así que basta un trigger sobre sales.
+-- =========================================
+ALTER TABLE sales ADD COLUMN rev INTEGER NOT NULL DEFAULT 0;
+
+CREATE TRIGGER IF NOT EXISTS trg_sales_rev
+AFTER UPDATE ON sales
+FOR EACH ROW
+WHEN NEW.rev IS OLD.rev
+BEGIN
+  UPDATE sales SET rev = OLD.rev + 1 WHERE id = NEW.id;
+END;
@@ -0,0 +1,56 @@
+-- =========================================
+-- RESÚMENES DIARIOS (se actualizan en la misma transacción que create_sale;
+-- ver repos.reports; `cli.py rebuild-reports` los recalcula y compara)
+-- =========================================
+CREATE TABLE IF NOT EXISTS daily_seller (
+  day TEXT NOT NULL,                     -- 'YYYY-MM-DD' de sales.created_at
+  seller_id INTEGER NOT NULL DEFAULT 0,  -- 0 = sin vendedor registrado
+  seller TEXT NOT NULL,
+  sales_count    INTEGER NOT NULL DEFAULT 0,
+  subtotal       REAL NOT NULL DEFAULT 0,
+  discount_total REAL NOT NULL DEFAULT 0,
+  tax_total      REAL NOT NULL DEFAULT 0,
+  total          REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, seller_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_payment (
+  day TEXT NOT NULL,                     -- de payments.created_at
+  method TEXT NOT NULL,
+  payments_count INTEGER NOT NULL DEFAULT 0,
+  amount REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, method)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_product (
+  day TEXT NOT NULL,
+  category_id INTEGER NOT NULL DEFAULT 0,  -- categoría del producto al vender; 0 = sin categoría
+  sku TEXT NOT NULL DEFAULT '',            -- '' = renglón libre
+  lines    INTEGER NOT NULL DEFAULT 0,
+  qty      REAL NOT NULL DEFAULT 0,
+  subtotal REAL NOT NULL DEFAULT 0,
+  discount REAL NOT NULL DEFAULT 0,
+  tax      REAL NOT NULL DEFAULT 0,
+  total    REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, category_id, sku)
+) WITHOUT ROWID;
+
+-- Ventas ya existentes
+INSERT INTO daily_seller(day, seller_id, seller, sales_count, subtotal, discount_total, tax_total, total)
+SELECT substr(s.created_at, 1, 10), COALESCE(s.seller_id, 0), MAX(s.seller), COUNT(*),
+       SUM(s.subtotal), SUM(s.discount_total), SUM(s.tax_total), SUM(s.total)
+FROM sales s
+GROUP BY 1, 2;
+INSERT INTO daily_payment(day, method, payments_count, amount)
+SELECT substr(p.created_at, 1, 10), p.method, COUNT(*), SUM(p.amount)
+FROM payments p
+GROUP BY 1, 2;
+INSERT INTO daily_product(day, category_id, sku, lines, qty, subtotal, discount, tax, total)
+SELECT substr(s.created_at, 1, 10), COALESCE(pr.category_id, 0), COALESCE(si.sku, ''),
+       COUNT(*), SUM(si.qty), SUM(si.qty*si.unit_price), SUM(si.discount),
+       SUM(((si.qty*si.unit_price)-si.discount)*si.tax_rate),
+       SUM(((si.qty*si.unit_price)-si.discount) + (((si.qty*si.unit_price)-si.discount)*si.tax_rate))
+FROM sale_items si
+JOIN sales s ON s.id = si.sale_id
+LEFT JOIN products pr ON pr.sku = si.sku
+GROUP BY 1, 2, 3;
@@ -0,0 +1,32 @@
+-- =========================================
+-- Estado de cuenta por alumno (cargos y abonos paginados por fecha)
+-- payments.customer_id: copia de sales.customer_id para recorrer los abonos
+-- de un alumno por índice sin pasar por todas sus ventas.
+-- =========================================
+ALTER TABLE payments ADD COLUMN customer_id INTEGER REFERENCES customers(id);
+
+UPDATE payments SET customer_id = (SELECT s.customer_id FROM sales s WHERE s.id = payments.sale_id);
+
+-- Índices de cobertura: página por (created_at, id) y saldo sin tocar la tabla
+CREATE INDEX IF NOT EXISTS idx_sales_customer_created
+  ON sales(customer_id, created_at, id, total);
+CREATE INDEX IF NOT EXISTS idx_payments_customer_created
+  ON payments(customer_id, created_at, id, amount) WHERE customer_id IS NOT NULL;
+
+-- repos.sales ya inserta el customer_id; esto cubre otras rutas de alta
+CREATE TRIGGER IF NOT EXISTS trg_payments_customer
+AFTER INSERT ON payments
+FOR EACH ROW
+WHEN NEW.customer_id IS NULL
+BEGIN
+  UPDATE payments SET customer_id = (SELECT customer_id FROM sales WHERE id = NEW.sale_id)
+  WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sales_customer_payments
+AFTER UPDATE OF customer_id ON sales
+FOR EACH ROW
+WHEN NEW.customer_id IS NOT OLD.customer_id
+BEGIN
+  UPDATE payments SET customer_id = NEW.customer_id WHERE sale_id = NEW.id;
+END;
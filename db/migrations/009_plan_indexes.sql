@@ -0,0 +1,15 @@
+-- =========================================
+-- Índices para las consultas del catálogo de planes (cli.py check-plans)
+-- Parciales sobre active=1: los listados no tocan registros dados de baja
+-- y salen ya ordenados.
+-- =========================================
+CREATE INDEX IF NOT EXISTS idx_customers_salon_activos
+  ON customers(grade_id, group_id, shift_id, second_name, first_name) WHERE active=1;
+CREATE INDEX IF NOT EXISTS idx_customers_nombre_activos
+  ON customers(second_name, first_name) WHERE active=1;
+CREATE INDEX IF NOT EXISTS idx_sellers_activos ON sellers(first_name, second_name) WHERE active=1;
+CREATE INDEX IF NOT EXISTS idx_products_activos ON products(description) WHERE active=1;
+
+-- sale_items.sku → products(sku): con foreign_keys=ON cada cambio o baja de
+-- un producto revisaba sale_items completa
+CREATE INDEX IF NOT EXISTS idx_sale_items_sku ON sale_items(sku);
@@ -0,0 +1,66 @@
+-- =========================================
+-- Pagos divididos y abonos posteriores
+-- sales.paid_total se mantiene por delta en cada INSERT/UPDATE/DELETE de
+-- payments: payment_status ya no re-agrega los pagos (antes trg_pay_au /
+-- trg_pay_ad consultaban v_sales_paid dos veces por pago).
+-- payments.tendered: efectivo recibido (amount es lo aplicado; el cambio es
+-- tendered - amount).
+-- Tolerancia de medio centavo: total no está redondeado y los pagos sí.
+-- =========================================
+ALTER TABLE sales ADD COLUMN paid_total REAL NOT NULL DEFAULT 0;
+ALTER TABLE payments ADD COLUMN tendered REAL;
+
+UPDATE sales SET paid_total = COALESCE((SELECT SUM(p.amount) FROM payments p WHERE p.sale_id = sales.id), 0);
+UPDATE sales SET payment_status = CASE
+    WHEN paid_total > 0 AND paid_total + 0.005 >= total THEN 'paid'
+    WHEN paid_total > 0 THEN 'partial'
+    ELSE 'unpaid'
+  END;
+
+DROP TRIGGER IF EXISTS trg_pay_au;
+DROP TRIGGER IF EXISTS trg_pay_ad;
+
+CREATE TRIGGER IF NOT EXISTS trg_pay_ai AFTER INSERT ON payments
+BEGIN
+  UPDATE sales SET
+    paid_total = paid_total + NEW.amount,
+    payment_status = CASE
+      WHEN paid_total + NEW.amount > 0 AND paid_total + NEW.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total + NEW.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END
+  WHERE id = NEW.sale_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_pay_au AFTER UPDATE OF sale_id, amount ON payments
+WHEN NEW.amount IS NOT OLD.amount OR NEW.sale_id IS NOT OLD.sale_id
+BEGIN
+  UPDATE sales SET
+    paid_total = paid_total - OLD.amount,
+    payment_status = CASE
+      WHEN paid_total - OLD.amount > 0 AND paid_total - OLD.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total - OLD.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END
+  WHERE id = OLD.sale_id;
+  UPDATE sales SET
+    paid_total = paid_total + NEW.amount,
+    payment_status = CASE
+      WHEN paid_total + NEW.amount > 0 AND paid_total + NEW.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total + NEW.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END
+  WHERE id = NEW.sale_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_pay_ad AFTER DELETE ON payments
+BEGIN
+  UPDATE sales SET
+    paid_total = paid_total - OLD.amount,
+    payment_status = CASE
+      WHEN paid_total - OLD.amount > 0 AND paid_total - OLD.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total - OLD.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END
+  WHERE id = OLD.sale_id;
+END;
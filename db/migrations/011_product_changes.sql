@@ -0,0 +1,48 @@
+-- =========================================
+-- Bitácora de cambios del catálogo para sincronizar clientes por delta
+-- (/api/catalog/changes?since=). Una fila por SKU con la versión de
+-- catalog_version de su último cambio; los borrados y renombres dejan
+-- deleted=1. Acotada al número de SKUs: no hay que purgarla.
+-- Los triggers de versión (002) se reemplazan para escribirla en la misma
+-- transacción que el cambio.
+-- =========================================
+DROP TRIGGER IF EXISTS trg_products_version_ai;
+DROP TRIGGER IF EXISTS trg_products_version_au;
+DROP TRIGGER IF EXISTS trg_products_version_ad;
+
+CREATE TABLE IF NOT EXISTS product_changes (
+  sku TEXT PRIMARY KEY,
+  version INTEGER NOT NULL,
+  deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_product_changes_version ON product_changes(version);
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_ai AFTER INSERT ON products
+BEGIN
+  UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+  INSERT INTO product_changes(sku, version, deleted)
+  SELECT NEW.sku, version, 0 FROM catalog_version WHERE id = 1
+  ON CONFLICT(sku) DO UPDATE SET version = excluded.version, deleted = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_au AFTER UPDATE ON products
+BEGIN
+  UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+  INSERT INTO product_changes(sku, version, deleted)
+  SELECT OLD.sku, version, 1 FROM catalog_version WHERE id = 1 AND OLD.sku <> NEW.sku
+  ON CONFLICT(sku) DO UPDATE SET version = excluded.version, deleted = 1;
+  INSERT INTO product_changes(sku, version, deleted)
+  SELECT NEW.sku, version, 0 FROM catalog_version WHERE id = 1
+  ON CONFLICT(sku) DO UPDATE SET version = excluded.version, deleted = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_ad AFTER DELETE ON products
+BEGIN
+  UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+  INSERT INTO product_changes(sku, version, deleted)
+  SELECT OLD.sku, version, 1 FROM catalog_version WHERE id = 1
+  ON CONFLICT(sku) DO UPDATE SET version = excluded.version, deleted = 1;
+END;
+
+INSERT OR IGNORE INTO product_changes(sku, version, deleted)
+SELECT sku, (SELECT version FROM catalog_version WHERE id = 1), 0 FROM products;
@@ -0,0 +1,19 @@
+-- =========================================
+-- Folios por serie (una por caja/terminal), asignados en el mismo INSERT de
+-- la venta: reemplaza a trg_sales_set_folio, que hacía un UPDATE extra por
+-- venta ('F' || printf('%04d', id)) y obligaba a releer el folio.
+-- `next` es el siguiente número libre; repos/folios.py lo aparta (uno o un
+-- rango) dentro de la transacción de escritura de las ventas.
+-- La serie 'F' continúa la numeración de los folios existentes.
+-- =========================================
+CREATE TABLE IF NOT EXISTS folio_series (
+  series TEXT PRIMARY KEY,
+  prefix TEXT NOT NULL,
+  width  INTEGER NOT NULL DEFAULT 6 CHECK (width BETWEEN 1 AND 12),
+  next   INTEGER NOT NULL DEFAULT 1 CHECK (next >= 1)
+);
+
+INSERT OR IGNORE INTO folio_series(series, prefix, width, next)
+VALUES ('F', 'F', 4, COALESCE((SELECT max(id) FROM sales), 0) + 1);
+
+DROP TRIGGER IF EXISTS trg_sales_set_folio;
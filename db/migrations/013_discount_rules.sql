@@ -0,0 +1,89 @@
+-- =========================================
+-- Descuentos de la escuela (beca, hermanos, pronto pago) compilados en
+-- memoria por repos/discounts.py y aplicados por pricing.py al cotizar.
+-- v_sales_calc pasa a sumar line_total (lo calcula pricing.line al guardar)
+-- en lugar de repetir la fórmula del importe.
+-- =========================================
+-- Reglas de descuento (repos/discounts.py las compila a tablas en memoria):
+--   scholarship   beca de un alumno (customer_id)
+--   sibling       hermanos: del segundo alumno activo con los mismos papás en adelante
+--   early_payment pronto pago: hasta el día `until_day` del mes
+-- sku NULL = todos los productos. Por renglón se toma la mejor regla de cada
+-- tipo y los tipos se suman (tope 100%).
+CREATE TABLE IF NOT EXISTS discount_rules (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL CHECK (kind IN ('scholarship','sibling','early_payment')),
+  name TEXT NOT NULL,
+  percent REAL NOT NULL CHECK (percent > 0 AND percent <= 100),
+  customer_id INTEGER REFERENCES customers(id) ON DELETE CASCADE,
+  sku TEXT,
+  until_day INTEGER CHECK (until_day BETWEEN 1 AND 31),
+  active INTEGER NOT NULL DEFAULT 1,
+  created_at TEXT NOT NULL DEFAULT (datetime('now','localtime')),
+  CHECK ((kind = 'scholarship') = (customer_id IS NOT NULL)),
+  CHECK ((kind = 'early_payment') = (until_day IS NOT NULL))
+);
+CREATE INDEX IF NOT EXISTS idx_discount_rules_customer ON discount_rules(customer_id);
+
+-- Versión de las reglas (invalida el caché de repos/discounts.py): cambia con
+-- discount_rules y con lo que define hermanos en customers
+CREATE TABLE IF NOT EXISTS pricing_version (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO pricing_version(id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_discount_rules_ai AFTER INSERT ON discount_rules
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_discount_rules_au AFTER UPDATE ON discount_rules
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_discount_rules_ad AFTER DELETE ON discount_rules
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_pricing_ai AFTER INSERT ON customers
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_pricing_au
+AFTER UPDATE OF active, fullname_mom, fullname_dad ON customers
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_pricing_ad AFTER DELETE ON customers
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+DROP VIEW IF EXISTS v_sales_calc;
+CREATE VIEW v_sales_calc AS
+SELECT
+  s.id AS sale_id,
+  COALESCE(SUM((si.qty*si.unit_price)),0) AS sub,
+  COALESCE(SUM(si.discount),0) AS disc,
+  COALESCE(SUM(((si.qty*si.unit_price)-si.discount)*si.tax_rate),0) AS iva,
+  COALESCE(SUM(si.line_total),0) AS tot
+FROM sales s
+LEFT JOIN sale_items si ON si.sale_id = s.id
+GROUP BY s.id;
+
+-- daily_product.total también es la suma de line_total (repos/reports.py); lo
+-- acumulado con la fórmula anterior se recalcula desde sale_items
+DELETE FROM daily_product;
+INSERT INTO daily_product(day, category_id, sku, lines, qty, subtotal, discount, tax, total)
+SELECT substr(s.created_at, 1, 10), COALESCE(pr.category_id, 0), COALESCE(si.sku, ''),
+       COUNT(*), SUM(si.qty), SUM(si.qty*si.unit_price), SUM(si.discount),
+       SUM(((si.qty*si.unit_price)-si.discount)*si.tax_rate), SUM(si.line_total)
+FROM sale_items si
+JOIN sales s ON s.id = si.sale_id
+LEFT JOIN products pr ON pr.sku = si.sku
+GROUP BY 1, 2, 3;
@@ -0,0 +1,13 @@
+-- =========================================
+-- Carritos en borrador del lado del servidor (uno por terminal)
+-- =========================================
+-- Carritos en borrador por terminal (services/draft_service.py): encabezado y
+-- renglones en JSON, reescritos en cada cambio; sobreviven un reinicio. Los
+-- que pasan de DRAFT_TTL_S sin cambios se descartan.
+CREATE TABLE IF NOT EXISTS draft_sales (
+  terminal TEXT PRIMARY KEY,
+  data TEXT NOT NULL,
+  rev INTEGER NOT NULL DEFAULT 0,
+  updated_at TEXT NOT NULL DEFAULT (datetime('now','localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_draft_sales_updated ON draft_sales(updated_at);
@@ -0,0 +1,87 @@
+-- =========================================
+-- sales.rev sin trigger propio
+-- trg_sales_rev (006) hacía un segundo UPDATE de la fila por cada UPDATE de
+-- sales. Ahora cada UPDATE que modifica una venta sube rev en la misma
+-- sentencia: repos.sales (REFRESH_TOTALS_SQL / REFRESH_PAYMENT_STATUS_SQL),
+-- los triggers de payments y los de sale_items.
+-- =========================================
+DROP TRIGGER IF EXISTS trg_sales_rev;
+
+DROP TRIGGER IF EXISTS trg_pay_ai;
+DROP TRIGGER IF EXISTS trg_pay_au;
+DROP TRIGGER IF EXISTS trg_pay_ad;
+
+CREATE TRIGGER trg_pay_ai AFTER INSERT ON payments
+BEGIN
+  UPDATE sales SET
+    paid_total = paid_total + NEW.amount,
+    payment_status = CASE
+      WHEN paid_total + NEW.amount > 0 AND paid_total + NEW.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total + NEW.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END,
+    rev = rev + 1
+  WHERE id = NEW.sale_id;
+END;
+
+CREATE TRIGGER trg_pay_au AFTER UPDATE OF sale_id, amount ON payments
+WHEN NEW.amount IS NOT OLD.amount OR NEW.sale_id IS NOT OLD.sale_id
+BEGIN
+  UPDATE sales SET
+    paid_total = paid_total - OLD.amount,
+    payment_status = CASE
+      WHEN paid_total - OLD.amount > 0 AND paid_total - OLD.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total - OLD.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END,
+    rev = rev + 1
+  WHERE id = OLD.sale_id;
+  UPDATE sales SET
+    paid_total = paid_total + NEW.amount,
+    payment_status = CASE
+      WHEN paid_total + NEW.amount > 0 AND paid_total + NEW.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total + NEW.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END,
+    rev = rev + 1
+  WHERE id = NEW.sale_id;
+END;
+
+CREATE TRIGGER trg_pay_ad AFTER DELETE ON payments
+BEGIN
+  UPDATE sales SET
+    paid_total = paid_total - OLD.amount,
+    payment_status = CASE
+      WHEN paid_total - OLD.amount > 0 AND paid_total - OLD.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total - OLD.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END,
+    rev = rev + 1
+  WHERE id = OLD.sale_id;
+END;
+
+-- los de sale_items pasan a vivir aquí (usan rev, columna de 006)
+DROP TRIGGER IF EXISTS trg_items_au;
+DROP TRIGGER IF EXISTS trg_items_ad;
+
+CREATE TRIGGER trg_items_au AFTER UPDATE ON sale_items
+BEGIN
+  UPDATE sales
+  SET subtotal       = (SELECT sub  FROM v_sales_calc WHERE sale_id = NEW.sale_id),
+      discount_total = (SELECT disc FROM v_sales_calc WHERE sale_id = NEW.sale_id),
+      tax_total      = (SELECT iva  FROM v_sales_calc WHERE sale_id = NEW.sale_id),
+      total          = (SELECT tot  FROM v_sales_calc WHERE sale_id = NEW.sale_id),
+      rev            = rev + 1
+  WHERE id = NEW.sale_id;
+END;
+
+CREATE TRIGGER trg_items_ad AFTER DELETE ON sale_items
+BEGIN
+  UPDATE sales
+  SET subtotal       = (SELECT sub  FROM v_sales_calc WHERE sale_id = OLD.sale_id),
+      discount_total = (SELECT disc FROM v_sales_calc WHERE sale_id = OLD.sale_id),
+      tax_total      = (SELECT iva  FROM v_sales_calc WHERE sale_id = OLD.sale_id),
+      total          = (SELECT tot  FROM v_sales_calc WHERE sale_id = OLD.sale_id),
+      rev            = rev + 1
+  WHERE id = OLD.sale_id;
+END;
@@ -0,0 +1,62 @@
+-- =========================================
+-- payment_status de ventas en cero
+-- Con la guarda paid_total > 0 (010/015) una venta con total 0 (beca del
+-- 100 %) se quedaba 'unpaid' para siempre. Ahora basta paid_total + 0.005 >=
+-- total; igual que REFRESH_PAYMENT_STATUS_SQL en repos.sales.
+-- =========================================
+DROP TRIGGER IF EXISTS trg_pay_ai;
+DROP TRIGGER IF EXISTS trg_pay_au;
+DROP TRIGGER IF EXISTS trg_pay_ad;
+
+CREATE TRIGGER trg_pay_ai AFTER INSERT ON payments
+BEGIN
+  UPDATE sales SET
+    paid_total = paid_total + NEW.amount,
+    payment_status = CASE
+      WHEN paid_total + NEW.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total + NEW.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END,
+    rev = rev + 1
+  WHERE id = NEW.sale_id;
+END;
+
+CREATE TRIGGER trg_pay_au AFTER UPDATE OF sale_id, amount ON payments
+WHEN NEW.amount IS NOT OLD.amount OR NEW.sale_id IS NOT OLD.sale_id
+BEGIN
+  UPDATE sales SET
+    paid_total = paid_total - OLD.amount,
+    payment_status = CASE
+      WHEN paid_total - OLD.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total - OLD.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END,
+    rev = rev + 1
+  WHERE id = OLD.sale_id;
+  UPDATE sales SET
+    paid_total = paid_total + NEW.amount,
+    payment_status = CASE
+      WHEN paid_total + NEW.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total + NEW.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END,
+    rev = rev + 1
+  WHERE id = NEW.sale_id;
+END;
+
+CREATE TRIGGER trg_pay_ad AFTER DELETE ON payments
+BEGIN
+  UPDATE sales SET
+    paid_total = paid_total - OLD.amount,
+    payment_status = CASE
+      WHEN paid_total - OLD.amount + 0.005 >= total THEN 'paid'
+      WHEN paid_total - OLD.amount > 0 THEN 'partial'
+      ELSE 'unpaid'
+    END,
+    rev = rev + 1
+  WHERE id = OLD.sale_id;
+END;
+
+-- ventas ya guardadas en cero que quedaron 'unpaid'
+UPDATE sales SET payment_status = 'paid', rev = rev + 1
+WHERE payment_status <> 'paid' AND paid_total + 0.005 >= total;
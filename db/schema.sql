@@ -72,6 +72,38 @@ END;
 CREATE INDEX IF NOT EXISTS idx_customers_enrollment ON customers(enrollment);
 CREATE INDEX IF NOT EXISTS idx_customers_nombre     ON customers(second_name, first_name);
 CREATE INDEX IF NOT EXISTS idx_customers_salon      ON customers(grade_id, group_id, shift_id);
+CREATE INDEX IF NOT EXISTS idx_customers_salon_activos
+  ON customers(grade_id, group_id, shift_id, second_name, first_name) WHERE active=1;
+CREATE INDEX IF NOT EXISTS idx_customers_nombre_activos ON customers(second_name, first_name) WHERE active=1;
+
+-- Búsqueda de alumnos (typeahead de venta) sincronizada por triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+  enrollment, first_name, second_name, curp, pay_reference,
+  content='customers', content_rowid='id',
+  tokenize="unicode61 remove_diacritics 2",
+  prefix='2 3 4'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_fts_ai AFTER INSERT ON customers
+BEGIN
+  INSERT INTO customers_fts(rowid, enrollment, first_name, second_name, curp, pay_reference)
+  VALUES (NEW.id, NEW.enrollment, NEW.first_name, NEW.second_name, NEW.curp, NEW.pay_reference);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_fts_ad AFTER DELETE ON customers
+BEGIN
+  INSERT INTO customers_fts(customers_fts, rowid, enrollment, first_name, second_name, curp, pay_reference)
+  VALUES ('delete', OLD.id, OLD.enrollment, OLD.first_name, OLD.second_name, OLD.curp, OLD.pay_reference);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_fts_au
+AFTER UPDATE OF enrollment, first_name, second_name, curp, pay_reference ON customers
+BEGIN
+  INSERT INTO customers_fts(customers_fts, rowid, enrollment, first_name, second_name, curp, pay_reference)
+  VALUES ('delete', OLD.id, OLD.enrollment, OLD.first_name, OLD.second_name, OLD.curp, OLD.pay_reference);
+  INSERT INTO customers_fts(rowid, enrollment, first_name, second_name, curp, pay_reference)
+  VALUES (NEW.id, NEW.enrollment, NEW.first_name, NEW.second_name, NEW.curp, NEW.pay_reference);
+END;
 
 -- =========================================
 -- TABLA: sellers (vendedores)
@@ -97,6 +129,7 @@ FOR EACH ROW BEGIN
 END;
 
 CREATE INDEX IF NOT EXISTS idx_sellers_nombre ON sellers(second_name, first_name);
+CREATE INDEX IF NOT EXISTS idx_sellers_activos ON sellers(first_name, second_name) WHERE active=1;
 
 -- =========================================
 -- CATÁLOGO: categories y products
@@ -119,6 +152,137 @@ CREATE TABLE IF NOT EXISTS products (
 );
 
 CREATE INDEX IF NOT EXISTS idx_products_desc ON products(description);
+CREATE INDEX IF NOT EXISTS idx_products_activos ON products(description) WHERE active=1;
+
+-- Búsqueda de texto (sin acentos, por prefijo) sincronizada por triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+  sku, description,
+  content='products', content_rowid='rowid',
+  tokenize="unicode61 remove_diacritics 2",
+  prefix='2 3 4'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_products_fts_ai AFTER INSERT ON products
+BEGIN
+  INSERT INTO products_fts(rowid, sku, description) VALUES (NEW.rowid, NEW.sku, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_fts_ad AFTER DELETE ON products
+BEGIN
+  INSERT INTO products_fts(products_fts, rowid, sku, description) VALUES ('delete', OLD.rowid, OLD.sku, OLD.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_fts_au AFTER UPDATE OF sku, description ON products
+BEGIN
+  INSERT INTO products_fts(products_fts, rowid, sku, description) VALUES ('delete', OLD.rowid, OLD.sku, OLD.description);
+  INSERT INTO products_fts(rowid, sku, description) VALUES (NEW.rowid, NEW.sku, NEW.description);
+END;
+
+-- Versión del catálogo (invalida el caché en memoria de repos/catalog.py)
+CREATE TABLE IF NOT EXISTS catalog_version (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO catalog_version(id, version) VALUES (1, 0);
+
+-- Última versión en que cambió cada SKU (tombstone con deleted=1): delta
+-- para los clientes que guardan el catálogo (/api/catalog/changes?since=)
+CREATE TABLE IF NOT EXISTS product_changes (
+  sku TEXT PRIMARY KEY,
+  version INTEGER NOT NULL,
+  deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_product_changes_version ON product_changes(version);
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_ai AFTER INSERT ON products
+BEGIN
+  UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+  INSERT INTO product_changes(sku, version, deleted)
+  SELECT NEW.sku, version, 0 FROM catalog_version WHERE id = 1
+  ON CONFLICT(sku) DO UPDATE SET version = excluded.version, deleted = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_au AFTER UPDATE ON products
+BEGIN
+  UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+  INSERT INTO product_changes(sku, version, deleted)
+  SELECT OLD.sku, version, 1 FROM catalog_version WHERE id = 1 AND OLD.sku <> NEW.sku
+  ON CONFLICT(sku) DO UPDATE SET version = excluded.version, deleted = 1;
+  INSERT INTO product_changes(sku, version, deleted)
+  SELECT NEW.sku, version, 0 FROM catalog_version WHERE id = 1
+  ON CONFLICT(sku) DO UPDATE SET version = excluded.version, deleted = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_ad AFTER DELETE ON products
+BEGIN
+  UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+  INSERT INTO product_changes(sku, version, deleted)
+  SELECT OLD.sku, version, 1 FROM catalog_version WHERE id = 1
+  ON CONFLICT(sku) DO UPDATE SET version = excluded.version, deleted = 1;
+END;
+
+-- =========================================
+-- DESCUENTOS: discount_rules + pricing_version
+-- =========================================
+-- Reglas de descuento (repos/discounts.py las compila a tablas en memoria):
+--   scholarship   beca de un alumno (customer_id)
+--   sibling       hermanos: del segundo alumno activo con los mismos papás en adelante
+--   early_payment pronto pago: hasta el día `until_day` del mes
+-- sku NULL = todos los productos. Por renglón se toma la mejor regla de cada
+-- tipo y los tipos se suman (tope 100%).
+CREATE TABLE IF NOT EXISTS discount_rules (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL CHECK (kind IN ('scholarship','sibling','early_payment')),
+  name TEXT NOT NULL,
+  percent REAL NOT NULL CHECK (percent > 0 AND percent <= 100),
+  customer_id INTEGER REFERENCES customers(id) ON DELETE CASCADE,
+  sku TEXT,
+  until_day INTEGER CHECK (until_day BETWEEN 1 AND 31),
+  active INTEGER NOT NULL DEFAULT 1,
+  created_at TEXT NOT NULL DEFAULT (datetime('now','localtime')),
+  CHECK ((kind = 'scholarship') = (customer_id IS NOT NULL)),
+  CHECK ((kind = 'early_payment') = (until_day IS NOT NULL))
+);
+CREATE INDEX IF NOT EXISTS idx_discount_rules_customer ON discount_rules(customer_id);
+
+-- Versión de las reglas (invalida el caché de repos/discounts.py): cambia con
+-- discount_rules y con lo que define hermanos en customers
+CREATE TABLE IF NOT EXISTS pricing_version (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO pricing_version(id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_discount_rules_ai AFTER INSERT ON discount_rules
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_discount_rules_au AFTER UPDATE ON discount_rules
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_discount_rules_ad AFTER DELETE ON discount_rules
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_pricing_ai AFTER INSERT ON customers
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_pricing_au
+AFTER UPDATE OF active, fullname_mom, fullname_dad ON customers
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_pricing_ad AFTER DELETE ON customers
+BEGIN
+  UPDATE pricing_version SET version = version + 1 WHERE id = 1;
+END;
 
 -- =========================================
 -- TABLA: sales
@@ -138,21 +302,38 @@ CREATE TABLE IF NOT EXISTS sales (
   payment_status  TEXT NOT NULL DEFAULT 'unpaid',
   created_at TEXT NOT NULL DEFAULT (datetime('now','localtime'))
 );
+-- Columnas agregadas después viven en db/migrations (ALTER TABLE no es
+-- idempotente): idempotency_key (004), rev (006; la suben los UPDATE de sales, 015).
 
--- Trigger: asigna folio automático
-CREATE TRIGGER IF NOT EXISTS trg_sales_set_folio
-AFTER INSERT ON sales
-FOR EACH ROW
-WHEN NEW.folio IS NULL
-BEGIN
-  UPDATE sales
-  SET folio = 'F' || printf('%04d', NEW.id)
-  WHERE id = NEW.id;
-END;
+-- Folio: lo asigna repos/folios.py en el mismo INSERT, por serie (caja/terminal)
+CREATE TABLE IF NOT EXISTS folio_series (
+  series TEXT PRIMARY KEY,
+  prefix TEXT NOT NULL,
+  width  INTEGER NOT NULL DEFAULT 6 CHECK (width BETWEEN 1 AND 12),
+  next   INTEGER NOT NULL DEFAULT 1 CHECK (next >= 1)
+);
+-- serie por defecto; continúa los folios 'F' || id de antes de la migración 012
+INSERT OR IGNORE INTO folio_series(series, prefix, width, next)
+VALUES ('F', 'F', 4, COALESCE((SELECT max(id) FROM sales), 0) + 1);
 
 CREATE INDEX IF NOT EXISTS idx_sales_customer ON sales(customer_id);
 CREATE INDEX IF NOT EXISTS idx_sales_seller   ON sales(seller_id);
 CREATE INDEX IF NOT EXISTS idx_sales_created  ON sales(created_at);
+CREATE INDEX IF NOT EXISTS idx_sales_customer_created ON sales(customer_id, created_at, id, total);
+
+-- =========================================
+-- TABLA: draft_sales
+-- =========================================
+-- Carritos en borrador por terminal (services/draft_service.py): encabezado y
+-- renglones en JSON, reescritos en cada cambio; sobreviven un reinicio. Los
+-- que pasan de DRAFT_TTL_S sin cambios se descartan.
+CREATE TABLE IF NOT EXISTS draft_sales (
+  terminal TEXT PRIMARY KEY,
+  data TEXT NOT NULL,
+  rev INTEGER NOT NULL DEFAULT 0,
+  updated_at TEXT NOT NULL DEFAULT (datetime('now','localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_draft_sales_updated ON draft_sales(updated_at);
 
 -- =========================================
 -- TABLA: sale_items
@@ -170,6 +351,7 @@ CREATE TABLE IF NOT EXISTS sale_items (
 );
 
 CREATE INDEX IF NOT EXISTS idx_sale_items_saleid ON sale_items(sale_id);
+CREATE INDEX IF NOT EXISTS idx_sale_items_sku    ON sale_items(sku);  -- FK a products(sku)
 
 -- =========================================
 -- TABLA: payments
@@ -184,6 +366,45 @@ CREATE TABLE IF NOT EXISTS payments (
 );
 
 CREATE INDEX IF NOT EXISTS idx_payments_saleid ON payments(sale_id);
+-- customer_id, su índice y trg_payments_customer / trg_sales_customer_payments
+-- viven en db/migrations (008).
+
+-- =========================================
+-- RESÚMENES DIARIOS (se actualizan en la misma transacción que create_sale;
+-- ver repos.reports; `cli.py rebuild-reports` los recalcula y compara)
+-- =========================================
+CREATE TABLE IF NOT EXISTS daily_seller (
+  day TEXT NOT NULL,                     -- 'YYYY-MM-DD' de sales.created_at
+  seller_id INTEGER NOT NULL DEFAULT 0,  -- 0 = sin vendedor registrado
+  seller TEXT NOT NULL,
+  sales_count    INTEGER NOT NULL DEFAULT 0,
+  subtotal       REAL NOT NULL DEFAULT 0,
+  discount_total REAL NOT NULL DEFAULT 0,
+  tax_total      REAL NOT NULL DEFAULT 0,
+  total          REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, seller_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_payment (
+  day TEXT NOT NULL,                     -- de payments.created_at
+  method TEXT NOT NULL,
+  payments_count INTEGER NOT NULL DEFAULT 0,
+  amount REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, method)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_product (
+  day TEXT NOT NULL,
+  category_id INTEGER NOT NULL DEFAULT 0,  -- categoría del producto al vender; 0 = sin categoría
+  sku TEXT NOT NULL DEFAULT '',            -- '' = renglón libre
+  lines    INTEGER NOT NULL DEFAULT 0,
+  qty      REAL NOT NULL DEFAULT 0,
+  subtotal REAL NOT NULL DEFAULT 0,
+  discount REAL NOT NULL DEFAULT 0,
+  tax      REAL NOT NULL DEFAULT 0,
+  total    REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, category_id, sku)
+) WITHOUT ROWID;
 
 -- =========================================
 -- VISTA: v_sales_calc (totales por venta)
@@ -195,8 +416,7 @@ SELECT
   COALESCE(SUM((si.qty*si.unit_price)),0) AS sub,
   COALESCE(SUM(si.discount),0) AS disc,
   COALESCE(SUM(((si.qty*si.unit_price)-si.discount)*si.tax_rate),0) AS iva,
-  COALESCE(SUM(((si.qty*si.unit_price)-si.discount)
-        + (((si.qty*si.unit_price)-si.discount)*si.tax_rate)),0) AS tot
+  COALESCE(SUM(si.line_total),0) AS tot  -- importe de pricing.line
 FROM sales s
 LEFT JOIN sale_items si ON si.sale_id = s.id
 GROUP BY s.id;
@@ -204,35 +424,11 @@ GROUP BY s.id;
 -- =========================================
 -- TRIGGERS: mantener totales en sales
 -- =========================================
-CREATE TRIGGER IF NOT EXISTS trg_items_ai AFTER INSERT ON sale_items
-BEGIN
-  UPDATE sales
-  SET subtotal       = (SELECT sub  FROM v_sales_calc WHERE sale_id = NEW.sale_id),
-      discount_total = (SELECT disc FROM v_sales_calc WHERE sale_id = NEW.sale_id),
-      tax_total      = (SELECT iva  FROM v_sales_calc WHERE sale_id = NEW.sale_id),
-      total          = (SELECT tot  FROM v_sales_calc WHERE sale_id = NEW.sale_id)
-  WHERE id = NEW.sale_id;
-END;
-
-CREATE TRIGGER IF NOT EXISTS trg_items_au AFTER UPDATE ON sale_items
-BEGIN
-  UPDATE sales
-  SET subtotal       = (SELECT sub  FROM v_sales_calc WHERE sale_id = NEW.sale_id),
-      discount_total = (SELECT disc FROM v_sales_calc WHERE sale_id = NEW.sale_id),
-      tax_total      = (SELECT iva  FROM v_sales_calc WHERE sale_id = NEW.sale_id),
-      total          = (SELECT tot  FROM v_sales_calc WHERE sale_id = NEW.sale_id)
-  WHERE id = NEW.sale_id;
-END;
+-- Al insertar renglones NO hay trigger: repos.sales.refresh_totals calcula
+-- los totales una sola vez por venta (ver migración 003).
 
-CREATE TRIGGER IF NOT EXISTS trg_items_ad AFTER DELETE ON sale_items
-BEGIN
-  UPDATE sales
-  SET subtotal       = (SELECT sub  FROM v_sales_calc WHERE sale_id = OLD.sale_id),
-      discount_total = (SELECT disc FROM v_sales_calc WHERE sale_id = OLD.sale_id),
-      tax_total      = (SELECT iva  FROM v_sales_calc WHERE sale_id = OLD.sale_id),
-      total          = (SELECT tot  FROM v_sales_calc WHERE sale_id = OLD.sale_id)
-  WHERE id = OLD.sale_id;
-END;
+-- trg_items_au / trg_items_ad (recalculan y suben rev) viven en
+-- db/migrations (015): usan sales.rev, agregada con ALTER TABLE.
 
 -- =========================================
 -- VISTA: v_sales_paid (pagos por venta)
@@ -248,35 +444,5 @@ FROM sales s;
 -- =========================================
 -- TRIGGERS: mantener payment_status en sales
 -- =========================================
-CREATE TRIGGER IF NOT EXISTS trg_pay_ai AFTER INSERT ON payments
-BEGIN
-  UPDATE sales
-  SET payment_status = CASE
-    WHEN (SELECT total_paid FROM v_sales_paid WHERE sale_id = NEW.sale_id) >= total THEN 'paid'
-    WHEN (SELECT total_paid FROM v_sales_paid WHERE sale_id = NEW.sale_id) > 0    THEN 'partial'
-    ELSE 'unpaid'
-  END
-  WHERE id = NEW.sale_id;
-END;
-
-CREATE TRIGGER IF NOT EXISTS trg_pay_au AFTER UPDATE ON payments
-BEGIN
-  UPDATE sales
-  SET payment_status = CASE
-    WHEN (SELECT total_paid FROM v_sales_paid WHERE sale_id = NEW.sale_id) >= total THEN 'paid'
-    WHEN (SELECT total_paid FROM v_sales_paid WHERE sale_id = NEW.sale_id) > 0    THEN 'partial'
-    ELSE 'unpaid'
-  END
-  WHERE id = NEW.sale_id;
-END;
-
-CREATE TRIGGER IF NOT EXISTS trg_pay_ad AFTER DELETE ON payments
-BEGIN
-  UPDATE sales
-  SET payment_status = CASE
-    WHEN (SELECT total_paid FROM v_sales_paid WHERE sale_id = OLD.sale_id) >= total THEN 'paid'
-    WHEN (SELECT total_paid FROM v_sales_paid WHERE sale_id = OLD.sale_id) > 0    THEN 'partial'
-    ELSE 'unpaid'
-  END
-  WHERE id = OLD.sale_id;
-END;
+-- sales.paid_total y trg_pay_ai / trg_pay_au / trg_pay_ad (por delta) viven
+-- en db/migrations (010): dependen de columnas agregadas con ALTER TABLE.
@@ -0,0 +1,165 @@
+# metrics.py
+"""
+Métricas en memoria con salida en formato de texto de Prometheus (/metrics).
+
+Sin dependencias: contadores e histogramas con etiquetas, protegidos por un
+lock. Observar cuesta una búsqueda de bucket y una suma.
+"""
+import bisect
+import threading
+from typing import Callable
+
+# Buckets en segundos: de 0.1 ms (una lectura por PK) a 10 s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{n}="{esc(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labelnames = name, help, labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for lv, v in sorted(self._values.items()):
+                out.append(f"{self.name}{_labels(self.labelnames, lv)} {v:g}")
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # labels -> [conteos por bucket..., +Inf, suma]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            s[i] += 1
+            s[-1] += value
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for lv, s in sorted(series.items()):
+            acc = 0
+            for le, n in zip((*self.buckets, "+Inf"), s[:-1]):
+                acc += n
+                le = le if le == "+Inf" else f"{le:g}"
+                out.append(f"{self.name}_bucket{_labels((*self.labelnames, 'le'), (*lv, le))} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, lv)} {s[-1]:.6f}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, lv)} {acc}")
+        return out
+
+
+class Gauge:
+    """Valores leídos al momento de exportar (p.ej. conexiones abiertas del pool).
+    `type="counter"` para contadores que lleva otro módulo (hits de caché)."""
+
+    def __init__(self, name: str, help: str, labels: tuple, read: Callable[[], dict[tuple, float]],
+                 type: str = "gauge"):
+        self.name, self.help, self.labelnames, self.read, self.type = name, help, labels, read, type
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for lv, v in sorted(self.read().items()):
+            out.append(f"{self.name}{_labels(self.labelnames, lv)} {v:g}")
+        return out
+
+
+REGISTRY: list = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+def render() -> str:
+    return "\n".join(line for m in REGISTRY for line in m.render()) + "\n"
+
+
+# ---- HTTP ----
+http_latency = register(Histogram(
+    "pos_http_request_duration_seconds", "Latencia por ruta", ("method", "route", "status")))
+http_sql_statements = register(Histogram(
+    "pos_http_sql_statements", "Sentencias SQL por request", ("route",), COUNT_BUCKETS))
+http_sql_seconds = register(Histogram(
+    "pos_http_sql_duration_seconds", "Tiempo en SQLite por request", ("route",)))
+
+# ---- SQLite ----
+sql_latency = register(Histogram(
+    "pos_sql_statement_duration_seconds", "Duración por sentencia (hasta la primera fila)", ("kind",)))
+sql_slow = register(Counter("pos_sql_slow_total", "Sentencias sobre SLOW_QUERY_MS", ("kind",)))
+lock_wait = register(Histogram(
+    "pos_db_lock_wait_seconds", "Espera por el lock de escritura (BEGIN IMMEDIATE)"))
+
+
+# ---- estado de otros módulos (se lee al exportar; imports diferidos) ----
+def _pool() -> dict:
+    from repos.base import pool_stats
+    st, out = pool_stats(), {}
+    for lane, lane_st in (("write", st), ("read", st["read"])):
+        for state in ("open", "idle", "checked_out"):
+            out[(lane, state)] = lane_st[state]
+    return out
+
+def _pool_opened() -> dict:
+    from repos.base import pool_stats
+    st = pool_stats()
+    return {("write",): st["opened_total"], ("read",): st["read"]["opened_total"]}
+
+def _busy() -> dict:
+    from repos.base import pool_stats
+    st = pool_stats()
+    return {("retry",): st["retries"], ("failed",): st["failures"]}
+
+def _busy_wait() -> dict:
+    from repos.base import pool_stats
+    return {(): pool_stats()["wait_s"]}
+
+def _caches() -> dict:
+    from repos.catalog import cache as catalog
+    from services.ticket_cache import html_cache, escpos_cache
+    out = {}
+    for name, c in (("catalog", catalog), ("ticket_html", html_cache), ("ticket_escpos", escpos_cache)):
+        out[(name, "hit")] = c.hits
+        out[(name, "miss")] = c.misses
+    return out
+
+def _queues() -> dict:
+    from services.group_commit import writer
+    from printing.spooler import spooler
+    out = {("sales_writer",): writer.stats()["pending"]}
+    for name, w in spooler.workers.items():
+        out[(f"printer_{name}",)] = w.q.qsize()
+    return out
+
+register(Gauge("pos_db_connections", "Conexiones SQLite por carril (escritura / sólo lectura)",
+               ("lane", "state"), _pool))
+register(Gauge("pos_db_connections_opened_total", "Conexiones SQLite abiertas desde el arranque", ("lane",),
+               _pool_opened, type="counter"))
+register(Gauge("pos_db_busy_total", "SQLITE_BUSY al abrir una tx de escritura (reintentada / fallida)",
+               ("result",), _busy, type="counter"))
+register(Gauge("pos_db_lock_wait_seconds_total", "Segundos esperando el lock de escritura, con reintentos",
+               (), _busy_wait, type="counter"))
+register(Gauge("pos_cache_requests_total", "Accesos a cachés en memoria", ("cache", "result"), _caches,
+               type="counter"))
+register(Gauge("pos_queue_pending", "Trabajos en cola", ("queue",), _queues))
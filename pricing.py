@@ -0,0 +1,55 @@
+# pricing.py
+"""
+Importe de renglón y totales de venta: el único lugar donde se calculan.
+
+Lo usan el alta de venta (repos/sales.py guarda line_total y los totales de
+sales / v_sales_calc suman de ahí), el ticket ESC/POS, el cobro de
+colegiaturas y la cotización del carrito (/api/cart/price).
+static/js/sales.js repite la fórmula sólo como estimado mientras responde el
+servidor.
+
+    bruto     = qty * unit_price
+    descuento = manual + % de las reglas sobre el bruto (a centavos), tope el bruto
+    iva       = (bruto - descuento) * tax_rate
+    importe   = bruto - descuento + iva
+"""
+from typing import Callable, Iterable
+
+MAX_PERCENT = 100.0
+
+# sku -> (porcentaje, nombres de las reglas aplicadas)
+RuleLookup = Callable[[str | None], tuple[float, list[str]]]
+
+
+def line(qty: float, unit_price: float, discount: float = 0.0, tax_rate: float = 0.0,
+         percent: float = 0.0) -> dict:
+    """{gross, discount, tax, total} de un renglón."""
+    gross = float(qty) * float(unit_price)
+    if percent:
+        discount = float(discount or 0) + round(gross * min(percent, MAX_PERCENT) / 100, 2)
+    discount = min(max(float(discount or 0), 0.0), max(gross, 0.0))
+    base = gross - discount
+    tax = base * float(tax_rate or 0)
+    return {"gross": gross, "discount": discount, "tax": tax, "total": max(0.0, base + tax)}
+
+
+def price_cart(items: Iterable[dict], rules: RuleLookup | None = None) -> dict:
+    """
+    Precio del carrito en una pasada. items: renglones con qty, unit_price,
+    discount?, tax_rate?, sku? (formato de repos.sales o de la UI).
+    rules(sku): descuento por reglas que se suma al manual de cada renglón.
+    return: {lines: [{gross, discount, tax, total, percent, rules}], subtotal,
+             discount_total, tax_total, total, rules: [nombres aplicados]}
+    """
+    out = {"lines": [], "subtotal": 0.0, "discount_total": 0.0, "tax_total": 0.0, "total": 0.0, "rules": []}
+    for it in items:
+        percent, names = rules(it.get("sku")) if rules else (0.0, [])
+        ln = line(it["qty"], it["unit_price"], it.get("discount", 0.0), it.get("tax_rate", 0.0), percent)
+        ln.update(percent=percent, rules=names)
+        out["lines"].append(ln)
+        out["subtotal"] += ln["gross"]
+        out["discount_total"] += ln["discount"]
+        out["tax_total"] += ln["tax"]
+        out["total"] += ln["total"]
+        out["rules"] += [n for n in names if n not in out["rules"]]
+    return out
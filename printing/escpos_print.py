@@ -1,59 +1,95 @@
-from escpos.printer import Network, Usb, Serial
+from escpos.printer import Network, Usb, Serial, Dummy
+import pricing
 
-def print_ticket(cfg, header, items, conn_type="network", host="192.168.0.100", port=9100,
-                 usb_vendor=0x04b8, usb_product=0x0202, usb_in_ep=0x82, usb_out_ep=0x01,
-                 serial_dev="/dev/ttyUSB0", serial_baud=19200, paper_width_mm=58):
-    subtotal = sum([float(it["qty"]) * float(it["unit_price"]) for it in items])
-    tax = sum([float(it["qty"]) * float(it["unit_price"]) * float(it["tax_rate"]) for it in items])
-    total = subtotal + tax
+def render_ticket(cfg, header, items, paper_width_mm=58, payments=None) -> bytes:
+    """Arma el ticket completo en un solo buffer ESC/POS (sin tocar la impresora).
+    payments: [{label, amount, tendered?}, ...] opcional; agrega pagos, cambio y saldo."""
+    cart = pricing.price_cart(items)
+    total = cart["total"]
     paper_chars = 32 if paper_width_mm <= 58 else 42
 
-    if conn_type == "network":
-        p = Network(host, port=port, timeout=10)
-    elif conn_type == "usb":
-        p = Usb(usb_vendor, usb_product, usb_in_ep, usb_out_ep)
-    elif conn_type == "serial":
-        p = Serial(devfile=serial_dev, baudrate=serial_baud)
-    else:
-        raise ValueError("conn_type inválido")
-
-    p.set(align="center", text_type="B")
+    p = Dummy()
+    p.set(align="center", bold=True)
     p.textln(cfg["name"] + "\n")
     if cfg.get("address"):
         p.textln(cfg["address"] + "\n")
     p.textln(f"RFC: {cfg['rfc']}  Tel: {cfg['phone']}\n")
     p.textln("-"*paper_chars + "\n")
 
-    p.set(align="left", text_type="NORMAL")
+    p.set(align="left", bold=False)
     p.textln(f"Folio: {header['folio']}")
     p.textln(f"Fecha/Hora: {header['created_at']}\n")
     p.textln("-"*paper_chars + "\n")
 
-    for it in items:
+    for it, ln in zip(items, cart["lines"]):
         desc = str(it["description"])[:paper_chars]
         p.textln(desc + "\n")
-        qty = float(it["qty"]); pu = float(it["unit_price"]); imp = qty*pu
-        l = f"{qty:.2f} x {pu:,.2f}"; r = f"{imp:,.2f}"
+        qty = float(it["qty"]); pu = float(it["unit_price"])
+        l = f"{qty:.2f} x {pu:,.2f}"; r = f"{ln['gross']:,.2f}"
         p.textln(l + " "*(paper_chars - len(l) - len(r)) + r + "\n")
+        if ln["discount"] > 0.005:
+            l = "  Descuento"; r = f"-{ln['discount']:,.2f}"
+            p.textln(l + " "*(paper_chars - len(l) - len(r)) + r + "\n")
 
     p.textln("-"*paper_chars + "\n")
     def pline(label, amount, bold=False):
         l = label; r = f"${amount:,.2f}"
         s = l + " "*(paper_chars - len(l) - len(r)) + r
-        if bold: p.set(text_type="B")
+        if bold: p.set(bold=True)
         p.textln(s + "\n")
-        if bold: p.set(text_type="NORMAL")
-    pline("Subtotal:", subtotal)
-    pline("IVA:", tax)
+        if bold: p.set(bold=False)
+    pline("Subtotal:", cart["subtotal"])
+    if cart["discount_total"] > 0.005:
+        pline("Descuento:", cart["discount_total"])
+    pline("IVA:", cart["tax_total"])
     pline("TOTAL:", total, bold=True)
 
+    if payments:
+        p.textln("\n")
+        change = 0.0
+        for pay in payments:
+            tendered = pay.get("tendered")
+            if tendered is not None:
+                pline(f"{pay['label']} recibido:", float(tendered))
+                change += float(tendered) - float(pay["amount"])
+            else:
+                pline(f"{pay['label']}:", float(pay["amount"]))
+        if change > 0.005:
+            pline("CAMBIO:", change, bold=True)
+        due = total - sum(float(pay["amount"]) for pay in payments)
+        if due > 0.005:
+            pline("SALDO:", due, bold=True)
+
     p.textln("\n")
     if cfg.get("thank_you"):
         p.set(align="center")
         p.textln(str(cfg["thank_you"]) + "\n")
 
     p.cut()
+    return p.output
+
+def open_printer(conn_type="network", host="192.168.0.100", port=9100,
+                 usb_vendor=0x04b8, usb_product=0x0202, usb_in_ep=0x82, usb_out_ep=0x01,
+                 serial_dev="/dev/ttyUSB0", serial_baud=19200, timeout=10):
+    if conn_type == "network":
+        return Network(host, port=port, timeout=timeout)
+    elif conn_type == "usb":
+        return Usb(usb_vendor, usb_product, in_ep=usb_in_ep, out_ep=usb_out_ep)
+    elif conn_type == "serial":
+        return Serial(devfile=serial_dev, baudrate=serial_baud)
+    raise ValueError("conn_type inválido")
+
+def print_ticket(cfg, header, items, conn_type="network", host="192.168.0.100", port=9100,
+                 usb_vendor=0x04b8, usb_product=0x0202, usb_in_ep=0x82, usb_out_ep=0x01,
+                 serial_dev="/dev/ttyUSB0", serial_baud=19200, paper_width_mm=58):
+    """Impresión síncrona (bloquea hasta enviar). Para la caja usar printing.spooler."""
+    data = render_ticket(cfg, header, items, paper_width_mm)
+    p = open_printer(conn_type, host, port, usb_vendor, usb_product, usb_in_ep, usb_out_ep,
+                     serial_dev, serial_baud)
     try:
-        p.close()
-    except Exception:
-        pass
+        p._raw(data)
+    finally:
+        try:
+            p.close()
+        except Exception:
+            pass
@@ -0,0 +1,119 @@
+# printing/fake_printer.py
+"""
+Impresora ESC/POS falsa por TCP, para pruebas del spooler sin hardware.
+
+    python -m printing.fake_printer --port 9100
+    PRINTERS="caja=tcp://127.0.0.1:9100" python app.py
+
+Guarda los bytes recibidos; `tickets()` los separa por el comando de corte.
+`delay` simula una impresora lenta y `drop` cierra las primeras N conexiones
+sin leer (impresora apagada / ocupada) para probar reintentos.
+"""
+import socket
+import socketserver
+import threading
+import time
+
+CUT = b"\x1dV"  # GS V
+STATUS_REQ = b"\x10\x04"  # DLE EOT n
+STATUS_OK = b"\x16"  # en línea, sin errores
+
+
+class FakePrinter(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0, drop: int = 0):
+        super().__init__((host, port), _Handler)
+        self.delay = delay
+        self.drop = drop
+        self.connections = 0
+        self.active: set[socket.socket] = set()
+        self.received = bytearray()
+        self.lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "FakePrinter":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-printer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Apaga la impresora: deja de aceptar y corta las conexiones abiertas."""
+        self.shutdown()
+        self.server_close()
+        with self.lock:
+            for s in self.active:
+                try:
+                    s.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def tickets(self) -> list[bytes]:
+        with self.lock:
+            data = bytes(self.received)
+        parts = data.split(CUT)
+        return [p + CUT for p in parts[:-1]]
+
+    def wait_tickets(self, n: int, timeout: float = 5.0) -> list[bytes]:
+        deadline = time.monotonic() + timeout
+        while len(self.tickets()) < n and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.tickets()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        srv: FakePrinter = self.server
+        with srv.lock:
+            srv.connections += 1
+            if srv.drop > 0:
+                srv.drop -= 1
+                return
+            srv.active.add(self.request)
+        try:
+            self._serve(srv)
+        finally:
+            with srv.lock:
+                srv.active.discard(self.request)
+
+    def _serve(self, srv: FakePrinter):
+        while True:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return
+            if srv.delay:
+                time.sleep(srv.delay)
+            # responde las consultas de estado y no las guarda como ticket
+            for _ in range(chunk.count(STATUS_REQ)):
+                self.request.sendall(STATUS_OK)
+            while (i := chunk.find(STATUS_REQ)) >= 0:
+                chunk = chunk[:i] + chunk[i + 3:]
+            with srv.lock:
+                srv.received.extend(chunk)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Impresora ESC/POS falsa (TCP)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--delay", type=float, default=0.0)
+    ap.add_argument("--drop", type=int, default=0)
+    args = ap.parse_args()
+    fp = FakePrinter(args.host, args.port, args.delay, args.drop).start()
+    print(f"Impresora falsa en {args.host}:{fp.port} (Ctrl+C para salir)")
+    seen = 0
+    try:
+        while True:
+            t = fp.tickets()
+            for tk in t[seen:]:
+                print(f"ticket #{len(t)}: {len(tk)} bytes, conexiones={fp.connections}")
+            seen = len(t)
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        fp.stop()
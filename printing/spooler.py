@@ -0,0 +1,242 @@
+# printing/spooler.py
+"""
+Spooler de tickets ESC/POS.
+
+Cada impresora configurada tiene su cola acotada y un hilo que la atiende con
+una conexión persistente (se reconecta si la impresora la cerró o se apagó).
+El ticket llega ya renderizado (un solo buffer de bytes), así que el envío es
+un `sendall` y el request HTTP sólo encola y regresa el id del trabajo.
+Los fallos se reintentan con backoff exponencial.
+"""
+import atexit
+import itertools
+import queue
+import select
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from config import PRINTERS, PRINT_QUEUE_SIZE, PRINT_MAX_RETRIES, PRINT_BACKOFF_S, PRINT_TIMEOUT_S
+
+DLE_EOT_PRINTER = b"\x10\x04\x01"  # solicitud de estado en tiempo real
+JOB_HISTORY = 500   # trabajos recientes consultables por id
+BACKOFF_MAX_S = 30.0
+
+_STOP = object()
+
+
+def parse_printers(spec: str) -> dict[str, dict]:
+    """"caja=tcp://10.0.0.5:9100?paper=80,..." -> {"caja": {"kind", "host", ...}}"""
+    printers = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, uri = part.partition("=")
+        u = urlparse(uri.strip())
+        opts = {k: v[-1] for k, v in parse_qs(u.query).items()}
+        cfg = {"kind": u.scheme, "paper": int(opts.get("paper", 58))}
+        if u.scheme == "tcp":
+            cfg.update(host=u.hostname, port=u.port or 9100, probe=opts.get("status", "1") != "0")
+        elif u.scheme == "usb":
+            vendor, _, product = u.netloc.partition(":")
+            cfg.update(vendor=int(vendor, 16), product=int(product, 16))
+        elif u.scheme == "serial":
+            cfg.update(dev=u.path, baud=int(opts.get("baud", 19200)))
+        else:
+            raise ValueError(f"Impresora '{name}': esquema no soportado '{u.scheme}'")
+        printers[name.strip()] = cfg
+    return printers
+
+
+class _TcpLink:
+    """Socket crudo de larga vida hacia el puerto 9100 de la impresora.
+
+    Un `sendall` sobre una conexión que la impresora ya cerró "funciona" y los
+    bytes se pierden; por eso antes de cada ticket se pide el estado (DLE EOT 1)
+    y se espera la respuesta. Si no responde no se imprimió nada y el
+    reintento no duplica el ticket. `?status=0` lo desactiva.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float, probe: bool = True):
+        self.addr = (host, port)
+        self.timeout = timeout
+        self.probe = probe
+        self.sock: socket.socket | None = None
+
+    def _alive(self) -> bool:
+        # la impresora cierra conexiones ociosas: un socket legible sin datos = cerrado
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            return not readable or self.sock.recv(1, socket.MSG_PEEK) != b""
+        except OSError:
+            return False
+
+    def send(self, data: bytes) -> None:
+        if self.sock is not None and not self._alive():
+            self.close()
+        if self.sock is None:
+            self.sock = socket.create_connection(self.addr, timeout=self.timeout)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if self.probe:
+            self.sock.sendall(DLE_EOT_PRINTER)
+            if not self.sock.recv(1):
+                raise ConnectionError("la impresora cerró la conexión")
+        self.sock.sendall(data)
+
+    def close(self) -> None:
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+
+class _EscposLink:
+    """USB / serial vía python-escpos (abre el dispositivo una vez)."""
+
+    def __init__(self, cfg: dict):
+        self.cfg = cfg
+        self.dev = None
+
+    def send(self, data: bytes) -> None:
+        if self.dev is None:
+            from .escpos_print import open_printer
+            if self.cfg["kind"] == "usb":
+                self.dev = open_printer("usb", usb_vendor=self.cfg["vendor"], usb_product=self.cfg["product"])
+            else:
+                self.dev = open_printer("serial", serial_dev=self.cfg["dev"], serial_baud=self.cfg["baud"])
+        self.dev._raw(data)
+
+    def close(self) -> None:
+        if self.dev is not None:
+            try:
+                self.dev.close()
+            except Exception:
+                pass
+            self.dev = None
+
+
+class PrinterWorker:
+    def __init__(self, name: str, cfg: dict, spooler: "PrintSpooler"):
+        self.name = name
+        self.cfg = cfg
+        self.spooler = spooler
+        self.q: queue.Queue = queue.Queue(maxsize=spooler.queue_size)
+        self.link = (_TcpLink(cfg["host"], cfg["port"], spooler.timeout, cfg["probe"]) if cfg["kind"] == "tcp"
+                     else _EscposLink(cfg))
+        self.online: bool | None = None  # None = aún sin intentar
+        self.last_error: str | None = None
+        self.printed = 0
+        self.failed = 0
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"printer-{self.name}", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float | None = 5) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self.q.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self.link.close()
+
+    def _run(self) -> None:
+        while True:
+            job = self.q.get()
+            if job is _STOP:
+                return
+            self._print(job)
+
+    def _print(self, job: dict) -> None:
+        data = job.pop("data")
+        for attempt in range(self.spooler.max_retries + 1):
+            job.update(status="printing", attempts=attempt + 1)
+            try:
+                self.link.send(data)
+            except Exception as e:
+                self.link.close()
+                self.online = False
+                self.last_error = job["error"] = f"{type(e).__name__}: {e}"
+                if attempt < self.spooler.max_retries:
+                    job["status"] = "retrying"
+                    time.sleep(min(self.spooler.backoff * 2 ** attempt, BACKOFF_MAX_S))
+                continue
+            self.online = True
+            self.printed += 1
+            job.update(status="done", error=None, finished_at=time.time())
+            return
+        self.failed += 1
+        job.update(status="failed", finished_at=time.time())
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.cfg["kind"],
+            "online": self.online,
+            "queued": self.q.qsize(),
+            "capacity": self.q.maxsize,
+            "printed": self.printed,
+            "failed": self.failed,
+            "last_error": self.last_error,
+        }
+
+
+class PrintSpooler:
+    def __init__(self, printers: dict[str, dict], queue_size: int = PRINT_QUEUE_SIZE,
+                 max_retries: int = PRINT_MAX_RETRIES, backoff: float = PRINT_BACKOFF_S,
+                 timeout: float = PRINT_TIMEOUT_S):
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.workers = {name: PrinterWorker(name, cfg, self) for name, cfg in printers.items()}
+        self._jobs: OrderedDict[str, dict] = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def default(self) -> str | None:
+        return next(iter(self.workers), None)
+
+    def paper_width(self, printer: str | None = None) -> int:
+        return self.workers[printer or self.default].cfg["paper"]
+
+    def submit(self, data: bytes, printer: str | None = None, ref=None) -> str:
+        """Encola el buffer ya renderizado. KeyError si la impresora no existe,
+        queue.Full si su cola está llena."""
+        name = printer or self.default
+        if name not in self.workers:
+            raise KeyError(name)
+        worker = self.workers[name]
+        job = {"id": f"{name}-{next(self._ids)}", "printer": name, "ref": ref, "status": "queued",
+               "attempts": 0, "error": None, "bytes": len(data), "created_at": time.time(),
+               "finished_at": None, "data": data}
+        worker.q.put_nowait(job)
+        with self._lock:
+            self._jobs[job["id"]] = job
+            while len(self._jobs) > JOB_HISTORY:
+                self._jobs.popitem(last=False)
+        worker.start()
+        return job["id"]
+
+    def job(self, job_id: str) -> dict | None:
+        job = self._jobs.get(job_id)
+        return None if job is None else {k: v for k, v in job.items() if k != "data"}
+
+    def stop(self) -> None:
+        for w in self.workers.values():
+            w.stop()
+
+    def status(self) -> dict:
+        with self._lock:
+            recent = [self.job(j) for j in list(self._jobs)[-20:]]
+        return {"printers": {n: w.stats() for n, w in self.workers.items()}, "recent": recent[::-1]}
+
+
+spooler = PrintSpooler(parse_printers(PRINTERS))
+atexit.register(spooler.stop)
@@ -1,29 +1,243 @@
 # repos/base.py
 from contextlib import contextmanager
+import atexit
+import random
+import re
 import sqlite3
-from typing import Iterator, Any
+import threading
+import time
+import unicodedata
+from typing import Iterator, Any, Callable
 from pathlib import Path
-from config import DB_PATH, PRAGMAS_STARTUP
+from urllib.parse import quote
+from config import DB_PATH, PRAGMAS_STARTUP, PRAGMAS_READ, SQL_PROFILE, TX_RETRIES, TX_BACKOFF_MS
+from .profiling import ProfiledConnection
 
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    for q in PRAGMAS_STARTUP:
-        conn.execute(q)
-    return conn
+# Tamaño del caché de sentencias preparadas por conexión (sqlite3 default = 128)
+CACHED_STATEMENTS = 256
 
-@contextmanager
-def tx() -> Iterator[sqlite3.Connection]:
-    conn = get_conn()
+
+class ConnectionPool:
+    """
+    Pool de conexiones de larga vida: una conexión por hilo (waitress usa un
+    hilo por worker). Los PRAGMAS se aplican una sola vez al abrir la conexión
+    y sqlite3 conserva las sentencias preparadas entre requests.
+
+    `connection()` es reentrante: sólo el nivel más externo hace commit/rollback.
+    Con read_only=True las conexiones se abren con mode=ro (URI) y query_only:
+    en WAL nunca esperan a un escritor ni pueden tomar el lock de escritura.
+    """
+
+    def __init__(self, db_path: str, pragmas: list[str] | None = None,
+                 cached_statements: int = CACHED_STATEMENTS, profile: bool = SQL_PROFILE,
+                 read_only: bool = False):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.factory = ProfiledConnection if profile else sqlite3.Connection
+        if pragmas is None:
+            pragmas = PRAGMAS_READ if read_only else PRAGMAS_STARTUP
+        self.pragmas = list(pragmas)
+        self.cached_statements = cached_statements
+        self.on_connect: list[Callable[[sqlite3.Connection], None]] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: dict[int, sqlite3.Connection] = {}  # thread ident -> conexión
+        self._idle: list[sqlite3.Connection] = []  # abiertas por prefill(), sin hilo aún
+        self._checked_out = 0
+        self.opened = 0
+        # BEGIN IMMEDIATE con SQLITE_BUSY: reintentos, fallas y segundos esperando el lock
+        self.busy = {"retries": 0, "failures": 0, "wait_s": 0.0}
+
+    # ---- ciclo de vida ----
+    def _open(self) -> sqlite3.Connection:
+        target, uri = self.db_path, False
+        if self.read_only:
+            target, uri = f"file:{quote(str(self.db_path))}?mode=ro", True
+        conn = sqlite3.connect(target, uri=uri, cached_statements=self.cached_statements,
+                               check_same_thread=False, factory=self.factory)
+        conn.row_factory = sqlite3.Row
+        for q in self.pragmas:
+            conn.execute(q)
+        for hook in self.on_connect:
+            hook(conn)
+        return conn
+
+    def _reap(self) -> None:
+        """Cierra conexiones de hilos que ya terminaron (llamar con _lock tomado)."""
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in self._conns if i not in alive]:
+            try:
+                self._conns.pop(ident).close()
+            except sqlite3.Error:
+                pass
+
+    def prefill(self, n: int) -> int:
+        """Deja `n` conexiones abiertas de reserva (con el esquema ya leído) para
+        que el primer request de cada hilo no pague la apertura. Regresa cuántas abrió."""
+        opened = 0
+        while True:
+            with self._lock:
+                if len(self._idle) >= n:
+                    return opened
+            conn = self._open()
+            conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            with self._lock:
+                self._idle.append(conn)
+                self.opened += 1
+            opened += 1
+
+    def acquire(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._open()
+                with self._lock:
+                    self.opened += 1
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._reap()
+                self._conns[threading.get_ident()] = conn
+        return conn
+
+    def close_all(self) -> None:
+        with self._lock:
+            for conn in [*self._conns.values(), *self._idle]:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._conns.clear()
+            self._idle.clear()
+            self._checked_out = 0
+        self._local = threading.local()
+
+    # ---- préstamo ----
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        outer = self._local.depth == 0
+        self._local.depth += 1
+        if outer:
+            with self._lock:
+                self._checked_out += 1
+        try:
+            yield conn
+            if outer and conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if outer and conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+            if outer:
+                with self._lock:
+                    self._checked_out -= 1
+
+    def in_transaction(self) -> bool:
+        """¿El hilo actual tiene prestada su conexión con una transacción abierta?"""
+        conn = getattr(self._local, "conn", None)
+        return conn is not None and self._local.depth > 0 and conn.in_transaction
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"open": len(self._conns) + len(self._idle), "idle": len(self._idle),
+                    "checked_out": self._checked_out, "opened_total": self.opened, **self.busy}
+
+
+pool = ConnectionPool(DB_PATH)
+read_pool = ConnectionPool(DB_PATH, read_only=True)
+
+
+def reset_pool(db_path: str | None = None) -> ConnectionPool:
+    """Cierra los pools actuales y abre nuevos (p.ej. para otra BD o tras un restore)."""
+    global pool, read_pool
+    hooks = pool.on_connect
+    profile = pool.factory is ProfiledConnection
+    close_pools()
+    pool = ConnectionPool(db_path or pool.db_path, profile=profile)
+    read_pool = ConnectionPool(pool.db_path, profile=profile, read_only=True)
+    pool.on_connect.extend(hooks)
+    read_pool.on_connect.extend(hooks)
+    return pool
+
+
+@atexit.register
+def close_pools() -> None:
+    pool.close_all()
+    read_pool.close_all()
+
+
+def get_conn():
+    """Uso: `with get_conn() as conn:` — presta la conexión del hilo actual."""
+    return pool.connection()
+
+
+def read_conn():
+    """
+    Conexión de sólo lectura del hilo (carril de lectura): las consultas de las
+    rutas GET no compiten con las ventas. Dentro de una tx de escritura abierta
+    en este mismo hilo regresa esa conexión, para ver sus propios cambios.
+    """
+    return pool.connection() if pool.in_transaction() else read_pool.connection()
+
+
+def pool_stats() -> dict:
+    return {**pool.stats(), "read": read_pool.stats()}
+
+
+def _is_busy(e: sqlite3.OperationalError) -> bool:
+    code = getattr(e, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF == sqlite3.SQLITE_BUSY
+    return "locked" in str(e) or "busy" in str(e)
+
+def _begin_immediate(conn: sqlite3.Connection) -> None:
+    """
+    BEGIN IMMEDIATE con reintentos acotados. busy_timeout ya espera dentro de
+    SQLite; si aun así sale SQLITE_BUSY (otro escritor retuvo el lock más que
+    eso) se reintenta TX_RETRIES veces con backoff exponencial con jitter.
+    El tiempo total esperando el lock queda en pool.busy.
+    """
+    t0 = time.perf_counter()
+    retries = 0
     try:
-        conn.execute("BEGIN IMMEDIATE")  # bloquea escritura y evita race en folios
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
+        while True:
+            try:
+                conn.execute("BEGIN IMMEDIATE")  # bloquea escritura y evita race en folios
+                return
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or retries >= TX_RETRIES:
+                    if _is_busy(e):
+                        with pool._lock:
+                            pool.busy["failures"] += 1
+                    raise
+            retries += 1
+            with pool._lock:
+                pool.busy["retries"] += 1
+            time.sleep(TX_BACKOFF_MS / 1000 * 2 ** (retries - 1) * random.uniform(0.5, 1.5))
     finally:
-        conn.close()
+        with pool._lock:
+            pool.busy["wait_s"] += time.perf_counter() - t0
+
+
+@contextmanager
+def tx() -> Iterator[sqlite3.Connection]:
+    with pool.connection() as conn:
+        if conn.in_transaction:
+            # tx anidada: la transacción exterior decide commit/rollback
+            yield conn
+            return
+        _begin_immediate(conn)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
 def one(cur: sqlite3.Cursor) -> dict | None:
     r = cur.fetchone()
@@ -31,3 +245,16 @@ def one(cur: sqlite3.Cursor) -> dict | None:
 
 def many(cur: sqlite3.Cursor) -> list[dict]:
     return [dict(r) for r in cur.fetchall()]
+
+
+def normalize(text: str) -> str:
+    """Minúsculas y sin acentos ("Crédito" -> "credito")."""
+    nfkd = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in nfkd if not unicodedata.combining(c)).lower()
+
+def words(text: str) -> list[str]:
+    return re.findall(r"\w+", normalize(text))
+
+def fts_prefix_query(q: str) -> str | None:
+    """Consulta FTS5: cada palabra por prefijo, todas obligatorias (AND implícito)."""
+    return " ".join(f'"{t}"*' for t in words(q)) or None
@@ -0,0 +1,99 @@
+# repos/billing.py
+"""
+Cobro masivo de colegiaturas: una venta por alumno activo del salón con un
+renglón del producto del periodo, escrita con INSERT ... SELECT (sin ir y
+venir a Python por alumno).
+
+La llave de idempotencia 'bill:<periodo>:<sku>:<alumno>' (idx_sales_idempotency)
+hace que repetir el mismo periodo sólo cobre a los que faltan. Cada bloque se
+inserta con una sola sentencia dentro de la transacción de escritura: sus ids
+quedan contiguos y los folios, apartados como rango de la serie, se numeran en
+el mismo INSERT en el orden de la lista. El importe de cada alumno (becas y
+hermanos; el pronto pago no) se calcula antes con pricing.line y entra al INSERT
+como json_each.
+"""
+import json
+from typing import Callable
+import pricing
+from .base import many
+from . import folios
+from . import reports
+
+# Mismo filtro y orden que customers.list_by_salon (idx_customers_salon_activos / _nombre_activos)
+_KEY = "'bill:' || :period || ':' || :sku || ':' || c.id"
+_CANDIDATES = """
+FROM customers c
+WHERE c.active=1{filters}
+"""
+_PENDING = _CANDIDATES + f"  AND NOT EXISTS (SELECT 1 FROM sales s WHERE s.idempotency_key = {_KEY})\n"
+
+
+def _filters(grade_id: int | None, group_id: int | None, shift_id: int | None) -> tuple[str, dict]:
+    sql, params = "", {}
+    for col, value in (("grade_id", grade_id), ("group_id", group_id), ("shift_id", shift_id)):
+        if value:
+            sql += f" AND c.{col}=:{col}"
+            params[col] = value
+    return sql, params
+
+
+def counts(conn, period: str, sku: str, grade_id=None, group_id=None, shift_id=None) -> dict:
+    """{students, billed}: alumnos activos que entran en el filtro y cuántos ya tienen el cargo."""
+    filters, params = _filters(grade_id, group_id, shift_id)
+    row = conn.execute(f"""
+        SELECT COUNT(*), COALESCE(SUM(EXISTS (SELECT 1 FROM sales s WHERE s.idempotency_key = {_KEY})), 0)
+        {_CANDIDATES.format(filters=filters)}""", {**params, "period": period, "sku": sku}).fetchone()
+    return {"students": row[0], "billed": row[1]}
+
+
+def pending(conn, period: str, sku: str, grade_id=None, group_id=None, shift_id=None,
+            limit: int = -1) -> list[dict]:
+    """Alumnos que faltan por cobrar, en el orden en que se les asignará folio."""
+    filters, params = _filters(grade_id, group_id, shift_id)
+    return many(conn.execute(f"""
+        SELECT c.id, c.enrollment, c.first_name || ' ' || IFNULL(c.second_name,'') AS name
+        {_PENDING.format(filters=filters)}
+        ORDER BY c.second_name, c.first_name, c.id LIMIT :limit""",
+        {**params, "period": period, "sku": sku, "limit": limit}))
+
+
+def insert_chunk(conn, period: str, product: dict, description: str, seller_id: int | None, seller: str,
+                 grade_id=None, group_id=None, shift_id=None, limit: int = 1000, series: str | None = None,
+                 percent_of: Callable[[int], float] | None = None) -> tuple[list[int], str | None, str | None, float]:
+    """
+    Hasta `limit` ventas (encabezado con folio y totales + renglón) para los
+    alumnos pendientes, dentro de la transacción `conn`. percent_of(alumno):
+    % de las reglas de descuento (pricing_service.reglas); cada venta lleva
+    su propio descuento, IVA e importe de pricing.line.
+    Regresa (ids en orden, primer folio, último folio, total cobrado).
+    """
+    todo = pending(conn, period, product["sku"], grade_id, group_id, shift_id, limit=limit)
+    if not todo:
+        return [], None, None, 0.0
+    rng = folios.reserve(conn, series, len(todo))
+    price, tax = float(product["price"]), float(product["tax_rate"])
+    lines = []
+    for c in todo:
+        ln = pricing.line(1, price, 0.0, tax, percent_of(c["id"]) if percent_of else 0.0)
+        lines.append([c["id"], ln["gross"], ln["discount"], ln["tax"], ln["total"]])
+    # renglón i de `lines` -> folio start + i, en el orden de pending()
+    ids = sorted(r[0] for r in conn.execute(f"""
+        INSERT INTO sales (folio, customer_id, seller_id, customer, seller, idempotency_key,
+                           subtotal, discount_total, tax_total, total)
+        SELECT printf('%s%0*d', :prefix, :width, :start + q.key),
+               c.id, :seller_id, c.first_name || ' ' || IFNULL(c.second_name,''), :seller, {_KEY},
+               json_extract(q.value, '$[1]'), json_extract(q.value, '$[2]'),
+               json_extract(q.value, '$[3]'), json_extract(q.value, '$[4]')
+        FROM json_each(:lines) q JOIN customers c ON c.id = json_extract(q.value, '$[0]')
+        ORDER BY q.key
+        RETURNING id""", {"period": period, "sku": product["sku"], "seller_id": seller_id, "seller": seller,
+                          "prefix": rng.prefix, "width": rng.width, "start": rng.start,
+                          "lines": json.dumps(lines)}).fetchall())
+    # un renglón por venta: su descuento e importe son los del encabezado
+    conn.execute("""
+        INSERT INTO sale_items (sale_id, sku, description_snapshot, qty, unit_price, discount, tax_rate, line_total)
+        SELECT s.id, :sku, :description, 1, :price, s.discount_total, :tax, s.total
+        FROM json_each(:ids) j JOIN sales s ON s.id = j.value
+    """, {"sku": product["sku"], "description": description, "price": price, "tax": tax, "ids": json.dumps(ids)})
+    reports.apply_sales(conn, ids)
+    return ids, rng.folio(0), rng.folio(len(todo) - 1), sum(ln[4] for ln in lines)
@@ -0,0 +1,10 @@
+# repos/business.py
+from .base import read_conn, one
+
+# Valores de respaldo si business_config aún no se captura
+DEFAULT_CONFIG = {"name": "", "rfc": "", "address": "", "phone": "", "thank_you": "¡Gracias por su compra!"}
+
+def get_config() -> dict:
+    with read_conn() as conn:
+        row = one(conn.execute("SELECT * FROM business_config WHERE id=1"))
+    return {**DEFAULT_CONFIG, **(row or {})}
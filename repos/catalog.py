@@ -0,0 +1,192 @@
+# repos/catalog.py
+"""
+Caché en memoria del catálogo de productos.
+
+Se carga completo (dict por SKU + índices ordenados) y se valida en cada acceso
+contra `catalog_version`, que incrementan los triggers de products. Así varios
+hilos de waitress o varios procesos nunca sirven precios viejos: el costo por
+acceso es leer una fila por PK en lugar de la consulta completa.
+"""
+import bisect
+import sqlite3
+import threading
+from collections import OrderedDict
+from config import CATALOG_CACHE_MAX
+from .base import read_conn, one, many, words
+
+
+class _Snapshot:
+    __slots__ = ("version", "by_sku", "skus", "by_desc", "words", "sku_words")
+
+    def __init__(self, version: int, rows: list[dict]):
+        self.version = version
+        self.by_sku = {r["sku"]: r for r in rows}
+        active = [r for r in rows if r["active"]]
+        self.skus = sorted(r["sku"] for r in active)
+        self.by_desc = sorted(active, key=lambda r: r["description"])
+        # índice de palabras (sin acentos) -> sku, para búsqueda por prefijo
+        self.sku_words = {r["sku"]: tuple(words(r["sku"]) + words(r["description"])) for r in active}
+        self.words = sorted((w, sku) for sku, ws in self.sku_words.items() for w in set(ws))
+
+
+class CatalogCache:
+    def __init__(self, max_items: int = CATALOG_CACHE_MAX):
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._snap: _Snapshot | None = None
+        self._oversize_version: int | None = None
+        self._lru: OrderedDict[str, dict | None] = OrderedDict()  # modo sobre-tamaño
+        self._lock = threading.Lock()
+
+    # ---- versión / carga ----
+    def _version(self, conn: sqlite3.Connection) -> int | None:
+        try:
+            row = conn.execute("SELECT version FROM catalog_version WHERE id=1").fetchone()
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            return None  # BD sin migrar: sin caché
+        return row[0] if row else None
+
+    def _snapshot(self) -> _Snapshot | None:
+        """Snapshot vigente, o None si el catálogo no cabe / no hay versión."""
+        with read_conn() as conn:
+            version = self._version(conn)
+            if version is None:
+                return None
+            snap = self._snap
+            if snap is not None and snap.version == version:
+                self.hits += 1
+                return snap
+            if self._oversize_version == version:
+                return None
+            self.misses += 1
+            with self._lock:
+                snap = self._snap
+                if snap is not None and snap.version == version:
+                    return snap
+                return self._load(conn)
+
+    def _load(self, conn: sqlite3.Connection) -> _Snapshot | None:
+        # versión y filas en la misma transacción de lectura (snapshot WAL consistente)
+        outer = not conn.in_transaction
+        if outer:
+            conn.execute("BEGIN")
+        try:
+            version = self._version(conn)
+            count = conn.execute("SELECT count(*) FROM products").fetchone()[0]
+            if count > self.max_items:
+                self._snap = None
+                self._oversize_version = version
+                self._lru.clear()
+                return None
+            rows = many(conn.execute("SELECT * FROM products"))
+        finally:
+            if outer:
+                conn.commit()
+        if not outer:
+            # dentro de una tx de escritura: podría revertirse, no se publica
+            return _Snapshot(version, rows)
+        self._snap = _Snapshot(version, rows)
+        self._oversize_version = None
+        self.reloads += 1
+        return self._snap
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snap = None
+            self._oversize_version = None
+            self._lru.clear()
+
+    # ---- lecturas ----
+    def get(self, sku: str) -> dict | None:
+        snap = self._snapshot()
+        if snap is not None:
+            p = snap.by_sku.get(sku)
+            return dict(p) if p else None
+        # catálogo más grande que el tope: LRU acotado por SKU
+        with read_conn() as conn:
+            version = self._version(conn)
+            with self._lock:
+                if self._oversize_version != version:
+                    self._lru.clear()
+                    self._oversize_version = version
+                if sku in self._lru:
+                    self.hits += 1
+                    self._lru.move_to_end(sku)
+                    p = self._lru[sku]
+                    return dict(p) if p else None
+            self.misses += 1
+            p = one(conn.execute("SELECT * FROM products WHERE sku=?", (sku,)))
+            if version is not None:
+                with self._lock:
+                    self._lru[sku] = p
+                    while len(self._lru) > self.max_items:
+                        self._lru.popitem(last=False)
+        return dict(p) if p else None
+
+    def list_active(self) -> list[dict] | None:
+        snap = self._snapshot()
+        return None if snap is None else [dict(p) for p in snap.by_desc]
+
+    def active_snapshot(self) -> tuple[int, list[dict]] | None:
+        """(versión, activos por descripción) del mismo snapshot; None si hay que ir a SQLite."""
+        snap = self._snapshot()
+        return None if snap is None else (snap.version, snap.by_desc)
+
+    def search(self, q: str, limit: int) -> list[dict] | None:
+        """Misma semántica que products.search; None si hay que ir a SQLite."""
+        snap = self._snapshot()
+        if snap is None:
+            return None
+        toks = words(q)
+        if not toks:
+            return []
+        pick = lambda p: {k: p[k] for k in ("sku", "description", "price", "tax_rate")}
+
+        # 1) SKU por prefijo
+        sku = q.strip().upper()
+        by_sku = []
+        i = bisect.bisect_left(snap.skus, sku)
+        while i < len(snap.skus) and snap.skus[i].startswith(sku) and len(by_sku) < limit:
+            by_sku.append(pick(snap.by_sku[snap.skus[i]]))
+            i += 1
+        if len(by_sku) >= limit:
+            return by_sku
+
+        # 2) palabras por prefijo: la más larga recorre el índice, el resto filtra
+        toks.sort(key=len, reverse=True)
+        first, others = toks[0], toks[1:]
+        seen = {p["sku"] for p in by_sku}
+        rest = []
+        j = bisect.bisect_left(snap.words, (first,))
+        while j < len(snap.words) and snap.words[j][0].startswith(first):
+            s = snap.words[j][1]
+            j += 1
+            if s in seen:
+                continue
+            seen.add(s)
+            ws = snap.sku_words[s]
+            if all(any(w.startswith(t) for w in ws) for t in others):
+                rest.append(pick(snap.by_sku[s]))
+                if len(rest) >= limit - len(by_sku):
+                    break
+        return by_sku + sorted(rest, key=lambda p: p["description"])
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        snap = self._snap
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "reloads": self.reloads,
+            "size": len(snap.by_sku) if snap else len(self._lru),
+            "max_items": self.max_items,
+            "version": snap.version if snap else self._oversize_version,
+        }
+
+
+cache = CatalogCache()
@@ -1,5 +1,7 @@
 # repos/customers.py
-from .base import get_conn, tx, one, many
+from .base import read_conn, tx, one, many, fts_prefix_query
+
+SEARCH_PAGE = 20
 
 def create(**fields):
     keys = ",".join(fields.keys())
@@ -7,16 +9,67 @@ def create(**fields):
     with tx() as conn:
         conn.execute(f"INSERT INTO customers({keys}) VALUES({qs})", tuple(fields.values()))
 
+def get(customer_id: int) -> dict | None:
+    with read_conn() as conn:
+        return one(conn.execute("""
+            SELECT c.*, c.first_name || ' ' || IFNULL(c.second_name,'') AS name
+            FROM customers c WHERE c.id=?""", (customer_id,)))
+
 def get_by_matricula(matricula: str) -> dict | None:
-    with get_conn() as conn:
-        return one(conn.execute("SELECT * FROM customers WHERE matricula=?", (matricula,)))
+    with read_conn() as conn:
+        return one(conn.execute("SELECT * FROM customers WHERE enrollment=?", (matricula,)))
 
 def list_by_salon(grade_id: int | None, group_id: int | None, shift_id: int | None) -> list[dict]:
-    sql = "SELECT * FROM customers WHERE 1=1"
+    """Alumnos activos del salón por apellidos y nombre (idx_customers_salon_activos
+    / idx_customers_nombre_activos, sin ordenar en memoria)."""
+    sql = "SELECT * FROM customers WHERE active=1"
     params = []
     if grade_id: sql += " AND grade_id=?"; params.append(grade_id)
     if group_id: sql += " AND group_id=?"; params.append(group_id)
     if shift_id: sql += " AND shift_id=?"; params.append(shift_id)
-    sql += " ORDER BY apellido, nombre"
-    with get_conn() as conn:
+    sql += " ORDER BY second_name, first_name"
+    with read_conn() as conn:
         return many(conn.execute(sql, params))
+
+def search(q: str = "", grade_id: int | None = None, group_id: int | None = None,
+           shift_id: int | None = None, after_id: int = 0,
+           limit: int = SEARCH_PAGE) -> tuple[list[dict], int | None]:
+    """
+    Typeahead de alumnos: matrícula, nombre, CURP o referencia (customers_fts,
+    sin acentos, por prefijo) con filtros de salón como list_by_salon.
+    Paginación keyset por id: regresa (renglones, after_id de la siguiente página | None).
+    """
+    match = fts_prefix_query(q)
+    if not match and not (grade_id or group_id or shift_id):
+        return [], None
+    params: list = []
+    if match:
+        sql = """
+            SELECT c.id, c.enrollment, c.first_name || ' ' || IFNULL(c.second_name,'') AS name, c.curp
+            FROM customers_fts f JOIN customers c ON c.id = f.rowid
+            WHERE customers_fts MATCH ? AND f.rowid > ? AND c.active=1"""
+        params += [match, after_id]
+        order = " ORDER BY f.rowid"
+    else:
+        sql = """
+            SELECT c.id, c.enrollment, c.first_name || ' ' || IFNULL(c.second_name,'') AS name, c.curp
+            FROM customers c
+            WHERE c.id > ? AND c.active=1"""
+        params.append(after_id)
+        order = " ORDER BY c.id"
+    if grade_id: sql += " AND c.grade_id=?"; params.append(grade_id)
+    if group_id: sql += " AND c.group_id=?"; params.append(group_id)
+    if shift_id: sql += " AND c.shift_id=?"; params.append(shift_id)
+    sql += order + " LIMIT ?"
+    params.append(limit + 1)
+    with read_conn() as conn:
+        rows = many(conn.execute(sql, params))
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]["id"]
+    return rows, None
+
+def salon_catalogs() -> dict[str, list[dict]]:
+    """grades / groups / shifts para los filtros del typeahead."""
+    with read_conn() as conn:
+        return {t: many(conn.execute(f"SELECT id, code, name FROM {t} ORDER BY code"))
+                for t in ("grades", "groups", "shifts")}
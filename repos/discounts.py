@@ -0,0 +1,178 @@
+# repos/discounts.py
+"""
+Reglas de descuento de la escuela (discount_rules) compiladas a tablas de
+búsqueda en memoria: por alumno y SKU (becas y hermanos) y por SKU (pronto
+pago, que depende del día).
+
+Igual que repos/catalog.py: se compilan una vez y se validan en cada acceso
+contra `pricing_version`, que incrementan los triggers de discount_rules y de
+customers (altas, bajas y cambios de papás). Cotizar un carrito cuesta leer
+una fila por PK y unos cuantos dicts.
+
+Hermanos: alumnos activos con los mismos papás (fullname_mom / fullname_dad);
+el descuento aplica del segundo inscrito (por id) en adelante.
+"""
+import sqlite3
+import threading
+from pricing import MAX_PERCENT
+from .base import read_conn, tx, many
+
+KINDS = {"scholarship": "Beca", "sibling": "Hermanos", "early_payment": "Pronto pago"}
+
+# Lecturas completas a propósito, una vez por versión de reglas (bench/plans.py)
+RULES_SQL = "SELECT kind, name, percent, customer_id, sku, until_day FROM discount_rules WHERE active=1"
+# Alumnos con un hermano mayor inscrito (misma pareja de papás)
+YOUNGER_SIBLINGS_SQL = """
+SELECT id FROM (
+  SELECT id, row_number() OVER (PARTITION BY family ORDER BY id) AS n
+  FROM (SELECT id, lower(trim(IFNULL(fullname_mom,''))) || '|' || lower(trim(IFNULL(fullname_dad,''))) AS family
+        FROM customers
+        WHERE active=1 AND (trim(IFNULL(fullname_mom,'')) <> '' OR trim(IFNULL(fullname_dad,'')) <> '')))
+WHERE n > 1
+"""
+
+
+def _keep_best(best: dict, kind: str, percent: float, name: str) -> None:
+    if percent > best.get(kind, (0.0,))[0]:
+        best[kind] = (percent, name)
+
+
+class _Rules:
+    __slots__ = ("version", "by_customer", "early")
+
+    def __init__(self, version: int | None, rows: list[dict], younger: list[int]):
+        self.version = version
+        # customer_id -> sku|None -> kind -> (porcentaje, nombre)
+        self.by_customer: dict[int, dict[str | None, dict]] = {}
+        # sku|None -> [(hasta el día, porcentaje, nombre), ...]
+        self.early: dict[str | None, list[tuple[int, float, str]]] = {}
+        for r in rows:
+            label = f"{r['name']} {r['percent']:g}%"
+            if r["kind"] == "early_payment":
+                self.early.setdefault(r["sku"], []).append((r["until_day"], r["percent"], label))
+                continue
+            for cid in ([r["customer_id"]] if r["kind"] == "scholarship" else younger):
+                _keep_best(self.by_customer.setdefault(cid, {}).setdefault(r["sku"], {}),
+                           r["kind"], r["percent"], label)
+
+    def lookup(self, customer_id: int | None, sku: str | None, day: int | None) -> tuple[float, list[str]]:
+        """
+        (porcentaje, nombres) para un renglón: la mejor regla de cada tipo,
+        sumadas con tope 100%. day None: sin pronto pago (cargos a futuro).
+        """
+        best: dict = {}
+        by_sku = self.by_customer.get(customer_id) if customer_id else None
+        for key in (sku, None) if sku else (None,):
+            if by_sku and key in by_sku:
+                for kind, (percent, name) in by_sku[key].items():
+                    _keep_best(best, kind, percent, name)
+            if day is None:
+                continue
+            for until_day, percent, name in self.early.get(key, ()):
+                if day <= until_day:
+                    _keep_best(best, "early_payment", percent, name)
+        if not best:
+            return 0.0, []
+        return min(sum(p for p, _ in best.values()), MAX_PERCENT), [n for _, n in best.values()]
+
+
+_EMPTY = _Rules(None, [], [])
+
+
+class DiscountCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._rules: _Rules | None = None
+        self._lock = threading.Lock()
+
+    def _version(self, conn: sqlite3.Connection) -> int | None:
+        try:
+            row = conn.execute("SELECT version FROM pricing_version WHERE id=1").fetchone()
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            return None  # BD sin migrar: sin descuentos
+        return row[0] if row else None
+
+    def rules(self) -> _Rules:
+        with read_conn() as conn:
+            version = self._version(conn)
+            if version is None:
+                return _EMPTY
+            rules = self._rules
+            if rules is not None and rules.version == version:
+                self.hits += 1
+                return rules
+            self.misses += 1
+            with self._lock:
+                rules = self._rules
+                if rules is not None and rules.version == version:
+                    return rules
+                return self._load(conn)
+
+    def _load(self, conn: sqlite3.Connection) -> _Rules:
+        # versión, reglas y hermanos en la misma transacción de lectura
+        outer = not conn.in_transaction
+        if outer:
+            conn.execute("BEGIN")
+        try:
+            version = self._version(conn)
+            rows = many(conn.execute(RULES_SQL))
+            younger = [r[0] for r in conn.execute(YOUNGER_SIBLINGS_SQL)] \
+                if any(r["kind"] == "sibling" for r in rows) else []
+        finally:
+            if outer:
+                conn.commit()
+        rules = _Rules(version, rows, younger)
+        if outer:  # dentro de una tx de escritura podría revertirse: no se publica
+            self._rules = rules
+            self.reloads += 1
+        return rules
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._rules = None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "reloads": self.reloads, "version": self._rules.version if self._rules else None}
+
+
+cache = DiscountCache()
+
+
+# ---- administración ----
+def list_rules(include_inactive: bool = False) -> list[dict]:
+    with read_conn() as conn:
+        return many(conn.execute(f"""
+            SELECT r.id, r.kind, r.name, r.percent, r.customer_id, r.sku, r.until_day, r.active,
+                   c.enrollment, c.first_name || ' ' || IFNULL(c.second_name,'') AS customer
+            FROM discount_rules r LEFT JOIN customers c ON c.id = r.customer_id
+            {'' if include_inactive else 'WHERE r.active=1'}
+            ORDER BY r.kind, r.id"""))
+
+
+def add_rule(kind: str, percent: float, name: str | None = None, customer_id: int | None = None,
+             sku: str | None = None, until_day: int | None = None) -> int:
+    if kind not in KINDS:
+        raise ValueError(f"Tipo de descuento inválido: {kind} ({', '.join(KINDS)})")
+    if not 0 < percent <= MAX_PERCENT:
+        raise ValueError("El porcentaje va de 0 a 100")
+    if (kind == "scholarship") != (customer_id is not None):
+        raise ValueError("La beca (y sólo la beca) lleva alumno")
+    if (kind == "early_payment") != (until_day is not None):
+        raise ValueError("El pronto pago (y sólo el pronto pago) lleva día límite")
+    with tx() as conn:
+        return conn.execute("""
+            INSERT INTO discount_rules(kind, name, percent, customer_id, sku, until_day)
+            VALUES (?, ?, ?, ?, ?, ?) RETURNING id
+        """, (kind, name or KINDS[kind], percent, customer_id, sku, until_day)).fetchone()[0]
+
+
+def set_active(rule_id: int, active: bool) -> bool:
+    with tx() as conn:
+        return conn.execute("UPDATE discount_rules SET active=? WHERE id=?",
+                            (int(active), rule_id)).rowcount > 0
@@ -0,0 +1,43 @@
+# repos/drafts.py
+"""
+Persistencia de los carritos en borrador (draft_sales): una fila por terminal
+con el carrito en JSON. La escribe services/draft_service.py en cada cambio
+(un UPSERT por PK) y la lee sólo cuando el carrito no está en memoria.
+"""
+import json
+from .base import read_conn, tx
+
+
+def _cutoff(ttl_s: int) -> str:
+    return f"-{int(ttl_s)} seconds"
+
+
+def load(terminal: str, ttl_s: int) -> tuple[dict, int] | None:
+    """(carrito, rev) si existe y no ha expirado."""
+    with read_conn() as conn:
+        row = conn.execute("""
+            SELECT data, rev FROM draft_sales
+            WHERE terminal=? AND updated_at >= datetime('now','localtime', ?)
+        """, (terminal, _cutoff(ttl_s))).fetchone()
+    return (json.loads(row[0]), row[1]) if row else None
+
+
+def save(terminal: str, data: dict, rev: int) -> None:
+    with tx() as conn:
+        conn.execute("""
+            INSERT INTO draft_sales(terminal, data, rev) VALUES (?, ?, ?)
+            ON CONFLICT(terminal) DO UPDATE SET data=excluded.data, rev=excluded.rev,
+              updated_at=datetime('now','localtime')
+        """, (terminal, json.dumps(data, ensure_ascii=False, separators=(",", ":")), rev))
+
+
+def delete(terminal: str) -> None:
+    with tx() as conn:
+        conn.execute("DELETE FROM draft_sales WHERE terminal=?", (terminal,))
+
+
+def purge(ttl_s: int) -> int:
+    """Borra los borradores sin cambios en más de `ttl_s` segundos."""
+    with tx() as conn:
+        return conn.execute("DELETE FROM draft_sales WHERE updated_at < datetime('now','localtime', ?)",
+                            (_cutoff(ttl_s),)).rowcount
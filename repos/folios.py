@@ -0,0 +1,100 @@
+# repos/folios.py
+"""
+Folios por serie (folio_series): cada caja/terminal numera la suya ('A-000123').
+
+Se apartan dentro de la transacción de escritura de las ventas (BEGIN
+IMMEDIATE): un UPDATE ... RETURNING por serie y por lote, y el folio ya va en
+el INSERT de la venta (sin UPDATE posterior ni relectura). Así varias cajas
+comparten la BD sin repetir números, y si la venta se revierte el número
+también.
+"""
+import re
+from config import FOLIO_SERIES
+from .base import read_conn, tx, many
+
+DEFAULT_WIDTH = 6
+SERIES_RE = re.compile(r"^[A-Za-z0-9_]{1,16}$")
+
+
+class FolioRange:
+    """Números [start, start + count) de una serie ya apartados."""
+    __slots__ = ("series", "prefix", "width", "start", "count")
+
+    def __init__(self, series: str, prefix: str, width: int, start: int, count: int):
+        self.series, self.prefix, self.width, self.start, self.count = series, prefix, width, start, count
+
+    def folio(self, i: int) -> str:
+        if not 0 <= i < self.count:
+            raise IndexError(f"Folio {i} fuera del rango apartado ({self.count})")
+        return f"{self.prefix}{self.start + i:0{self.width}d}"
+
+    def __iter__(self):
+        return (self.folio(i) for i in range(self.count))
+
+
+def check_series(series: str) -> str:
+    if not SERIES_RE.match(series or ""):
+        raise ValueError(f"Serie de folios inválida: {series!r} (letras, números o _, hasta 16)")
+    return series
+
+
+def reserve(conn, series: str | None = None, n: int = 1) -> FolioRange:
+    """
+    Aparta `n` folios consecutivos de `series` (default FOLIO_SERIES) dentro de
+    la transacción `conn`. Una serie nueva se crea con prefijo '<serie>-' y 6 dígitos.
+
+    Ningún folio pasa de `width` dígitos (la serie 'F' de 4 llega a 9999): uno
+    más largo ordenaría mal como texto. Al llegar al límite se rechaza sin
+    mover la serie; se amplía con `folio-series <serie> --width`.
+    """
+    series = check_series(series or FOLIO_SERIES)
+    if n < 1:
+        raise ValueError("Hay que apartar al menos un folio")
+    sql = ("UPDATE folio_series SET next = next + ? WHERE series = ? AND length(next + ? - 1) <= width "
+           "RETURNING next - ?, prefix, width")
+    args = (n, series, n, n)
+    row = conn.execute(sql, args).fetchone()
+    if row is None:
+        full = conn.execute("SELECT width FROM folio_series WHERE series = ?", (series,)).fetchone()
+        if full is not None:
+            raise ValueError(f"La serie {series} llegó a su límite de folios ({'9' * full[0]}); "
+                             f"amplíe el ancho con folio-series {series} --width")
+        conn.execute("INSERT OR IGNORE INTO folio_series(series, prefix, width) VALUES (?, ?, ?)",
+                     (series, f"{series}-", DEFAULT_WIDTH))
+        row = conn.execute(sql, args).fetchone()
+        if row is None:
+            raise ValueError(f"No caben {n} folios en la serie {series} ({DEFAULT_WIDTH} dígitos)")
+    return FolioRange(series, row[1], row[2], row[0], n)
+
+
+def release(conn, rng: FolioRange, unused: int) -> None:
+    """Regresa los últimos `unused` números del rango (ventas que fallaron), si
+    nadie apartó después en la misma transacción: la serie queda sin huecos."""
+    if unused > 0:
+        conn.execute("UPDATE folio_series SET next = next - ? WHERE series = ? AND next = ?",
+                     (unused, rng.series, rng.start + rng.count))
+
+
+def list_series() -> list[dict]:
+    with read_conn() as conn:
+        return many(conn.execute("SELECT series, prefix, width, next FROM folio_series ORDER BY series"))
+
+
+def upsert_series(series: str, prefix: str | None = None, width: int | None = None,
+                  next_number: int | None = None) -> None:
+    """
+    Alta o ajuste de una serie; lo que no se indica se conserva (en el alta:
+    prefijo '<serie>-' y 6 dígitos). `next_number` sólo puede avanzar (nunca reusar folios).
+    El último folio de la serie es 10**width - 1 (ver reserve).
+    """
+    check_series(series)
+    if width is not None and not 1 <= width <= 12:
+        raise ValueError("El ancho del folio va de 1 a 12 dígitos")
+    with tx() as conn:
+        conn.execute("""
+            INSERT INTO folio_series(series, prefix, width, next) VALUES (:series, :new_prefix, :new_width, :new_next)
+            ON CONFLICT(series) DO UPDATE SET prefix=COALESCE(:prefix, prefix), width=COALESCE(:width, width),
+              next=max(next, COALESCE(:next, next))
+        """, {"series": series, "prefix": prefix, "width": width, "next": next_number,
+              "new_prefix": f"{series}-" if prefix is None else prefix,
+              "new_width": width or DEFAULT_WIDTH, "new_next": next_number or 1})
@@ -1,5 +1,12 @@
 # repos/products.py
-from .base import get_conn, tx, one, many
+import sqlite3
+from .base import read_conn, tx, one, many, fts_prefix_query
+from .catalog import cache
+
+SEARCH_LIMIT = 20
+CHANGES_LIMIT = 1000
+# Columnas del catálogo que se manda al cliente (renglones como listas)
+SNAPSHOT_FIELDS = ("sku", "description", "price", "tax_rate")
 
 def upsert(sku: str, description: str, price: float, tax_rate: float, kind: str = "Servicio",
            unit: str = "pz", cost: float = 0.0, category_id: int | None = None, active: int = 1):
@@ -14,9 +21,112 @@ def upsert(sku: str, description: str, price: float, tax_rate: float, kind: str
         """, (sku, description, price, tax_rate, kind, unit, cost, category_id, active))
 
 def get(sku: str) -> dict | None:
-    with get_conn() as conn:
-        return one(conn.execute("SELECT * FROM products WHERE sku=?", (sku,)))
+    return cache.get(sku)
 
 def list_active() -> list[dict]:
-    with get_conn() as conn:
+    rows = cache.list_active()
+    if rows is not None:
+        return rows
+    with read_conn() as conn:
         return many(conn.execute("SELECT * FROM products WHERE active=1 ORDER BY description"))
+
+
+def search(q: str, limit: int = SEARCH_LIMIT) -> list[dict]:
+    """
+    Búsqueda para el autocomplete de venta. Se resuelve en el caché de
+    catálogo (repos/catalog.py); si no está disponible, en SQLite:
+
+    1) SKU por prefijo con rango sobre la PK (el SKU exacto queda primero).
+    2) Si faltan renglones, products_fts (ver schema.sql) sin acentos y por
+       prefijo. Se toman los primeros aciertos del índice sin ordenar todo el
+       conjunto, así la latencia no crece con el catálogo.
+    """
+    cached = cache.search(q, limit)
+    if cached is not None:
+        return cached
+    match = fts_prefix_query(q)
+    if not match:
+        return []
+    sku = q.strip().upper()
+    try:
+        with read_conn() as conn:
+            by_sku = many(conn.execute(
+                "SELECT sku, description, price, tax_rate FROM products "
+                "WHERE sku >= ? AND sku < ? AND active=1 ORDER BY sku LIMIT ?",
+                (sku, sku + "\U0010ffff", limit)))
+            if len(by_sku) >= limit:
+                return by_sku
+            rest = many(conn.execute("""
+                SELECT p.sku, p.description, p.price, p.tax_rate
+                FROM products_fts f
+                JOIN products p ON p.rowid = f.rowid
+                WHERE products_fts MATCH ? AND p.active=1
+                LIMIT ?
+            """, (match, limit + len(by_sku))))
+        seen = {p["sku"] for p in by_sku}
+        rest = [p for p in rest if p["sku"] not in seen][:limit - len(by_sku)]
+        return by_sku + sorted(rest, key=lambda p: p["description"])
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            raise
+    # BD sin migrar: búsqueda lineal de siempre
+    with read_conn() as conn:
+        return many(conn.execute(
+            "SELECT sku, description, price, tax_rate FROM products WHERE active=1 AND (sku LIKE ? OR description LIKE ?) ORDER BY description LIMIT ?",
+            (f"%{q}%", f"%{q}%", limit)
+        ))
+
+
+# ---- catálogo para el cliente (búsqueda local en el navegador) ----
+def version() -> int:
+    with read_conn() as conn:
+        row = conn.execute("SELECT version FROM catalog_version WHERE id=1").fetchone()
+    return row[0] if row else 0
+
+def snapshot() -> dict:
+    """{version, fields, rows}: productos activos como listas; versión y filas del mismo snapshot."""
+    cached = cache.active_snapshot()
+    if cached is not None:
+        ver, rows = cached
+    else:
+        with read_conn() as conn:
+            conn.execute("BEGIN")
+            try:
+                ver = conn.execute("SELECT version FROM catalog_version WHERE id=1").fetchone()[0]
+                rows = many(conn.execute("SELECT * FROM products WHERE active=1 ORDER BY description"))
+            finally:
+                conn.commit()
+    return {"version": ver, "fields": SNAPSHOT_FIELDS, "rows": [[r[f] for f in SNAPSHOT_FIELDS] for r in rows]}
+
+def changes(since: int, limit: int = CHANGES_LIMIT) -> dict:
+    """
+    Delta desde la versión `since` (product_changes): {version, upserts (listas
+    como snapshot), deletes (SKUs borrados o inactivos), more}. Con more=True
+    `version` es hasta dónde llegó esta página y hay que volver a pedir desde ahí.
+    reset=True si `since` es de otra BD (mayor que la versión actual): recargar el snapshot.
+    """
+    with read_conn() as conn:
+        conn.execute("BEGIN")
+        try:
+            current = conn.execute("SELECT version FROM catalog_version WHERE id=1").fetchone()[0]
+            if since > current:
+                return {"version": current, "reset": True, "upserts": [], "deletes": [], "more": False}
+            rows = many(conn.execute("""
+                SELECT c.version, c.sku, c.deleted, p.description, p.price, p.tax_rate, p.active
+                FROM product_changes c LEFT JOIN products p ON p.sku = c.sku
+                WHERE c.version > ? ORDER BY c.version LIMIT ?""", (since, limit + 1)))
+        finally:
+            conn.commit()
+    more = len(rows) > limit
+    if more:
+        # no partir una versión entre páginas (un renombre deja dos SKUs con la misma)
+        cut = rows[limit]["version"]
+        rows = [r for r in rows if r["version"] < cut]
+        current = rows[-1]["version"] if rows else since
+    upserts, deletes = [], []
+    for r in rows:
+        if r["deleted"] or not r["active"]:
+            deletes.append(r["sku"])
+        else:
+            upserts.append([r[f] for f in SNAPSHOT_FIELDS])
+    return {"version": current, "upserts": upserts, "deletes": deletes, "more": more}
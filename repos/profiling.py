@@ -0,0 +1,124 @@
+# repos/profiling.py
+"""
+Perfilado de SQL: las conexiones del pool son ProfiledConnection, que mide
+cada execute/executemany/commit y lo acumula en metrics y en el request en
+curso (por hilo; cada hilo de waitress atiende un request a la vez).
+
+Las sentencias más lentas que SLOW_QUERY_MS se registran en el log "pos.sql"
+junto con su EXPLAIN QUERY PLAN (calculado una vez por texto de SQL).
+"""
+import logging
+import sqlite3
+import threading
+from time import perf_counter
+from config import SLOW_QUERY_MS
+import metrics
+
+log = logging.getLogger("pos.sql")
+
+_local = threading.local()
+_plans: dict[str, str] = {}
+PLAN_CACHE_MAX = 256
+_EXPLAINABLE = ("select", "insert", "update", "delete", "with", "replace")
+
+
+# ---- catálogo de sentencias (bench.plans) ----
+_catalog: dict[str, object] | None = None
+
+def start_catalog() -> None:
+    """Desde aquí, cada texto de SQL distinto se guarda con sus primeros parámetros."""
+    global _catalog
+    _catalog = {}
+
+def stop_catalog() -> dict[str, object]:
+    global _catalog
+    out, _catalog = _catalog or {}, None
+    return out
+
+
+# ---- por request ----
+def begin_request() -> None:
+    _local.req = [0, 0.0]
+
+def end_request() -> tuple[int, float]:
+    """(sentencias, segundos en SQLite) desde begin_request()."""
+    req = getattr(_local, "req", None)
+    _local.req = None
+    return (req[0], req[1]) if req else (0, 0.0)
+
+
+_kinds: dict[str, str] = {}
+
+def _kind(sql: str) -> str:
+    kind = _kinds.get(sql)
+    if kind is None:
+        head = sql.lstrip()[:10].split(None, 1)
+        kind = head[0].lower() if head else "?"
+        if len(_kinds) < 4096:  # los textos de SQL del app son fijos
+            _kinds[sql] = kind
+    return kind
+
+
+class ProfiledConnection(sqlite3.Connection):
+    def _record(self, sql: str, kind: str, dt: float, params=None) -> None:
+        metrics.sql_latency.observe(dt, kind)
+        if _catalog is not None and sql not in _catalog:
+            _catalog[sql] = params
+        req = getattr(_local, "req", None)
+        if req is not None:
+            req[0] += 1
+            req[1] += dt
+        if dt * 1000 >= SLOW_QUERY_MS:
+            metrics.sql_slow.inc(kind)
+            plan = self._plan(sql, kind, params)
+            log.warning("SQL lenta %.1f ms: %s%s", dt * 1000, " ".join(sql.split()),
+                        "\n" + plan if plan else "")
+
+    def _plan(self, sql: str, kind: str, params) -> str:
+        if kind not in _EXPLAINABLE:
+            return ""
+        plan = _plans.get(sql)
+        if plan is None:
+            if params is None:  # executemany: el plan no depende de los valores
+                params = (None,) * sql.count("?")
+            try:
+                rows = super().execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+                plan = "\n".join(f"  {'  ' * (r[1] > 0)}{r[3]}" for r in rows)
+            except sqlite3.Error as e:
+                plan = f"  (sin plan: {e})"
+            if len(_plans) >= PLAN_CACHE_MAX:
+                _plans.clear()
+            _plans[sql] = plan
+        return plan
+
+    def execute(self, sql, *args):
+        t0 = perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            dt = perf_counter() - t0
+            kind = _kind(sql)
+            if kind == "begin" and "IMMEDIATE" in sql.upper():
+                metrics.lock_wait.observe(dt)
+            self._record(sql, kind, dt, args[0] if args else None)
+
+    def executemany(self, sql, *args):
+        t0 = perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            self._record(sql, _kind(sql), perf_counter() - t0)
+
+    def executescript(self, script):
+        t0 = perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            self._record(script[:200], "script", perf_counter() - t0)
+
+    def commit(self):
+        t0 = perf_counter()
+        try:
+            return super().commit()
+        finally:
+            self._record("COMMIT", "commit", perf_counter() - t0)
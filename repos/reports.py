@@ -0,0 +1,134 @@
+# repos/reports.py
+"""
+Resúmenes diarios: daily_seller, daily_payment y daily_product.
+
+Se suman por delta dentro de la transacción de la venta (`apply_sales`), así un
+reporte de cualquier rango lee unas cuantas filas por día en lugar de recorrer
+sales / sale_items / payments. `rebuild` recalcula todo desde los datos crudos
+y compara contra lo acumulado.
+"""
+import json
+from .base import tx, read_conn, many
+
+# {where} filtra las filas de origen: por ids de venta (incremental) o todo (rebuild)
+_SELLER_SELECT = """
+SELECT substr(s.created_at, 1, 10), COALESCE(s.seller_id, 0), MAX(s.seller), COUNT(*),
+       SUM(s.subtotal), SUM(s.discount_total), SUM(s.tax_total), SUM(s.total)
+FROM sales s WHERE {where}
+GROUP BY 1, 2
+"""
+_PAYMENT_SELECT = """
+SELECT substr(p.created_at, 1, 10), p.method, COUNT(*), SUM(p.amount)
+FROM payments p WHERE {where}
+GROUP BY 1, 2
+"""
+# mismas expresiones que repos.sales.REFRESH_TOTALS_SQL: el importe es la suma de line_total (pricing.line)
+_PRODUCT_SELECT = """
+SELECT substr(s.created_at, 1, 10), COALESCE(pr.category_id, 0), COALESCE(si.sku, ''),
+       COUNT(*), SUM(si.qty), SUM(si.qty*si.unit_price), SUM(si.discount),
+       SUM(((si.qty*si.unit_price)-si.discount)*si.tax_rate), SUM(si.line_total)
+FROM sale_items si
+JOIN sales s ON s.id = si.sale_id
+LEFT JOIN products pr ON pr.sku = si.sku
+WHERE {where}
+GROUP BY 1, 2, 3
+"""
+
+TABLES = {
+    "daily_seller": (("day", "seller_id"),
+                     ("seller", "sales_count", "subtotal", "discount_total", "tax_total", "total"),
+                     _SELLER_SELECT, "s.id"),
+    "daily_payment": (("day", "method"), ("payments_count", "amount"), _PAYMENT_SELECT, "p.sale_id"),
+    "daily_product": (("day", "category_id", "sku"),
+                      ("lines", "qty", "subtotal", "discount", "tax", "total"),
+                      _PRODUCT_SELECT, "si.sale_id"),
+}
+
+
+def _upsert_sql(table: str, id_col: str | None = None) -> str:
+    keys, values, select, sale_col = TABLES[table]
+    sets = ", ".join(f"{c}=excluded.{c}" if c == "seller" else f"{c}={c}+excluded.{c}" for c in values)
+    return (f"INSERT INTO {table}({', '.join(keys + values)}) "
+            + select.format(where=f"{id_col or sale_col} IN (SELECT value FROM json_each(:ids))")
+            + f" ON CONFLICT({', '.join(keys)}) DO UPDATE SET {sets}")
+
+UPSERT_SQL = {t: _upsert_sql(t) for t in TABLES}
+# abonos posteriores a la venta: sólo daily_payment, por id de pago
+PAYMENTS_UPSERT_SQL = _upsert_sql("daily_payment", "p.id")
+
+
+def apply_sales(conn, sale_ids: list[int]) -> None:
+    """Suma ventas recién insertadas (con totales ya calculados) a los resúmenes.
+    Llamar dentro de la misma transacción que las insertó."""
+    if sale_ids:
+        ids = {"ids": json.dumps(list(sale_ids))}
+        for sql in UPSERT_SQL.values():
+            conn.execute(sql, ids)
+
+
+def apply_payments(conn, payment_ids: list[int]) -> None:
+    """Suma pagos agregados a ventas ya registradas (abonos) a daily_payment."""
+    if payment_ids:
+        conn.execute(PAYMENTS_UPSERT_SQL, {"ids": json.dumps(list(payment_ids))})
+
+
+# ---- reporte ----
+def daily(date_from: str, date_to: str) -> dict:
+    """Resumen del rango [date_from, date_to] ('YYYY-MM-DD', inclusivo)."""
+    r = {"from": date_from, "to": date_to}
+    with read_conn() as conn:
+        args = (date_from, date_to)
+        r["days"] = many(conn.execute("""
+            SELECT day, SUM(sales_count) AS sales_count, SUM(subtotal) AS subtotal,
+                   SUM(discount_total) AS discount_total, SUM(tax_total) AS tax_total, SUM(total) AS total
+            FROM daily_seller WHERE day BETWEEN ? AND ? GROUP BY day ORDER BY day""", args))
+        r["by_seller"] = many(conn.execute("""
+            SELECT seller_id, MAX(seller) AS seller, SUM(sales_count) AS sales_count, SUM(total) AS total
+            FROM daily_seller WHERE day BETWEEN ? AND ? GROUP BY seller_id ORDER BY total DESC""", args))
+        r["by_method"] = many(conn.execute("""
+            SELECT method, SUM(payments_count) AS payments_count, SUM(amount) AS amount
+            FROM daily_payment WHERE day BETWEEN ? AND ? GROUP BY method ORDER BY amount DESC""", args))
+        r["by_category"] = many(conn.execute("""
+            SELECT d.category_id, COALESCE(c.name, 'Sin categoría') AS category,
+                   SUM(d.qty) AS qty, SUM(d.total) AS total
+            FROM daily_product d LEFT JOIN categories c ON c.id = d.category_id
+            WHERE d.day BETWEEN ? AND ? GROUP BY d.category_id ORDER BY total DESC""", args))
+        r["by_sku"] = many(conn.execute("""
+            SELECT sku, SUM(lines) AS lines, SUM(qty) AS qty, SUM(total) AS total
+            FROM daily_product WHERE day BETWEEN ? AND ? GROUP BY sku ORDER BY total DESC""", args))
+    r["totals"] = {k: sum(d[k] for d in r["days"]) for k in ("sales_count", "subtotal", "tax_total", "total")}
+    r["totals"]["collected"] = sum(m["amount"] for m in r["by_method"])
+    return r
+
+
+# ---- recálculo ----
+def _scan(conn, table: str, sql_from: str) -> dict[tuple, tuple]:
+    nkeys = len(TABLES[table][0])
+    return {tuple(row[:nkeys]): tuple(row[nkeys:]) for row in conn.execute(sql_from)}
+
+def _diff(stored: dict, fresh: dict, tol: float = 0.005) -> list[dict]:
+    def same(a, b):
+        return all(x == y if isinstance(x, str) or isinstance(y, str) else abs((x or 0) - (y or 0)) <= tol
+                   for x, y in zip(a, b))
+    out = []
+    for key in stored.keys() | fresh.keys():
+        a, b = stored.get(key), fresh.get(key)
+        if a is None or b is None or not same(a, b):
+            out.append({"key": list(key), "stored": a and list(a), "expected": b and list(b)})
+    return sorted(out, key=lambda d: [str(k) for k in d["key"]])
+
+def rebuild(check_only: bool = False) -> dict[str, list[dict]]:
+    """Recalcula los resúmenes desde sales/sale_items/payments y regresa las
+    diferencias contra lo acumulado por tabla. Si no es check_only, reemplaza
+    el contenido. La categoría se toma del catálogo actual: un producto
+    recategorizado aparece como diferencia."""
+    diffs = {}
+    with tx() as conn:
+        for table, (keys, values, select, _) in TABLES.items():
+            fresh_sql = select.format(where="1")
+            diffs[table] = _diff(_scan(conn, table, f"SELECT {', '.join(keys + values)} FROM {table}"),
+                                 _scan(conn, table, fresh_sql))
+            if not check_only and diffs[table]:
+                conn.execute(f"DELETE FROM {table}")
+                conn.execute(f"INSERT INTO {table}({', '.join(keys + values)}) {fresh_sql}")
+    return diffs
@@ -1,10 +1,111 @@
 # repos/sales.py
-from .base import tx, get_conn, one, many
+import json
+from typing import Iterator
+import pricing
+from .base import tx, read_conn, one, many
+from .catalog import cache as catalog
+from . import folios
+from . import reports
+
+
+# Totales por venta en UNA pasada (mismas expresiones que v_sales_calc; el
+# importe es la suma de line_total, que calcula pricing.line);
+# reemplaza a trg_items_ai, que re-agregaba toda la venta por cada renglón
+# insertado (ver migración 003).
+# Subconsultas correlacionadas por PK/índice: no materializan nada.
+# Cada UPDATE de sales sube rev en la misma sentencia (caché de tickets, 015).
+REFRESH_TOTALS_SQL = """
+UPDATE sales SET (subtotal, discount_total, tax_total, total) = (
+  SELECT
+    COALESCE(SUM((si.qty*si.unit_price)),0),
+    COALESCE(SUM(si.discount),0),
+    COALESCE(SUM(((si.qty*si.unit_price)-si.discount)*si.tax_rate),0),
+    COALESCE(SUM(si.line_total),0)
+  FROM sale_items si WHERE si.sale_id = sales.id),
+  rev = rev + 1
+WHERE id IN (SELECT value FROM json_each(:ids))
+"""
+
+# paid_total lo llevan los triggers de payments (migración 010); aquí sólo se
+# re-evalúa el estado contra el total recién calculado, sin re-agregar pagos.
+# Una venta en cero (beca completa) queda 'paid' sin pagos (migración 016).
+REFRESH_PAYMENT_STATUS_SQL = """
+UPDATE sales SET payment_status = CASE
+    WHEN paid_total + 0.005 >= total THEN 'paid'
+    WHEN paid_total > 0 THEN 'partial'
+    ELSE 'unpaid'
+  END,
+  rev = rev + 1
+WHERE id IN (SELECT value FROM json_each(:ids))
+"""
+
+def refresh_totals(conn, sale_ids: list[int]) -> None:
+    """Recalcula totales y payment_status de varias ventas en una sola pasada."""
+    if sale_ids:
+        ids = {"ids": json.dumps(list(sale_ids))}
+        conn.execute(REFRESH_TOTALS_SQL, ids)
+        conn.execute(REFRESH_PAYMENT_STATUS_SQL, ids)
+
+def _insert_sale(conn, header: dict, items: list[dict], payments: list[dict], folio: str) -> int:
+    """Inserta encabezado (con su folio ya apartado), renglones y pagos (sin totales). Regresa sale_id."""
+    # 1) Insert header
+    cur = conn.execute("""
+        INSERT INTO sales (folio, customer_id, seller_id, customer, seller, idempotency_key)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (folio, header.get("customer_id"), header.get("seller_id"),
+          header["customer"], header["seller"], header.get("idempotency_key")))
+    sale_id = cur.lastrowid
+
+    # 2) Insert items (sale_id)
+    rows = []
+    for it in items:
+        if it.get("sku") and "tax_rate" not in it:
+            prod = catalog.get(it["sku"])
+            if prod:
+                it["tax_rate"] = prod["tax_rate"]
+        ln = pricing.line(it["qty"], it["unit_price"], it.get("discount", 0.0), it.get("tax_rate", 0.0))
+        rows.append((sale_id, it.get("sku"), it["description_snapshot"], float(it["qty"]),
+                     float(it["unit_price"]), ln["discount"], float(it.get("tax_rate", 0.0)), ln["total"]))
+    conn.executemany("""
+        INSERT INTO sale_items
+        (sale_id, sku, description_snapshot, qty, unit_price, discount, tax_rate, line_total)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+    # 3) Insert payments (sale_id)
+    conn.executemany(INSERT_PAYMENT_SQL, [_payment_row(sale_id, header.get("customer_id"), p) for p in payments])
+    return sale_id
+
+
+# trg_pay_ai suma cada pago a sales.paid_total (y ajusta payment_status)
+INSERT_PAYMENT_SQL = """
+INSERT INTO payments (sale_id, customer_id, method, amount, tendered, reference)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+def _payment_row(sale_id: int, customer_id: int | None, p: dict) -> tuple:
+    tendered = p.get("tendered")
+    return (sale_id, customer_id, p["method"], float(p["amount"]),
+            None if tendered is None else float(tendered), p.get("reference"))
+
+def get_balance(conn, sale_id: int) -> dict | None:
+    """{id, customer_id, total, paid_total, due, payment_status} de la venta (None si no existe)."""
+    row = one(conn.execute(
+        "SELECT id, customer_id, total, paid_total, payment_status FROM sales WHERE id=?", (sale_id,)))
+    if row:
+        row["due"] = max(0.0, round(row["total"] - row["paid_total"], 2))
+    return row
+
+def add_payments(conn, sale_id: int, customer_id: int | None, payments: list[dict]) -> list[int]:
+    """Abonos a una venta existente dentro de la transacción `conn`; regresa los ids."""
+    ids = [conn.execute(INSERT_PAYMENT_SQL, _payment_row(sale_id, customer_id, p)).lastrowid for p in payments]
+    reports.apply_payments(conn, ids)
+    return ids
 
 
 def create_sale(header: dict, items: list[dict], payments: list[dict]) -> dict:
     """
-    header: {customer_id?, seller_id?, customer, seller}
+    header: {customer_id?, seller_id?, customer, seller, series?}
     items:  [{sku?, description_snapshot, qty, unit_price, discount, tax_rate}, ...]
     payments: [{method, amount, reference?}, ...]
     return: {"id": sale_id, "folio": folio}
@@ -13,44 +114,108 @@ def create_sale(header: dict, items: list[dict], payments: list[dict]) -> dict:
         raise ValueError("La venta debe tener al menos un renglón")
 
     with tx() as conn:
-        # 1) Insert header (SIN folio: trigger lo asigna después)
-        cur = conn.execute("""
-            INSERT INTO sales (customer_id, seller_id, customer, seller)
-            VALUES (?, ?, ?, ?)
-        """, (header.get("customer_id"), header.get("seller_id"),
-              header["customer"], header["seller"]))
-        sale_id = cur.lastrowid
-
-        # 2) Insert items (sale_id)
-        for it in items:
-            if it.get("sku") and "tax_rate" not in it:
-                prod = one(conn.execute("SELECT tax_rate FROM products WHERE sku=?", (it["sku"],)))
-                if prod:
-                    it["tax_rate"] = prod["tax_rate"]
-            line_total = max(0.0, (it["qty"] * it["unit_price"] - it.get("discount", 0.0)) * (1 + it.get("tax_rate", 0.0)))
-            conn.execute("""
-                INSERT INTO sale_items
-                (sale_id, sku, description_snapshot, qty, unit_price, discount, tax_rate, line_total)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (sale_id, it.get("sku"), it["description_snapshot"], float(it["qty"]),
-                  float(it["unit_price"]), float(it.get("discount", 0.0)),
-                  float(it.get("tax_rate", 0.0)), line_total))
-
-        # 3) Insert payments (sale_id)
-        for p in payments:
-            conn.execute("""
-                INSERT INTO payments (sale_id, method, amount, reference)
-                VALUES (?, ?, ?, ?)
-            """, (sale_id, p["method"], float(p["amount"]), p.get("reference")))
-
-        # 4) Obtener folio que generó el trigger
-        folio_row = one(conn.execute("SELECT folio FROM sales WHERE id=?", (sale_id,)))
-        folio = folio_row["folio"] if folio_row else None
+        folio = folios.reserve(conn, header.get("series")).folio(0)
+        sale_id = _insert_sale(conn, header, items, payments, folio)
+
+        # 4) Totales y estado de pago, una sola vez por venta
+        refresh_totals(conn, [sale_id])
+        reports.apply_sales(conn, [sale_id])
 
     return {"id": sale_id, "folio": folio}
 
+def create_sales(conn, sales: list[tuple[dict, list[dict], list[dict]]]) -> list[dict | Exception]:
+    """
+    Varias ventas dentro de la transacción abierta `conn` (group commit, lotes).
+    Cada venta va en su SAVEPOINT: si una falla se revierte sólo ella y su
+    lugar en el resultado es la excepción. Totales en una pasada.
+
+    Los folios se apartan como un rango por serie para todo el lote; una venta
+    que falla no consume número (la siguiente toma el suyo) y lo que sobra al
+    final se regresa a la serie.
+    return: [{"id", "folio"} | Exception, ...] en el mismo orden
+    """
+    counts: dict[str | None, int] = {}
+    for header, _, _ in sales:
+        counts[header.get("series")] = counts.get(header.get("series"), 0) + 1
+    ranges = {s: folios.reserve(conn, s, n) for s, n in counts.items()}
+    used = dict.fromkeys(ranges, 0)
+
+    results: list = []
+    for i, (header, items, payments) in enumerate(sales):
+        series = header.get("series")
+        folio = ranges[series].folio(used[series])
+        conn.execute(f"SAVEPOINT sale_{i}")
+        try:
+            if not items:
+                raise ValueError("La venta debe tener al menos un renglón")
+            results.append({"id": _insert_sale(conn, header, items, payments, folio), "folio": folio})
+            conn.execute(f"RELEASE sale_{i}")
+            used[series] += 1
+        except Exception as e:
+            conn.execute(f"ROLLBACK TO sale_{i}")
+            conn.execute(f"RELEASE sale_{i}")
+            results.append(e)
+    for series, rng in ranges.items():
+        folios.release(conn, rng, rng.count - used[series])
+
+    ids = [r["id"] for r in results if not isinstance(r, Exception)]
+    refresh_totals(conn, ids)
+    reports.apply_sales(conn, ids)
+    return results
+
+def find_by_idempotency_keys(conn, keys: list[str]) -> dict[str, dict]:
+    """{idempotency_key: {"id", "folio"}} de las llaves que ya existen."""
+    if not keys:
+        return {}
+    rows = conn.execute(
+        "SELECT idempotency_key, id, folio FROM sales WHERE idempotency_key IN (SELECT value FROM json_each(?))",
+        (json.dumps(keys),)).fetchall()
+    return {r["idempotency_key"]: {"id": r["id"], "folio": r["folio"]} for r in rows}
+
+EXPORT_CHUNK = 500
+
+def iter_sale_chunks(date_from: str | None = None, date_to: str | None = None, chunk: int = EXPORT_CHUNK,
+                     with_items: bool = True, with_payments: bool = True
+                     ) -> Iterator[tuple[list[dict], list[dict], list[dict]]]:
+    """
+    Ventas del rango ('YYYY-MM-DD', inclusivo) en bloques (ventas, renglones,
+    pagos) por keyset (created_at, id) sobre idx_sales_created. Cada bloque es
+    una lectura corta: nunca se tiene el rango completo en memoria. Sin
+    with_items / with_payments esa lista va vacía y no se consulta.
+    """
+    at, last_id = date_from or "", 0
+    end = f"{date_to} 99" if date_to else "9999"  # cualquier hora de date_to
+    while True:
+        with read_conn() as conn:
+            sales = many(conn.execute("""
+                SELECT id, folio, created_at, customer_id, customer, seller_id, seller,
+                       subtotal, discount_total, tax_total, total, status, payment_status
+                FROM sales
+                WHERE (created_at, id) > (?, ?) AND created_at < ?
+                ORDER BY created_at, id LIMIT ?""", (at, last_id, end, chunk)))
+            if not sales:
+                return
+            ids = json.dumps([s["id"] for s in sales])
+            items = many(conn.execute("""
+                SELECT * FROM sale_items WHERE sale_id IN (SELECT value FROM json_each(?))
+                ORDER BY sale_id, id""", (ids,))) if with_items else []
+            pays = many(conn.execute("""
+                SELECT * FROM payments WHERE sale_id IN (SELECT value FROM json_each(?))
+                ORDER BY sale_id, id""", (ids,))) if with_payments else []
+        yield sales, items, pays
+        if len(sales) < chunk:
+            return
+        at, last_id = sales[-1]["created_at"], sales[-1]["id"]
+
+def get_stamp(sale_id: int) -> str | None:
+    """Marca de la versión de la venta (rev + alta); None si no existe. Una lectura por PK."""
+    with read_conn() as conn:
+        row = conn.execute("SELECT rev, created_at FROM sales WHERE id=?", (sale_id,)).fetchone()
+    return None if row is None else f"{row[0]}-{''.join(c for c in row[1] if c.isdigit())}"
+
+
 def get_sale(sale_id: int) -> tuple[dict, list[dict], list[dict]]:
-    with get_conn() as conn:
+    with read_conn() as conn:
         sale = one(conn.execute("SELECT * FROM sales WHERE id=?", (sale_id,)))
         items = many(conn.execute("SELECT * FROM sale_items WHERE sale_id=? ORDER BY id", (sale_id,)))
         pays  = many(conn.execute("SELECT * FROM payments WHERE sale_id=? ORDER BY id", (sale_id,)))
@@ -58,7 +223,7 @@ def get_sale(sale_id: int) -> tuple[dict, list[dict], list[dict]]:
 
 
 def get_sale(id_sale: int) -> tuple[dict, list[dict], list[dict]]:
-    with get_conn() as conn:
+    with read_conn() as conn:
         sale = one(conn.execute("SELECT * FROM sales WHERE id=?", (id_sale,)))
         items = many(conn.execute("SELECT * FROM sale_items WHERE sale_id=? ORDER BY id", (id_sale,)))
         pays  = many(conn.execute("SELECT * FROM payments WHERE sale_id=? ORDER BY id", (id_sale,)))
@@ -0,0 +1,121 @@
+# repos/statement.py
+"""
+Estado de cuenta por alumno: cargos (ventas) y abonos (pagos) en orden de
+fecha con saldo corrido.
+
+Paginación keyset por (created_at, tipo, id): cada rama lee sólo su página
+con idx_sales_customer_created / idx_payments_customer_created y el cursor
+lleva el saldo, así que la página N cuesta lo mismo que la primera sin
+importar los años de historia. Sólo la primera página suma el saldo actual
+(recorre los índices de cobertura, sin tocar las tablas).
+"""
+import base64
+import json
+from typing import Iterator
+from .base import read_conn, many
+
+PAGE = 50
+MAX_ID = 2**63 - 1
+
+# Cargos y abonos con las mismas columnas; tipo 0 = cargo, 1 = abono (a la
+# misma hora el cargo va primero). {op}/{dir} según el sentido del recorrido.
+PAGE_SQL = """
+SELECT * FROM (
+  SELECT created_at, 0 AS kind, id, id AS sale_id, folio, NULL AS method, NULL AS reference,
+         total AS charge, 0.0 AS payment
+  FROM sales
+  WHERE customer_id = :cid AND (created_at, id) {op} (:c_at, :c_id)
+  ORDER BY created_at {dir}, id {dir} LIMIT :n)
+UNION ALL
+SELECT * FROM (
+  SELECT p.created_at, 1, p.id, p.sale_id, s.folio, p.method, p.reference, 0.0, p.amount
+  FROM payments p JOIN sales s ON s.id = p.sale_id
+  WHERE p.customer_id = :cid AND (p.created_at, p.id) {op} (:p_at, :p_id)
+  ORDER BY p.created_at {dir}, p.id {dir} LIMIT :n)
+ORDER BY created_at {dir}, kind {dir}, id {dir}
+LIMIT :n
+"""
+_SQL = {desc: PAGE_SQL.format(op="<" if desc else ">", dir="DESC" if desc else "ASC")
+        for desc in (True, False)}
+
+
+def _encode(row: dict, balance: float) -> str:
+    raw = json.dumps([row["created_at"], row["kind"], row["id"], balance], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode(cursor: str) -> tuple[str, int, int, float]:
+    try:
+        c_at, kind, id_, balance = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(c_at), int(kind), int(id_), float(balance)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
+def _params(customer_id: int, last: tuple[str, int, int] | None, desc: bool, n: int) -> dict:
+    """Límite de cada rama a partir del último renglón entregado."""
+    if last is None:
+        edge = ("9999", MAX_ID) if desc else ("", 0)
+        return {"cid": customer_id, "n": n, "c_at": edge[0], "c_id": edge[1], "p_at": edge[0], "p_id": edge[1]}
+    c_at, kind, id_ = last
+    # Tras un abono ya salieron todos los cargos de ese instante (o faltan todos,
+    # en orden descendente) y viceversa; en ambos sentidos el límite es el mismo.
+    return {"cid": customer_id, "n": n,
+            "c_at": c_at, "c_id": id_ if kind == 0 else MAX_ID,
+            "p_at": c_at, "p_id": id_ if kind == 1 else 0}
+
+
+def summary(customer_id: int, conn=None) -> dict:
+    """Totales de cargos, abonos y saldo actual del alumno."""
+    def q(conn):
+        charges = conn.execute("SELECT COUNT(*), COALESCE(SUM(total), 0) FROM sales WHERE customer_id=?",
+                               (customer_id,)).fetchone()
+        payments = conn.execute("SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM payments WHERE customer_id=?",
+                                (customer_id,)).fetchone()
+        return {"charges_count": charges[0], "charges": round(charges[1], 2),
+                "payments_count": payments[0], "payments": round(payments[1], 2),
+                "balance": round(charges[1] - payments[1], 2)}
+    if conn is not None:
+        return q(conn)
+    with read_conn() as conn:
+        return q(conn)
+
+
+def page(customer_id: int, cursor: str | None = None, limit: int = PAGE) -> dict:
+    """
+    Movimientos del más reciente al más antiguo; `balance` es el saldo después
+    de cada movimiento. Regresa {rows, next (cursor | None), summary (sólo en
+    la primera página)}.
+    """
+    out: dict = {"customer_id": customer_id}
+    with read_conn() as conn:
+        if cursor:
+            c_at, kind, id_, balance = _decode(cursor)
+            last = (c_at, kind, id_)
+        else:
+            out["summary"] = summary(customer_id, conn)
+            balance, last = out["summary"]["balance"], None
+        rows = many(conn.execute(_SQL[True], _params(customer_id, last, True, limit + 1)))
+    more = len(rows) > limit
+    rows = rows[:limit]
+    for r in rows:
+        r["balance"] = balance
+        balance = round(balance - r["charge"] + r["payment"], 2)
+    out["rows"] = rows
+    out["next"] = _encode(rows[-1], balance) if more else None
+    return out
+
+
+def iter_rows(customer_id: int, chunk: int = 500) -> Iterator[dict]:
+    """Todos los movimientos del más antiguo al más reciente con saldo corrido
+    (para exportar). Lee por bloques keyset: memoria constante."""
+    balance, last = 0.0, None
+    while True:
+        with read_conn() as conn:
+            rows = many(conn.execute(_SQL[False], _params(customer_id, last, False, chunk)))
+        for r in rows:
+            balance = round(balance + r["charge"] - r["payment"], 2)
+            r["balance"] = balance
+            yield r
+        if len(rows) < chunk:
+            return
+        last = (rows[-1]["created_at"], rows[-1]["kind"], rows[-1]["id"])
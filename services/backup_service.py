@@ -0,0 +1,249 @@
+# services/backup_service.py
+"""
+Respaldos en caliente de la BD.
+
+La copia usa la API de backup de SQLite por pasos (`pages` páginas y una
+pausa entre pasos) desde una conexión de sólo lectura, para no acaparar
+disco/CPU mientras la caja vende. La conexión de origen mantiene una lectura
+abierta: en WAL todos los pasos ven el mismo snapshot y las escrituras de
+otras conexiones no reinician la copia. Si aun así se reinicia (BD sin WAL)
+MAX_RESTARTS veces, se copia en un solo paso.
+
+El archivo se comprime al vuelo (gzip, o zstd si está instalado `zstandard`),
+se verifica descomprimiéndolo contra el SHA-256 de la copia y se deja un
+`.sha256` al lado (formato de sha256sum) que `restaurar` vuelve a validar.
+"""
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+from urllib.parse import quote
+from config import (BACKUP_DIR, BACKUP_COMPRESS, BACKUP_PAGES, BACKUP_SLEEP_MS,
+                    BACKUP_KEEP, BACKUP_KEEP_DAILY)
+from repos import base as db_base
+try:
+    import zstandard  # opcional: --compress zstd
+except ImportError:
+    zstandard = None
+
+CHUNK = 1 << 20
+MAX_RESTARTS = 3
+SUFFIX = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+NAME_RE = re.compile(r"^backup_(\d{8})-(\d{6})\.db(\.gz|\.zst)?$")
+
+
+class BackupError(Exception):
+    pass
+
+
+class _Restarted(Exception):
+    pass
+
+
+# ---- compresión por sufijo ----
+class _HashingWriter:
+    """Envuelve un archivo y calcula el SHA-256 de lo que se escribe."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.sha = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.sha.update(data)
+        return self.fh.write(data)
+
+    def flush(self):
+        self.fh.flush()
+
+
+def _codec(path: Path) -> str:
+    return {".gz": "gzip", ".zst": "zstd"}.get(path.suffix, "none")
+
+def _require(codec: str) -> None:
+    if codec not in SUFFIX:
+        raise BackupError(f"Compresión desconocida: {codec} (gzip, zstd, none)")
+    if codec == "zstd" and zstandard is None:
+        raise BackupError("Para zstd instala el paquete 'zstandard' (pip install zstandard)")
+
+def _compress(src: Path, dst: Path) -> tuple[str, str]:
+    """Copia src -> dst comprimiendo según el sufijo. Regresa (sha crudo, sha del archivo)."""
+    codec = _codec(dst)
+    raw = hashlib.sha256()
+    with src.open("rb") as fin, dst.open("wb") as fout:
+        hw = _HashingWriter(fout)
+        if codec == "gzip":
+            out = gzip.GzipFile(filename="", mode="wb", fileobj=hw, compresslevel=6, mtime=0)
+        elif codec == "zstd":
+            out = zstandard.ZstdCompressor(level=3).stream_writer(hw, closefd=False)
+        else:
+            out = hw
+        while chunk := fin.read(CHUNK):
+            raw.update(chunk)
+            out.write(chunk)
+        if out is not hw:
+            out.close()
+        fout.flush()
+        os.fsync(fout.fileno())
+    return raw.hexdigest(), hw.sha.hexdigest()
+
+def _open_decompressed(path: Path):
+    codec = _codec(path)
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    if codec == "zstd":
+        _require("zstd")
+        return zstandard.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+    return path.open("rb")
+
+def _sha_file(path: Path, decompress: bool = False) -> str:
+    sha = hashlib.sha256()
+    with (_open_decompressed(path) if decompress else path.open("rb")) as fh:
+        while chunk := fh.read(CHUNK):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def _quick_check(path: Path) -> str:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# ---- copia por pasos ----
+def _paged_copy(db_path: str, tmp: Path, pages: int, sleep_ms: float) -> dict:
+    st = {"steps": 0, "restarts": 0, "one_step": False}
+    src = sqlite3.connect(f"file:{quote(str(db_path))}?mode=ro", uri=True)
+    dst = sqlite3.connect(tmp)
+    try:
+        last = None
+
+        def progress(status, remaining, total):
+            nonlocal last
+            st["steps"] += 1
+            if last is not None and remaining > last:  # otra conexión escribió: reinicio
+                st["restarts"] += 1
+                if st["restarts"] >= MAX_RESTARTS:
+                    raise _Restarted()
+            last = remaining
+            if remaining and sleep_ms:
+                time.sleep(sleep_ms / 1000)  # cede disco y GIL a las ventas
+
+        # lectura abierta durante toda la copia: en WAL cada paso ve el mismo
+        # snapshot y las ventas que entran no reinician el respaldo
+        src.execute("BEGIN")
+        src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        try:
+            src.backup(dst, pages=pages, progress=progress)
+        except _Restarted:
+            st["one_step"] = True
+            src.backup(dst)
+        dst.execute("PRAGMA journal_mode=DELETE")  # archivo autocontenido (sin -wal)
+    finally:
+        dst.close()
+        src.close()
+    return st
+
+
+def respaldar(dest_dir: Path = BACKUP_DIR, compress: str = BACKUP_COMPRESS, pages: int = BACKUP_PAGES,
+              sleep_ms: float = BACKUP_SLEEP_MS, dst: Path | None = None, db_path: str | None = None) -> dict:
+    """Respaldo verificado. `dst` fija el archivo (la compresión sale del sufijo);
+    si se omite se crea backup_YYYYmmdd-HHMMSS.db[.gz|.zst] en `dest_dir`."""
+    if dst is None:
+        _require(compress)
+        dst = Path(dest_dir) / f"backup_{datetime.now():%Y%m%d-%H%M%S}.db{SUFFIX[compress]}"
+    else:
+        _require(_codec(dst))
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    t0 = time.perf_counter()
+    try:
+        st = _paged_copy(db_path or db_base.pool.db_path, tmp, pages, sleep_ms)
+        copy_s = time.perf_counter() - t0
+        check = _quick_check(tmp)
+        if check != "ok":
+            raise BackupError(f"La copia no pasó quick_check: {check}")
+        raw_sha, file_sha = _compress(tmp, dst)
+        if _sha_file(dst, decompress=True) != raw_sha:
+            dst.unlink(missing_ok=True)
+            raise BackupError("Verificación fallida: el archivo comprimido no coincide con la copia")
+        Path(f"{dst}.sha256").write_text(f"{file_sha}  {dst.name}\n", encoding="utf-8")
+        db_bytes = tmp.stat().st_size
+    finally:
+        tmp.unlink(missing_ok=True)
+    return {"file": str(dst), "bytes": dst.stat().st_size, "db_bytes": db_bytes, "sha256": file_sha,
+            "copy_seconds": round(copy_s, 3), "seconds": round(time.perf_counter() - t0, 3), **st}
+
+
+def rotar(dest_dir: Path = BACKUP_DIR, keep: int = BACKUP_KEEP, keep_daily: int = BACKUP_KEEP_DAILY) -> list[Path]:
+    """Conserva los `keep` más recientes y el último de cada uno de los últimos
+    `keep_daily` días; borra el resto (con su .sha256). Regresa los borrados."""
+    files = sorted((p for p in Path(dest_dir).glob("backup_*") if NAME_RE.match(p.name)),
+                   key=lambda p: p.name[7:22], reverse=True)
+    keepers = set(files[:keep])
+    days: set[str] = set()
+    for p in files:
+        day = p.name[7:15]
+        if day not in days and len(days) < keep_daily:
+            days.add(day)
+            keepers.add(p)
+    removed = [p for p in files if p not in keepers]
+    for p in removed:
+        p.unlink(missing_ok=True)
+        Path(f"{p}.sha256").unlink(missing_ok=True)
+    return removed
+
+
+def programar(every_s: float, on_result: Callable[[dict | Exception], None], **kwargs) -> None:
+    """Respaldo + rotación cada `every_s` segundos (alineado al reloj) hasta Ctrl+C."""
+    rot = {k: kwargs.pop(k) for k in ("keep", "keep_daily") if k in kwargs}
+    while True:
+        try:
+            res = respaldar(**kwargs)
+            res["removed"] = [str(p) for p in rotar(kwargs.get("dest_dir", BACKUP_DIR), **rot)]
+            on_result(res)
+        except Exception as e:  # un respaldo fallido no detiene los siguientes
+            on_result(e)
+        time.sleep(every_s - (time.time() % every_s))
+
+
+def restaurar(src: Path, db_path: str | None = None) -> dict:
+    """Reemplaza la BD por el respaldo `src` (verificado). La BD actual queda
+    como <db>.pre-restore-<fecha>. El servidor debe estar detenido."""
+    db_path = Path(db_path or db_base.pool.db_path)
+    sidecar = Path(f"{src}.sha256")
+    if sidecar.exists():
+        expected = sidecar.read_text(encoding="utf-8").split()[0]
+        if _sha_file(src) != expected:
+            raise BackupError(f"Checksum no coincide con {sidecar.name}: archivo dañado")
+    tmp = db_path.with_name(f".{db_path.name}.restore.tmp")
+    with _open_decompressed(src) as fin, tmp.open("wb") as fout:
+        shutil.copyfileobj(fin, fout, CHUNK)
+        fout.flush()
+        os.fsync(fout.fileno())
+    check = _quick_check(tmp)
+    if check != "ok":
+        tmp.unlink(missing_ok=True)
+        raise BackupError(f"El respaldo no pasó quick_check: {check}")
+
+    db_base.close_pools()
+    previous = None
+    if db_path.exists():
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # lo pendiente del WAL al archivo
+        finally:
+            conn.close()
+        previous = db_path.with_name(f"{db_path.name}.pre-restore-{datetime.now():%Y%m%d-%H%M%S}")
+        os.replace(db_path, previous)
+    for ext in ("-wal", "-shm"):
+        Path(f"{db_path}{ext}").unlink(missing_ok=True)
+    os.replace(tmp, db_path)
+    db_base.reset_pool(str(db_path))
+    return {"restored": str(db_path), "from": str(src), "previous": previous and str(previous)}
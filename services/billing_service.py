@@ -0,0 +1,94 @@
+# services/billing_service.py
+"""
+Colegiaturas (y cualquier cargo mensual por alumno) en lote: una venta sin
+pago por alumno activo del salón. Ver repos/billing.py.
+"""
+import re
+import time
+from datetime import date
+import pricing
+from repos import base as db_base
+from repos import billing as billing_repo
+from services.pricing_service import reglas
+
+BILL_CHUNK = 1000   # alumnos por transacción
+PREVIEW_ROWS = 50
+PERIOD_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+
+def periodo_actual() -> str:
+    return date.today().strftime("%Y-%m")
+
+
+def _producto(conn, sku: str) -> dict:
+    row = conn.execute("SELECT sku, description, price, tax_rate FROM products WHERE sku=? AND active=1",
+                       (sku,)).fetchone()
+    if row is None:
+        raise ValueError(f"Producto inexistente o inactivo: {sku}")
+    return dict(row)
+
+
+def _vendedor(conn, seller_id: int | None) -> str:
+    if seller_id is None:
+        return "Colegiaturas"
+    row = conn.execute("SELECT first_name || ' ' || IFNULL(second_name,'') FROM sellers WHERE id=?",
+                       (seller_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Vendedor inexistente: {seller_id}")
+    return row[0]
+
+
+def facturar(period: str, sku: str, grade_id: int | None = None, group_id: int | None = None,
+             shift_id: int | None = None, seller_id: int | None = None, dry_run: bool = False,
+             chunk: int = BILL_CHUNK, series: str | None = None) -> dict:
+    """
+    Cobra `sku` del periodo 'YYYY-MM' a los alumnos activos del filtro que aún
+    no lo tienen, con folios de `series` (default FOLIO_SERIES). Cada alumno
+    paga el precio de lista menos su beca y descuento de hermanos; el pronto
+    pago no se carga aquí (aplica al pagar en caja). dry_run: sólo cuenta y
+    regresa la lista (`preview`, con el importe de cada alumno), sin escribir.
+    return: {period, sku, description, amount (precio de lista), students,
+             billed (antes), created, total (lo cobrado, o por cobrar en
+             dry_run), first_folio, last_folio, seconds, per_s, preview?}
+    """
+    if not PERIOD_RE.match(period or ""):
+        raise ValueError("Periodo en formato YYYY-MM")
+    filters = {"grade_id": grade_id, "group_id": group_id, "shift_id": shift_id}
+    t0 = time.perf_counter()
+    lookup = reglas(early_payment=False)
+    with db_base.read_conn() as conn:
+        product = _producto(conn, sku)
+        seller = _vendedor(conn, seller_id)
+        out = {"period": period, "sku": sku, "description": f"{product['description']} {period}",
+               "amount": round(pricing.line(1, product["price"], 0.0, product["tax_rate"])["total"], 2),
+               **billing_repo.counts(conn, period, sku, **filters)}
+        todo = billing_repo.pending(conn, period, sku, **filters) if dry_run else []
+
+    total, ids = 0.0, []
+    out["first_folio"] = out["last_folio"] = None
+    if dry_run:
+        for c in todo:
+            percent, names = lookup(c["id"], sku)
+            ln = pricing.line(1, product["price"], 0.0, product["tax_rate"], percent)
+            c.update(discount=round(ln["discount"], 2), amount=round(ln["total"], 2), rules=names)
+            total += ln["total"]
+        out["preview"] = todo[:PREVIEW_ROWS]
+    else:
+        # un INSERT ... SELECT por bloque; cada bloque toma a los siguientes pendientes
+        while True:
+            with db_base.tx() as conn:
+                batch, first, last, charged = billing_repo.insert_chunk(
+                    conn, period, product, out["description"], seller_id, seller, **filters, limit=chunk,
+                    series=series, percent_of=lambda customer_id: lookup(customer_id, sku)[0])
+            ids += batch
+            total += charged
+            if batch:
+                out["first_folio"] = out["first_folio"] or first
+                out["last_folio"] = last
+            if len(batch) < chunk:
+                break
+
+    seconds = time.perf_counter() - t0
+    out.update(created=len(ids), total=round(total, 2), seconds=round(seconds, 3),
+               per_s=round(len(ids) / seconds) if seconds else 0)
+    return out
@@ -0,0 +1,266 @@
+# services/customers_service.py
+"""
+Importación de alumnos (hoja ControlUnico de Alumnos.xlsx o su CSV).
+
+Streaming: las filas se leen de una en una (openpyxl read_only / csv) y se
+escriben por bloques con executemany + INSERT ... ON CONFLICT(enrollment).
+Los IDs de grades/groups/shifts se resuelven en memoria.
+"""
+import csv
+import json
+import math
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+from repos import base as db_base
+
+IMPORT_CHUNK = 1000
+
+# Header map: nombre exacto de las columnas → clave interna
+HEADER_MAP = {
+    "MATRICULA": "enrollment",
+    "NOMBRE": "first_name",
+    "APELLIDO PATERNO": "ap_paterno",
+    "APELLIDO MATERNO": "ap_materno",
+    "DOMICILIO": "address",
+    "GRADO": "grade_code",
+    "GRUPO": "group_code",
+    "HORARIO": "shift_text",     # MATUTINO / VESPERTINO
+    "SEXO": "gender",
+    "NOMBRE MAMÁ": "fullname_mom",
+    "NOMBRE PAPÁ": "fullname_dad",
+    "DIA FNAC": "birth_day",
+    "MES FNAC": "birth_month_es",
+    "AÑO FNAC": "birth_year",
+    "CURP": "curp",
+    "CELULAR 1": "phone",
+    "CELULAR 2": "mobile_phone",
+    "REFERENCIA": "pay_reference",
+}
+
+FIELDS = ["enrollment", "first_name", "second_name", "address", "grade_id", "group_id", "shift_id",
+          "gender", "fullname_mom", "fullname_dad", "birth_date", "curp", "phone", "mobile_phone",
+          "pay_reference", "active"]
+
+UPSERT_SQL = f"""
+INSERT INTO customers({",".join(FIELDS)}) VALUES({",".join("?" * len(FIELDS))})
+ON CONFLICT(enrollment) DO UPDATE SET
+  {", ".join(f"{k}=excluded.{k}" for k in FIELDS if k != "enrollment")}
+"""
+
+# ---- Normalizadores ----
+MONTHS_ES = {
+    "ENERO": 1, "FEBRERO": 2, "MARZO": 3, "ABRIL": 4, "MAYO": 5, "JUNIO": 6,
+    "JULIO": 7, "AGOSTO": 8, "SEPTIEMBRE": 9, "SETIEMBRE": 9, "OCTUBRE": 10, "NOVIEMBRE": 11, "DICIEMBRE": 12
+}
+
+def to_birth_date(day, month_es, year):
+    if day in (None, "", 0) or year in (None, "", 0) or not month_es:
+        return None
+    try:
+        d = int(float(day))
+        y = int(float(year))
+        if isinstance(month_es, (int, float)) and not math.isnan(month_es):
+            m = int(month_es)
+        elif str(month_es).strip().isdigit():
+            m = int(str(month_es).strip())
+        else:
+            m = MONTHS_ES.get(str(month_es).strip().upper())
+        if not m: return None
+        return datetime(y, m, d).strftime("%Y-%m-%d")
+    except Exception:
+        return None
+
+def to_shift_code(txt):
+    if not txt: return None
+    t = str(txt).strip().upper()
+    if t.startswith("MAT"): return "MAT"
+    if t.startswith("VES"): return "VES"
+    return None
+
+def to_gender(g):
+    if not g: return None
+    gg = str(g).strip().upper()
+    if gg.startswith("M"): return "F"
+    if gg.startswith("H"): return "M"
+    return None
+
+def to_text(x):
+    if x is None: return None
+    s = str(x).strip()
+    return s if s != "" else None
+
+def to_enrollment(x):
+    # enrollment podría venir como número → texto sin decimales
+    if x is None or str(x).strip() == "":
+        return None
+    if isinstance(x, float):
+        return str(int(x))
+    s = str(x).strip()
+    if s.endswith(".0") and s[:-2].isdigit():  # "123.0" exportado desde Excel a CSV
+        return s[:-2]
+    return s
+
+
+# ---- Lectores (generadores de filas; la primera es el encabezado) ----
+def iter_xlsx(src: Path, sheet: str) -> Iterator[tuple]:
+    import openpyxl
+    wb = openpyxl.load_workbook(src, read_only=True, data_only=True)
+    try:
+        if sheet not in wb.sheetnames:
+            raise ValueError(f"La hoja '{sheet}' no existe. Hojas: {wb.sheetnames}")
+        yield from wb[sheet].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+def iter_csv(src: Path) -> Iterator[list]:
+    with src.open(encoding="utf-8-sig", newline="") as fh:
+        yield from csv.reader(fh)
+
+def iter_source(src: Path, sheet: str = "ControlUnico") -> Iterator:
+    return iter_csv(src) if src.suffix.lower() == ".csv" else iter_xlsx(src, sheet)
+
+
+class _CatalogIds:
+    """code -> id de grades/groups/shifts en memoria; crea los que falten."""
+
+    def __init__(self, conn, dry_run: bool):
+        self.dry_run = dry_run
+        self.ids = {t: dict(conn.execute(f"SELECT code, id FROM {t}").fetchall())
+                    for t in ("grades", "groups", "shifts")}
+
+    def get(self, conn, table: str, code) -> int | None:
+        if not code: return None
+        known = self.ids[table]
+        if code not in known:
+            if self.dry_run:
+                return None
+            known[code] = conn.execute(f"INSERT INTO {table}(code, name) VALUES(?, ?)", (code, code)).lastrowid
+        return known[code]
+
+
+def _to_record(row, idx: dict) -> dict:
+    def cell(key):
+        col = idx.get(key)
+        if col is None or col >= len(row): return None
+        v = row[col]
+        if isinstance(v, str):
+            v = v.strip()
+            return v if v != "" else None
+        return v
+
+    ap1, ap2 = to_text(cell("ap_paterno")), to_text(cell("ap_materno"))
+    return {
+        "enrollment": to_enrollment(cell("enrollment")),
+        "first_name": to_text(cell("first_name")),
+        "second_name": " ".join([x for x in [ap1, ap2] if x]).strip() or None,  # apellidos concatenados
+        "address": to_text(cell("address")),
+        "grade_code": to_text(cell("grade_code")),
+        "group_code": to_text(cell("group_code")),
+        "shift_code": to_shift_code(to_text(cell("shift_text"))),
+        "gender": to_gender(cell("gender")),
+        "fullname_mom": to_text(cell("fullname_mom")),
+        "fullname_dad": to_text(cell("fullname_dad")),
+        "birth_date": to_birth_date(cell("birth_day"), cell("birth_month_es"), cell("birth_year")),
+        "curp": to_text(cell("curp")),
+        "phone": cell("phone"),
+        "mobile_phone": cell("mobile_phone"),
+        "pay_reference": to_text(cell("pay_reference")),
+        "active": 1,
+    }
+
+
+def importar_alumnos(rows: Iterable, dry_run: bool = False, chunk_size: int = IMPORT_CHUNK,
+                     on_error: Callable[[int, str], None] | None = None,
+                     on_progress: Callable[[dict], None] | None = None) -> dict:
+    """
+    Upsert por 'enrollment' (MATRICULA). Crea grades/groups/shifts por 'code'
+    si faltan. `rows` es un iterable cuya primera fila es el encabezado.
+    Confirma cada `chunk_size` filas; en dry_run no escribe nada.
+    return: {"inserts", "updates", "errors", "rows", "seconds", "rows_per_s"}
+    """
+    it = iter(rows)
+    headers = [str(h or "").strip() for h in next(it, [])]
+    idx = {k_int: headers.index(k_excel) if k_excel in headers else None  # columna opcional ausente
+           for k_excel, k_int in HEADER_MAP.items()}
+
+    stats = {"inserts": 0, "updates": 0, "errors": 0, "rows": 0}
+    t0 = time.perf_counter()
+    chunk: list[tuple[int, dict]] = []
+
+    with db_base.get_conn() as conn:
+        catalogs = _CatalogIds(conn, dry_run)
+
+    def flush():
+        with db_base.tx() as conn:
+            enrollments = [rec["enrollment"] for _, rec in chunk]
+            existing = {r[0] for r in conn.execute(
+                "SELECT enrollment FROM customers WHERE enrollment IN (SELECT value FROM json_each(?))",
+                (json.dumps(enrollments),))}
+            params = []
+            for _, rec in chunk:
+                rec["grade_id"] = catalogs.get(conn, "grades", rec.pop("grade_code"))
+                rec["group_id"] = catalogs.get(conn, "groups", rec.pop("group_code"))
+                rec["shift_id"] = catalogs.get(conn, "shifts", rec.pop("shift_code"))
+                params.append(tuple(rec[k] for k in FIELDS))
+            if not dry_run:
+                failed = _upsert_chunk(conn, params, [r for r, _ in chunk], on_error)
+                stats["errors"] += len(failed)
+                stats["rows"] -= len(failed)
+                enrollments = [e for (r, _), e in zip(chunk, enrollments) if r not in failed]
+            updates = sum(1 for e in set(enrollments) if e in existing)
+            stats["updates"] += updates
+            stats["inserts"] += len(set(enrollments)) - updates
+        chunk.clear()
+
+    for r, row in enumerate(it, start=2):  # fila 1 = encabezado
+        try:
+            rec = _to_record(row, idx)
+            if rec["enrollment"] is None:
+                continue  # fila vacía
+            # Validación mínima
+            if not rec["first_name"]:
+                raise ValueError("NOMBRE vacío")
+            chunk.append((r, rec))
+            stats["rows"] += 1
+        except Exception as e:
+            stats["errors"] += 1
+            if on_error: on_error(r, str(e))
+        if len(chunk) >= chunk_size:
+            flush()
+            if on_progress: on_progress(_rate(stats, t0))
+    if chunk:
+        flush()
+    return _rate(stats, t0)
+
+
+def _upsert_chunk(conn, params: list[tuple], rownums: list[int],
+                  on_error: Callable[[int, str], None] | None) -> set[int]:
+    """executemany del bloque; si alguna fila viola una restricción (p.ej. CURP
+    repetida) se reintenta fila por fila para aislarla. Regresa las filas fallidas."""
+    conn.execute("SAVEPOINT chunk")
+    try:
+        conn.executemany(UPSERT_SQL, params)
+        conn.execute("RELEASE chunk")
+        return set()
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO chunk")
+        conn.execute("RELEASE chunk")
+    failed = set()
+    for r, p in zip(rownums, params):
+        conn.execute("SAVEPOINT row")
+        try:
+            conn.execute(UPSERT_SQL, p)
+        except sqlite3.IntegrityError as e:
+            conn.execute("ROLLBACK TO row")
+            failed.add(r)
+            if on_error: on_error(r, str(e))
+        conn.execute("RELEASE row")
+    return failed
+
+
+def _rate(stats: dict, t0: float) -> dict:
+    secs = time.perf_counter() - t0
+    return {**stats, "seconds": round(secs, 3), "rows_per_s": round(stats["rows"] / secs, 1) if secs else 0.0}
@@ -0,0 +1,227 @@
+# services/draft_service.py
+"""
+Carritos en borrador del lado del servidor, uno por terminal (cookie
+pos_terminal). La pantalla de venta manda sólo el cambio (agregar un SKU,
+cambiar una cantidad, quitar un renglón, alumno / vendedor) y recibe el
+renglón y los totales ya cotizados (pricing_service); al cobrar, el borrador
+se da de alta con alta_venta y se descarta.
+
+En memoria: LRU acotado (DRAFT_CACHE_MAX) que descarta los carritos sin
+cambios en DRAFT_TTL_S. Con DRAFT_PERSIST cada cambio se escribe en
+draft_sales (repos/drafts.py): un carrito que salió del LRU o sobrevivió a un
+reinicio se recarga de ahí.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator
+from config import DRAFT_CACHE_MAX, DRAFT_TTL_S, DRAFT_PERSIST
+from repos import customers as customers_repo
+from repos import drafts as drafts_repo
+from repos import sellers as sellers_repo
+from repos.catalog import cache as catalog
+from services import pricing_service
+from services.sales_service import alta_venta
+
+HEADER_FIELDS = ("customer_id", "customer_name", "seller_id", "seller_name")
+
+
+def _vacio() -> dict:
+    return {**dict.fromkeys(HEADER_FIELDS), "lines": [], "next_id": 1}
+
+
+class Draft:
+    """Carrito de una terminal; `lock` serializa sus cambios (y su escritura)."""
+    __slots__ = ("terminal", "data", "rev", "touched", "lock")
+
+    def __init__(self, terminal: str, data: dict | None = None, rev: int = 0):
+        self.terminal = terminal
+        self.data = data or _vacio()
+        self.rev = rev
+        self.touched = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class DraftStore:
+    def __init__(self, max_items: int = DRAFT_CACHE_MAX, ttl_s: int = DRAFT_TTL_S, persist: bool = DRAFT_PERSIST):
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self.persist = persist
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self._items: OrderedDict[str, Draft] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, terminal: str) -> Draft:
+        now = time.monotonic()
+        with self._lock:
+            draft = self._items.get(terminal)
+            if draft is not None and now - draft.touched > self.ttl_s:
+                del self._items[terminal]
+                self.expired += 1
+                draft = None
+            if draft is not None:
+                self.hits += 1
+                self._items.move_to_end(terminal)
+                return draft
+            self.misses += 1
+        loaded = drafts_repo.load(terminal, self.ttl_s) if self.persist else None
+        draft = Draft(terminal, *loaded) if loaded else Draft(terminal)
+        with self._lock:
+            draft = self._items.setdefault(terminal, draft)  # otro hilo pudo cargarlo antes
+            self._items.move_to_end(terminal)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self.evictions += 1
+        return draft
+
+    @contextmanager
+    def read(self, terminal: str) -> Iterator[dict]:
+        draft = self._get(terminal)
+        with draft.lock:
+            yield draft.data
+
+    @contextmanager
+    def edit(self, terminal: str) -> Iterator[dict]:
+        """Cambio al carrito: si el bloque no lanza, sube rev y se guarda (DRAFT_PERSIST)."""
+        draft = self._get(terminal)
+        with draft.lock:
+            yield draft.data
+            draft.rev += 1
+            draft.touched = time.monotonic()
+            if self.persist:
+                drafts_repo.save(terminal, draft.data, draft.rev)
+
+    def drop(self, terminal: str) -> None:
+        with self._lock:
+            self._items.pop(terminal, None)
+        if self.persist:
+            drafts_repo.delete(terminal)
+            drafts_repo.purge(self.ttl_s)  # una vez por venta; la tabla es chica
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "size": len(self._items),
+            "max_items": self.max_items,
+            "persist": self.persist,
+        }
+
+
+store = DraftStore()
+
+
+# ---- vista: renglones con su cotización + totales ----
+def _vista(data: dict) -> dict:
+    quote = pricing_service.cotizar(data["lines"], data["customer_id"])
+    rows = [{**ln, "discount": q["discount"], "total": q["total"], "rules": q["rules"]}
+            for ln, q in zip(data["lines"], quote["lines"])]
+    return {**{k: data[k] for k in HEADER_FIELDS}, "rows": rows, "quote": quote}
+
+
+def _renglon(data: dict, line_id: int) -> dict:
+    for ln in data["lines"]:
+        if ln["id"] == line_id:
+            return ln
+    raise KeyError(line_id)
+
+
+def _cantidad(qty) -> float:
+    qty = float(qty)
+    if not (math.isfinite(qty) and qty > 0):
+        raise ValueError("La cantidad debe ser mayor a cero")
+    return qty
+
+
+def carrito(terminal: str) -> dict:
+    with store.read(terminal) as data:
+        return _vista(data)
+
+
+def agregar(terminal: str, sku: str, qty: float = 1.0) -> tuple[dict, int, bool]:
+    """Agrega `sku` al precio del catálogo (o suma a su renglón). Regresa (vista, id del renglón, nuevo)."""
+    qty = _cantidad(qty)
+    product = catalog.get(sku)
+    if not product or not product["active"]:
+        raise ValueError(f"Producto inexistente o inactivo: {sku}")
+    with store.edit(terminal) as data:
+        line = next((ln for ln in data["lines"] if ln["sku"] == sku), None)
+        created = line is None
+        if created:
+            line = {"id": data["next_id"], "sku": sku, "descripcion": product["description"], "qty": qty,
+                    "unit_price": float(product["price"]), "tax_rate": float(product["tax_rate"])}
+            data["next_id"] += 1
+            data["lines"].append(line)
+        else:
+            line["qty"] += qty
+        return _vista(data), line["id"], created
+
+
+def cambiar_cantidad(terminal: str, line_id: int, qty: float) -> dict:
+    """KeyError si el renglón no existe."""
+    qty = _cantidad(qty)
+    with store.edit(terminal) as data:
+        _renglon(data, line_id)["qty"] = qty
+        return _vista(data)
+
+
+def quitar(terminal: str, line_id: int) -> dict:
+    """KeyError si el renglón no existe."""
+    with store.edit(terminal) as data:
+        data["lines"].remove(_renglon(data, line_id))
+        return _vista(data)
+
+
+def asignar(terminal: str, **fields) -> tuple[dict, bool]:
+    """
+    Alumno y/o vendedor del carrito. Regresa (vista, cambió el alumno: hay que
+    recotizar renglones). ValueError: campo o id de alumno / vendedor inexistente.
+    """
+    unknown = set(fields) - set(HEADER_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+    if fields.get("customer_id") is not None and customers_repo.get(fields["customer_id"]) is None:
+        raise ValueError(f"Alumno inexistente: {fields['customer_id']}")
+    if fields.get("seller_id") is not None and sellers_repo.get(fields["seller_id"]) is None:
+        raise ValueError(f"Vendedor inexistente: {fields['seller_id']}")
+    with store.edit(terminal) as data:
+        changed = "customer_id" in fields and fields["customer_id"] != data["customer_id"]
+        data.update(fields)
+        return _vista(data), changed
+
+
+def cobrar(terminal: str, payments: list[dict], series: str | None = None) -> dict:
+    """Da de alta el borrador con alta_venta y lo descarta. ValueError: carrito vacío o pago inválido."""
+    with store.read(terminal) as data:
+        if not data["lines"]:
+            raise ValueError("No hay renglones")
+        res = alta_venta(
+            customer_name=data["customer_name"] or "Alumno",
+            seller_name=data["seller_name"] or "Mostrador",
+            items_ui=[{k: ln[k] for k in ("sku", "descripcion", "qty", "unit_price", "tax_rate")}
+                      for ln in data["lines"]],
+            customer_id=data["customer_id"],
+            seller_id=data["seller_id"],
+            payments=payments,
+            series=series,
+        )
+        data.clear()
+        data.update(_vacio())  # un doble clic ya no encuentra renglones
+    store.drop(terminal)
+    return res
+
+
+def descartar(terminal: str) -> None:
+    with store.read(terminal) as data:
+        data.clear()
+        data.update(_vacio())
+    store.drop(terminal)
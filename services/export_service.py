@@ -0,0 +1,106 @@
+# services/export_service.py
+"""
+Extractos de ventas para contabilidad (CSV y XLSX) en memoria constante.
+
+Todo sale de repos.sales.iter_sale_chunks (bloques keyset por fecha). El CSV
+se entrega por pedazos conforme se escribe; el XLSX usa openpyxl en modo
+write_only (cada hoja va a un archivo temporal) y se guarda a disco antes de
+enviarlo, porque el .xlsx es un zip que no se puede emitir a medias.
+"""
+import csv
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterator
+from repos import sales as sales_repo
+
+KINDS = ("sales", "items", "payments")
+
+COLUMNS = {
+    "sales": ["folio", "fecha", "alumno_id", "alumno", "vendedor", "subtotal", "descuento", "iva", "total",
+              "pagado", "estado_pago"],
+    "items": ["folio", "fecha", "sku", "descripcion", "cantidad", "precio", "descuento", "iva_tasa", "importe"],
+    "payments": ["folio", "fecha_venta", "fecha_pago", "forma", "importe", "referencia"],
+}
+SHEETS = {"sales": "Ventas", "items": "Renglones", "payments": "Pagos"}
+FLUSH_BYTES = 64 * 1024
+
+
+def _check_kind(kind: str) -> None:
+    if kind not in KINDS:
+        raise ValueError(f"Tipo de extracto desconocido: {kind} ({', '.join(KINDS)})")
+
+
+def iter_rows(kind: str, date_from: str | None = None, date_to: str | None = None) -> Iterator[list]:
+    """Renglones planos de `kind` (sales | items | payments) en orden de fecha."""
+    _check_kind(kind)
+    chunks = sales_repo.iter_sale_chunks(date_from, date_to, with_items=kind == "items",
+                                         with_payments=kind != "items")
+    for sales, items, pays in chunks:
+        by_id = {s["id"]: s for s in sales}
+        if kind == "sales":
+            paid: dict[int, float] = {}
+            for p in pays:
+                paid[p["sale_id"]] = paid.get(p["sale_id"], 0.0) + p["amount"]
+            for s in sales:
+                yield [s["folio"], s["created_at"], s["customer_id"], s["customer"], s["seller"],
+                       round(s["subtotal"], 2), round(s["discount_total"], 2), round(s["tax_total"], 2),
+                       round(s["total"], 2), round(paid.get(s["id"], 0.0), 2), s["payment_status"]]
+        elif kind == "items":
+            for it in items:
+                s = by_id[it["sale_id"]]
+                yield [s["folio"], s["created_at"], it["sku"], it["description_snapshot"], it["qty"],
+                       it["unit_price"], it["discount"], it["tax_rate"], round(it["line_total"], 2)]
+        else:
+            for p in pays:
+                s = by_id[p["sale_id"]]
+                yield [s["folio"], s["created_at"], p["created_at"], p["method"], round(p["amount"], 2), p["reference"]]
+
+
+def ventas_csv(kind: str = "sales", date_from: str | None = None, date_to: str | None = None) -> Iterator[str]:
+    """CSV (UTF-8 con BOM para Excel) por pedazos de ~64 KB. Valida `kind` al llamarse,
+    antes de emitir nada."""
+    _check_kind(kind)
+
+    def gen():
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        buf.write("\ufeff")
+        w.writerow(COLUMNS[kind])
+        for row in iter_rows(kind, date_from, date_to):
+            w.writerow(row)
+            if buf.tell() >= FLUSH_BYTES:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+    return gen()
+
+
+def ventas_xlsx(dst: Path, date_from: str | None = None, date_to: str | None = None) -> Path:
+    """Libro con hojas Ventas, Renglones y Pagos (una pasada por hoja)."""
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    for kind in KINDS:
+        ws = wb.create_sheet(SHEETS[kind])
+        ws.append(COLUMNS[kind])
+        for row in iter_rows(kind, date_from, date_to):
+            ws.append(row)
+    wb.save(dst)
+    return dst
+
+
+def ventas_xlsx_stream(date_from: str | None = None, date_to: str | None = None,
+                       block: int = 1 << 16) -> Iterator[bytes]:
+    """Arma el .xlsx en un temporal y lo emite por bloques; el temporal se borra al terminar."""
+    fd, name = tempfile.mkstemp(prefix="ventas_", suffix=".xlsx")
+    os.close(fd)
+    path = Path(name)
+    try:
+        ventas_xlsx(path, date_from, date_to)
+        with path.open("rb") as fh:
+            while data := fh.read(block):
+                yield data
+    finally:
+        path.unlink(missing_ok=True)
@@ -0,0 +1,118 @@
+# services/group_commit.py
+"""
+Escritor único con group commit para altas de venta.
+
+Con synchronous=FULL cada transacción cuesta al menos un fsync y toma el lock
+de escritura. Aquí los hilos de request encolan la venta y esperan un Future;
+un solo hilo escritor toma lo pendiente (hasta `max_batch`, esperando como
+mucho `max_wait_ms` a que lleguen más) y lo confirma en UNA transacción.
+Cada venta conserva su folio y su error (SAVEPOINT por venta).
+"""
+import atexit
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from config import GROUP_COMMIT_MAX_BATCH, GROUP_COMMIT_MAX_WAIT_MS
+from repos import base as db_base
+from repos import sales as sales_repo
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(self, max_batch: int = GROUP_COMMIT_MAX_BATCH,
+                 max_wait_ms: float = GROUP_COMMIT_MAX_WAIT_MS):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._q: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.sales = 0
+        self.errors = 0
+        self.commits = 0
+        self.batch_sizes: Counter = Counter()
+
+    def start(self) -> "GroupCommitWriter":
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sales-writer", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = 5) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._q.put(_STOP)
+            self._thread.join(timeout)
+
+    def submit(self, header: dict, items: list[dict], payments: list[dict]) -> Future:
+        fut: Future = Future()
+        self._q.put((header, items, payments, fut))
+        self.start()
+        return fut
+
+    # ---- hilo escritor ----
+    def _take_batch(self, first) -> tuple[list, bool]:
+        batch, stop = [first], False
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                stop = True
+                break
+            batch.append(job)
+        return batch, stop
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._q.get()
+            if first is _STOP:
+                break
+            batch, stop = self._take_batch(first)
+            self._commit(batch)
+
+    def _commit(self, batch: list) -> None:
+        jobs = [j for j in batch if j[3].set_running_or_notify_cancel()]
+        if not jobs:
+            return
+        try:
+            with db_base.tx() as conn:
+                results = sales_repo.create_sales(conn, [(h, it, p) for h, it, p, _ in jobs])
+        except Exception as e:  # falló el COMMIT: nada del lote quedó guardado
+            for *_, fut in jobs:
+                fut.set_exception(e)
+            self.errors += len(jobs)
+            return
+        self.batches += 1
+        self.commits += 1
+        self.sales += len(jobs)
+        self.batch_sizes[len(jobs)] += 1
+        for (*_, fut), res in zip(jobs, results):
+            if isinstance(res, Exception):
+                self.errors += 1
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "sales": self.sales,
+            "errors": self.errors,
+            "avg_batch": round(self.sales / self.batches, 2) if self.batches else 0.0,
+            "max_batch": max(self.batch_sizes, default=0),
+            "fsyncs_per_sale": round(self.commits / self.sales, 4) if self.sales else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "pending": self._q.qsize(),
+        }
+
+
+writer = GroupCommitWriter()
+atexit.register(writer.stop)
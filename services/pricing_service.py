@@ -0,0 +1,35 @@
+# services/pricing_service.py
+"""
+Cotización del carrito con las reglas de descuento de la escuela
+(repos/discounts.py) sobre la aritmética de pricing.py. La usan
+/api/cart/price mientras se captura, alta_venta al guardar y el cobro de
+colegiaturas (éste sin pronto pago): lo que se cotiza es lo que se cobra.
+"""
+from datetime import date
+from typing import Callable
+import pricing
+from repos.discounts import cache as rules_cache
+
+
+def reglas(today: date | None = None,
+           early_payment: bool = True) -> Callable[[int | None, str | None], tuple[float, list[str]]]:
+    """
+    (alumno, sku) -> (porcentaje, nombres) con las reglas vigentes; para cotizar
+    muchos alumnos en lote. early_payment=False: sólo becas y hermanos (el
+    pronto pago depende del día en que se paga, no del día en que se carga).
+    """
+    rules = rules_cache.rules()
+    day = (today or date.today()).day if early_payment else None
+    return lambda customer_id, sku: rules.lookup(customer_id, sku, day)
+
+
+def cotizar(items: list[dict], customer_id: int | None = None, today: date | None = None) -> dict:
+    """
+    items: renglones (sku?, qty, unit_price, discount?, tax_rate?).
+    return: pricing.price_cart + rules_version (versión de reglas usada).
+    """
+    rules = rules_cache.rules()
+    day = (today or date.today()).day
+    quote = pricing.price_cart(items, lambda sku: rules.lookup(customer_id, sku, day))
+    quote["rules_version"] = rules.version
+    return quote
@@ -0,0 +1,38 @@
+# services/print_service.py
+from repos import business as business_repo
+from repos.sales import get_sale, get_stamp
+from services.sales_service import PAYMENT_METHODS
+from printing.escpos_print import render_ticket
+from printing.spooler import spooler
+from .ticket_cache import escpos_cache
+
+
+def ticket_bytes(sale_id: int, paper_width_mm: int = 58) -> bytes | None:
+    """Ticket ESC/POS completo de la venta (None si no existe); cacheado por versión."""
+    stamp = get_stamp(sale_id)
+    if stamp is None:
+        return None
+    cfg = business_repo.get_config()
+
+    def render():
+        sale, items, pays = get_sale(sale_id)
+        if not sale:
+            return None
+        rows = [{**it, "description": it["description_snapshot"]} for it in items]
+        pays = [{**p, "label": PAYMENT_METHODS.get(p["method"], p["method"])} for p in pays]
+        return render_ticket(cfg, sale, rows, paper_width_mm, pays)
+
+    key = (sale_id, stamp, paper_width_mm, tuple(sorted(cfg.items())))
+    return escpos_cache.get_or_render(key, render)
+
+
+def imprimir_ticket(sale_id: int, printer: str | None = None) -> str | None:
+    """Renderiza y encola el ticket; regresa el id del trabajo (None si no hay venta).
+    KeyError: impresora no configurada. queue.Full: cola llena."""
+    name = printer or spooler.default
+    if name not in spooler.workers:
+        raise KeyError(name)
+    data = ticket_bytes(sale_id, spooler.paper_width(name))
+    if data is None:
+        return None
+    return spooler.submit(data, name, ref=sale_id)
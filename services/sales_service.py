@@ -1,18 +1,22 @@
 # services/sales_service.py
+import json
+import sqlite3
+from itertools import chain, islice
+from typing import Iterable, Iterator
+from config import GROUP_COMMIT
+from repos import base as db_base
+from repos import folios as folios_repo
 from repos import sales as sales_repo
+from services import pricing_service
 
-def alta_venta(
-    customer_name: str,
-    seller_name: str,
-    items_ui: list[dict],
-    customer_id: int | None = None,
-    seller_id: int | None = None,
-    payments: list[dict] | None = None,
-) -> dict:
-    """
-    items_ui: [{sku?, descripcion, qty, unit_price, discount?, tax_rate?}, ...]
-    return: {"id": sale_id, "folio": folio}
-    """
+IMPORT_CHUNK = 500
+PAYMENT_METHODS = {"cash": "Efectivo", "card": "Tarjeta", "transfer": "Transferencia"}
+CENT = 0.005  # tolerancia de redondeo (igual que los triggers de payments)
+
+def _build_sale(customer_name: str, seller_name: str, items_ui: list[dict],
+                customer_id: int | None = None, seller_id: int | None = None,
+                idempotency_key: str | None = None, series: str | None = None) -> tuple[dict, list[dict]]:
+    """Valida y convierte los renglones de la UI al formato de repos.sales."""
     if not items_ui:
         raise ValueError("No hay renglones")
 
@@ -29,11 +33,219 @@ def alta_venta(
             "tax_rate": float(it.get("tax_rate", 0.0)),
         })
 
+    if series is not None:
+        folios_repo.check_series(series)
     header = {
         "customer_id": customer_id,
         "seller_id": seller_id,
         "customer": customer_name,  # snapshot
         "seller": seller_name,      # snapshot
+        "idempotency_key": idempotency_key,
+        "series": series,           # serie de folios (None = FOLIO_SERIES)
     }
+    return header, items
+
+
+def repartir_pagos(due: float, tenders: list[dict]) -> tuple[list[dict], float]:
+    """
+    Reparte lo entregado (tenders: [{method, amount, reference?}, ...]) contra el
+    saldo `due`. Tarjeta y transferencia se aplican primero y no pueden exceder
+    lo que falta; el efectivo cubre el resto y lo que sobra es cambio.
+    Regresa (pagos para repos.sales, cambio). El efectivo guarda lo recibido en
+    `tendered` y como `amount` sólo lo aplicado.
+    """
+    payments, cash = [], []
+    remaining = round(due, 2)
+    for t in tenders:
+        method = t.get("method")
+        if method not in PAYMENT_METHODS:
+            raise ValueError(f"Forma de pago desconocida: {method}")
+        amount = round(float(t.get("amount") or 0), 2)
+        if amount <= 0:
+            raise ValueError("El importe de cada pago debe ser mayor a cero")
+        if method == "cash":
+            cash.append((amount, t.get("reference")))
+            continue
+        if amount > remaining + CENT:
+            raise ValueError(f"El pago con {PAYMENT_METHODS[method].lower()} excede el saldo ({remaining:.2f})")
+        remaining = round(remaining - amount, 2)
+        payments.append({"method": method, "amount": amount, "reference": t.get("reference")})
+
+    change = 0.0
+    for amount, reference in cash:
+        applied = min(amount, remaining)
+        remaining = round(remaining - applied, 2)
+        change = round(change + amount - applied, 2)
+        if applied > 0:
+            payments.append({"method": "cash", "amount": applied, "tendered": amount, "reference": reference})
+    return payments, change
+
+
+def _preparar_venta(customer_name: str, seller_name: str, items_ui: list[dict],
+                    customer_id: int | None = None, seller_id: int | None = None,
+                    payments: list[dict] | None = None, series: str | None = None,
+                    idempotency_key: str | None = None) -> tuple[dict, list[dict], list[dict], float]:
+    """Renglones con los descuentos de las reglas y pagos repartidos: (header, items, pagos, cambio)."""
+    header, items = _build_sale(customer_name, seller_name, items_ui, customer_id, seller_id,
+                                idempotency_key, series)
+    quote = pricing_service.cotizar(items, customer_id)
+    for it, ln in zip(items, quote["lines"]):
+        it["discount"] = ln["discount"]
+    pays, change = repartir_pagos(round(quote["total"], 2), payments or [])
+    return header, items, pays, change
+
+
+def alta_venta(
+    customer_name: str,
+    seller_name: str,
+    items_ui: list[dict],
+    customer_id: int | None = None,
+    seller_id: int | None = None,
+    payments: list[dict] | None = None,
+    series: str | None = None,
+) -> dict:
+    """
+    items_ui: [{sku?, descripcion, qty, unit_price, discount?, tax_rate?}, ...]
+    payments: lo entregado en caja [{method, amount, reference?}, ...]; se
+              reparte con repartir_pagos (el efectivo de más es cambio)
+    series:   serie de folios de la caja (default FOLIO_SERIES)
+    return: {"id": sale_id, "folio": folio, "change": cambio}
+
+    Los descuentos de las reglas (beca, hermanos, pronto pago) se aplican con
+    la misma cotización que /api/cart/price y quedan en cada renglón.
+
+    Con GROUP_COMMIT=1 la venta se encola al escritor único (services/group_commit.py)
+    y se espera su resultado; los errores de la venta se propagan igual. Una
+    restricción de la BD (alumno, vendedor o SKU inexistente) llega como ValueError.
+    """
+    header, items, pays, change = _preparar_venta(customer_name, seller_name, items_ui, customer_id, seller_id,
+                                                  payments, series)
+
+    try:
+        if GROUP_COMMIT:
+            from services.group_commit import writer
+            res = writer.submit(header, items, pays).result()
+        else:
+            res = sales_repo.create_sale(header, items, pays)
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"Venta rechazada: {e}") from e
+    return {**res, "change": change}
+
+
+def abonar(sale_id: int, tenders: list[dict]) -> dict | None:
+    """
+    Pago posterior (parcial o total) a una venta. paid_total y payment_status
+    los ajustan los triggers de payments; el resumen diario se actualiza en la
+    misma transacción. Regresa el saldo nuevo + {change, payment_ids}, o None
+    si la venta no existe.
+    """
+    with db_base.tx() as conn:
+        bal = sales_repo.get_balance(conn, sale_id)
+        if bal is None:
+            return None
+        if bal["due"] <= 0:
+            raise ValueError("La venta ya está pagada")
+        pays, change = repartir_pagos(bal["due"], tenders)
+        ids = sales_repo.add_payments(conn, sale_id, bal["customer_id"], pays)
+        bal = sales_repo.get_balance(conn, sale_id)
+    return {**bal, "change": change, "payment_ids": ids}
+
+
+def importar_ventas(sales: Iterable[dict], chunk_size: int = IMPORT_CHUNK) -> Iterator[dict]:
+    """
+    Alta masiva (tickets capturados sin red). Cada venta es un dict con las
+    mismas claves que alta_venta: customer_name, seller_name, items (formato
+    items_ui), customer_id?, seller_id?, payments?, series?, y `idempotency_key`.
+
+    Cada venta se cotiza y se reparten sus pagos igual que en alta_venta.
+    Se escribe una transacción por bloque de `chunk_size`. Una llave ya
+    registrada regresa la venta existente (duplicate=True) sin duplicarla.
+    Genera, en orden: {"index", "key", "id", "folio", "change", "duplicate"} o
+    {"index", "key", "error"}.
+    """
+    it = iter(sales)
+    index = 0
+    while chunk := list(islice(it, chunk_size)):
+        yield from _importar_bloque(chunk, index)
+        index += len(chunk)
+
+def leer_ventas(lines: Iterable[str]) -> Iterator[dict | None]:
+    """
+    Acepta JSON (lista de ventas u objeto {"sales": [...]}) o NDJSON (una venta
+    por línea). NDJSON se procesa línea por línea sin cargar todo el archivo;
+    una línea ilegible produce None (el import la reporta como error).
+    """
+    it = (ln for ln in lines if ln.strip())
+    first = next(it, None)
+    if first is None:
+        return
+    try:
+        doc = json.loads(first)
+    except ValueError:
+        doc = None
+    if isinstance(doc, dict) and "sales" not in doc:  # NDJSON
+        yield doc
+        for ln in it:
+            try:
+                yield json.loads(ln)
+            except ValueError:
+                yield None
+        return
+    if doc is None:  # documento JSON en varias líneas
+        doc = json.loads("".join(chain([first], it)))
+    yield from (doc.get("sales", []) if isinstance(doc, dict) else doc)
+
+def _importar_bloque(chunk: list, offset: int) -> list[dict]:
+    out: list[dict] = []
+    prepared: dict[int, tuple] = {}   # posición -> (header, items, pagos, cambio)
+    errors: dict[int, str] = {}       # con llave pero inválidas (si la llave ya existe, cuenta como duplicada)
+    # cotizar y repartir pagos fuera de la transacción de escritura
+    for i, s in enumerate(chunk):
+        key = s.get("idempotency_key") if isinstance(s, dict) else None
+        out.append({"index": offset + i, "key": key})
+        try:
+            if not isinstance(s, dict):
+                raise ValueError("Venta inválida")
+            if not key:
+                raise ValueError("Falta idempotency_key")
+        except ValueError as e:
+            out[i]["error"] = str(e)
+            continue
+        try:
+            prepared[i] = _preparar_venta(
+                s.get("customer_name") or "Alumno", s.get("seller_name") or "Mostrador", s.get("items") or [],
+                s.get("customer_id"), s.get("seller_id"), s.get("payments"), s.get("series"), key)
+        except (ValueError, TypeError, KeyError) as e:
+            errors[i] = str(e)
+
+    pending: list[tuple[int, tuple]] = []
+    dup_of: dict[int, int] = {}            # repetidas dentro del mismo envío
+    with db_base.tx() as conn:
+        keyed = sorted([*prepared, *errors])
+        existing = sales_repo.find_by_idempotency_keys(conn, [out[i]["key"] for i in keyed])
+        first: dict[str, int] = {}
+        for i in keyed:
+            key = out[i]["key"]
+            if key in existing:
+                out[i].update(existing[key], duplicate=True)
+            elif key in first:
+                dup_of[i] = first[key]
+            elif i in errors:
+                out[i]["error"] = errors[i]
+            else:
+                first[key] = i
+                pending.append((i, prepared[i]))
+
+        results = sales_repo.create_sales(conn, [sale[:3] for _, sale in pending])
 
-    return sales_repo.create_sale(header, items, payments or [])
+    for (i, sale), r in zip(pending, results):
+        if isinstance(r, Exception):
+            out[i]["error"] = str(r)
+        else:
+            out[i].update(r, change=sale[3], duplicate=False)
+    for i, j in dup_of.items():
+        if "id" in out[j]:
+            out[i].update(id=out[j]["id"], folio=out[j]["folio"], duplicate=True)
+        else:
+            out[i]["error"] = out[j].get("error", "")
+    return out
@@ -0,0 +1,38 @@
+# services/statement_service.py
+"""
+Exportación del estado de cuenta (CSV) en streaming: repos.statement.iter_rows
+lee por bloques keyset y aquí se escribe renglón por renglón, sin armar el
+archivo en memoria. La vista imprimible (PDF desde el navegador) usa el mismo
+iterador.
+"""
+import csv
+import io
+from typing import Iterator
+from repos import statement as statement_repo
+
+CSV_HEADER = ["fecha", "tipo", "folio", "concepto", "cargo", "abono", "saldo"]
+FLUSH_ROWS = 200
+
+
+def concepto(r: dict) -> str:
+    if r["kind"] == 0:
+        return f"Venta {r['folio'] or r['sale_id']}"
+    ref = f" ({r['reference']})" if r["reference"] else ""
+    return f"Pago {r['method']}{ref}"
+
+
+def estado_cuenta_csv(customer_id: int) -> Iterator[str]:
+    """Movimientos del más antiguo al más reciente con saldo corrido, en CSV (UTF-8 con BOM para Excel)."""
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    buf.write("\ufeff")
+    w.writerow(CSV_HEADER)
+    for i, r in enumerate(statement_repo.iter_rows(customer_id), 1):
+        w.writerow([r["created_at"], "cargo" if r["kind"] == 0 else "abono", r["folio"] or "", concepto(r),
+                    f"{r['charge']:.2f}" if r["kind"] == 0 else "", f"{r['payment']:.2f}" if r["kind"] == 1 else "",
+                    f"{r['balance']:.2f}"])
+        if i % FLUSH_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
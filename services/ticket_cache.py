@@ -0,0 +1,55 @@
+# services/ticket_cache.py
+"""
+Caché LRU de tickets ya renderizados (HTML y bytes ESC/POS).
+
+La llave incluye `sales.rev` (lo sube cada UPDATE de sales, migración 015), así
+que una venta modificada simplemente genera otra llave y la entrada vieja sale
+por LRU; no hace falta invalidar.
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+from config import TICKET_CACHE_MAX
+
+
+class RenderCache:
+    def __init__(self, max_items: int = TICKET_CACHE_MAX):
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[Hashable, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key: Hashable, render: Callable[[], object]):
+        with self._lock:
+            if key in self._items:
+                self.hits += 1
+                self._items.move_to_end(key)
+                return self._items[key]
+            self.misses += 1
+        value = render()  # fuera del lock: dos misses simultáneos renderizan igual
+        if value is not None:
+            with self._lock:
+                self._items[key] = value
+                self._items.move_to_end(key)
+                while len(self._items) > self.max_items:
+                    self._items.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self._items),
+            "max_items": self.max_items,
+        }
+
+
+html_cache = RenderCache()
+escpos_cache = RenderCache()
@@ -0,0 +1,58 @@
+# services/warmup.py
+"""
+Calentamiento antes de aceptar tráfico (cli.py serve): la primera venta del día
+no debe pagar compilación de plantillas, apertura de conexiones ni la carga
+del catálogo y de las reglas de descuento.
+"""
+import time
+from repos import base as db_base
+from repos import products as products_repo
+from repos import customers as customers_repo
+from repos.catalog import cache as catalog_cache
+from repos.discounts import cache as discounts_cache
+
+# Lecturas que tocan las tablas e índices calientes (páginas al caché del SO)
+# y dejan registro para PRAGMA optimize en esta conexión.
+WARM_QUERIES = [
+    "SELECT count(*) FROM products",
+    "SELECT count(*) FROM customers",
+    "SELECT max(id), max(created_at) FROM sales",
+    "SELECT count(*) FROM sale_items WHERE sale_id = (SELECT max(id) FROM sales)",
+    "SELECT count(*) FROM payments WHERE sale_id = (SELECT max(id) FROM sales)",
+]
+
+
+def warmup(app, connections: int) -> dict:
+    """Regresa los tiempos por paso en ms; deja app.config["READY"] = True."""
+    steps = {}
+
+    def step(name, fn):
+        t0 = time.perf_counter()
+        fn()
+        steps[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+    def templates():
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+
+    def database():
+        with db_base.read_conn() as conn:
+            for q in WARM_QUERIES:
+                conn.execute(q).fetchall()
+        with db_base.get_conn() as conn:
+            conn.execute("PRAGMA analysis_limit=400")
+            conn.execute("PRAGMA optimize")
+
+    def catalog():
+        catalog_cache.list_active()
+        products_repo.search("a")
+        customers_repo.search("a")
+
+    step("templates", templates)
+    step("pool", lambda: (db_base.pool.prefill(connections), db_base.read_pool.prefill(connections)))
+    step("database", database)
+    step("catalog", catalog)
+    step("discounts", discounts_cache.rules)
+    app.config["READY"] = True
+    app.config["WARMUP"] = steps
+    return steps
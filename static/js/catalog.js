@@ -0,0 +1,133 @@
+// static/js/catalog.js
+// Catálogo de productos en el navegador (IndexedDB) para buscar sin red.
+// Se carga con /api/catalog/snapshot y se mantiene con /api/catalog/changes?since=
+// (delta por versión). Si el servidor no responde se sigue buscando con lo guardado.
+// Misma semántica que repos/catalog.py: SKU por prefijo primero, luego todas las
+// palabras por prefijo (sin acentos), ordenadas por descripción.
+window.posCatalog = (function() {
+    const DB_NAME = 'pos-catalog', SYNC_MS = 30000;
+    let db = null, version = null, ready = false;
+    const bySku = new Map();   // sku -> {sku, description, price, tax_rate, words}
+    let skus = [];             // SKUs ordenados (búsqueda por prefijo)
+
+    const normalize = s => String(s).normalize('NFKD').replace(/\p{M}/gu, '').toLowerCase();
+    const words = s => normalize(s).match(/[\p{L}\p{N}_]+/gu) || [];
+
+    function openDb() {
+        return new Promise((resolve, reject) => {
+            const req = indexedDB.open(DB_NAME, 1);
+            req.onupgradeneeded = () => {
+                req.result.createObjectStore('products', {keyPath: 'sku'});
+                req.result.createObjectStore('meta');
+            };
+            req.onsuccess = () => resolve(req.result);
+            req.onerror = () => reject(req.error);
+        });
+    }
+
+    function done(t) {
+        return new Promise((resolve, reject) => {
+            t.oncomplete = resolve;
+            t.onerror = t.onabort = () => reject(t.error);
+        });
+    }
+
+    function put(p) {
+        bySku.set(p.sku, {...p, words: words(p.sku + ' ' + p.description)});
+    }
+
+    function reindex() {
+        skus = [...bySku.keys()].sort();
+        ready = true;
+    }
+
+    const toProduct = (fields, row) => Object.fromEntries(fields.map((f, i) => [f, row[i]]));
+
+    async function load() {
+        const t = db.transaction(['products', 'meta']);
+        const all = t.objectStore('products').getAll();
+        const ver = t.objectStore('meta').get('version');
+        await done(t);
+        all.result.forEach(put);
+        version = ver.result ?? null;
+        if (version !== null) reindex();
+    }
+
+    // Escribe en IndexedDB y en memoria; `reset` reemplaza todo (snapshot)
+    async function apply(data, reset) {
+        const fields = data.fields || ['sku', 'description', 'price', 'tax_rate'];
+        const rows = (reset ? data.rows : data.upserts).map(r => toProduct(fields, r));
+        const t = db.transaction(['products', 'meta'], 'readwrite');
+        const store = t.objectStore('products');
+        if (reset) { store.clear(); bySku.clear(); }
+        rows.forEach(p => { store.put(p); put(p); });
+        (data.deletes || []).forEach(sku => { store.delete(sku); bySku.delete(sku); });
+        t.objectStore('meta').put(data.version, 'version');
+        await done(t);
+        version = data.version;
+        reindex();
+    }
+
+    async function sync() {
+        if (!db) return;
+        try {
+            if (version === null) {
+                const r = await fetch('/api/catalog/snapshot');
+                if (r.ok) await apply(await r.json(), true);
+                return;
+            }
+            for (;;) {
+                const r = await fetch(`/api/catalog/changes?since=${version}`);
+                if (!r.ok) return;
+                const data = await r.json();
+                if (data.reset) { version = null; return sync(); }
+                if (data.upserts.length || data.deletes.length || data.version !== version) await apply(data, false);
+                if (!data.more) return;
+            }
+        } catch (e) {
+            // sin red: se sigue con el catálogo guardado
+        }
+    }
+
+    function search(q, limit = 20) {
+        const toks = words(q);
+        if (!ready || !toks.length) return [];
+        const out = [], seen = new Set();
+        // 1) SKU por prefijo (búsqueda binaria sobre los SKUs ordenados)
+        const prefix = q.trim().toUpperCase();
+        let lo = 0, hi = skus.length;
+        while (lo < hi) { const mid = (lo + hi) >> 1; if (skus[mid] < prefix) lo = mid + 1; else hi = mid; }
+        for (let i = lo; i < skus.length && skus[i].startsWith(prefix) && out.length < limit; i++) {
+            out.push(bySku.get(skus[i])); seen.add(skus[i]);
+        }
+        if (out.length >= limit) return out;
+        // 2) todas las palabras por prefijo
+        const rest = [];
+        for (const p of bySku.values()) {
+            if (seen.has(p.sku)) continue;
+            if (toks.every(t => p.words.some(w => w.startsWith(t)))) {
+                rest.push(p);
+                if (rest.length >= limit - out.length) break;
+            }
+        }
+        rest.sort((a, b) => a.description.localeCompare(b.description));
+        return out.concat(rest);
+    }
+
+    async function init() {
+        if (!window.indexedDB) return;
+        try {
+            db = await openDb();
+            await load();
+        } catch (e) {
+            db = null;  // modo privado / sin IndexedDB: se busca en el servidor
+            return;
+        }
+        await sync();
+        setInterval(sync, SYNC_MS);
+        window.addEventListener('online', sync);
+        window.addEventListener('focus', sync);
+    }
+
+    return {init, sync, search, isReady: () => ready, version: () => version};
+})();
@@ -10,93 +10,120 @@ document.addEventListener('DOMContentLoaded', function() {
         theme: 'default'
     });
 
-    // Actualizar datos del alumno
-    function updateCustomerData(selectElement) {
-        const selectedOption = selectElement.options[selectElement.selectedIndex];
-        const customerName = selectedOption?.getAttribute('data-name') || '';
-        const customerEnrollment = selectedOption?.getAttribute('data-enrollment') || '';
-        
-        document.getElementById('customer-name').value = customerName;
-        document.getElementById('customer-enrollment').value = customerEnrollment;
+    // El carrito es el borrador del servidor (/drafts/*): aquí sólo se manda
+    // el cambio; la respuesta trae los renglones y totales (hx-swap-oob)
+    function draftPost(url, values){
+        if(window.htmx){ htmx.ajax('POST', url, {values: values, swap: 'none'}); }
+    }
+
+    // Alumno elegido en el typeahead /api/customers/search (becas y hermanos dependen de él)
+    function updateCustomerData(li){
+        document.getElementById('customer-selected').textContent =
+            `${li.dataset.enrollment} - ${li.dataset.name}`;
+        document.getElementById('customer-results').innerHTML = '';
+        draftPost('/drafts/header', {customer_id: li.dataset.customerId, customer_name: li.dataset.name || ''});
     }
 
-    // Actualizar datos del vendedor
-    function updateSellerData(selectElement) {
+    // Vendedor (select2 dispara el change de jQuery)
+    function updateSellerData(selectElement){
         const selectedOption = selectElement.options[selectElement.selectedIndex];
-        const sellerName = selectedOption?.getAttribute('data-name') || '';
-        document.getElementById('seller-name').value = sellerName;
+        draftPost('/drafts/header', {seller_id: selectElement.value,
+                                     seller_name: selectedOption?.getAttribute('data-name') || ''});
     }
 
-    // Inicializar datos de selects
-    function initSelectData() {
-        const customerSelect = document.getElementById('customer-select');
-        const sellerSelect = document.getElementById('seller-select');
-        
-        if (customerSelect) {
-            updateCustomerData(customerSelect);
-            customerSelect.addEventListener('change', function() {
-                updateCustomerData(this);
-            });
-        }
-        
-        if (sellerSelect) {
-            updateSellerData(sellerSelect);
-            sellerSelect.addEventListener('change', function() {
-                updateSellerData(this);
-            });
-        }
+    function initSelectData(){
+        $('#seller-select').on('change', function(){ updateSellerData(this); });
     }
 
-    // Funciones existentes para items
     function addRowFromProduct(p){
-        addRow(p.sku, p.description, 1, p.price, p.tax_rate);
+        draftPost('/drafts/lines', {sku: p.sku});
     }
-    
-    function addRow(sku="", desc="", qty=1, price=0, tax=0){
-        const tbody = document.getElementById('items-body');
-        const tr = document.createElement('tr');
-        tr.innerHTML = `
-            <td><input value="${sku}" readonly oninput="sync()" /></td>
-            <td><input value="${desc}" readonly oninput="sync()" style="width:100%"/></td>
-            <td><input class="right" type="number" value="${price}" readonly oninput="sync()"/></td>
-            <td><input class="right edit" type="number" value="${qty}" oninput="sync()"/></td>    
-            <td><input class="right edit" type="number" value="${tax}" oninput="sync()"/></td>
-            <td class="right" data-importe>0.00</td>
-            <td><button type="button" onclick="this.closest('tr').remove(); sync();">✖</button></td>
-        `;
-        tbody.appendChild(tr);
-        sync();
+
+    // Total cotizado (header HX-Trigger cart-priced de cada respuesta de /drafts/*)
+    const totals = document.getElementById('cart-totals');
+    let cartTotal = totals ? parseFloat(totals.dataset.total || 0) : 0;
+
+    // Formas de pago: tarjeta/transferencia se aplican primero; el efectivo
+    // cubre lo que falta y el excedente es cambio (igual que repartir_pagos)
+    function syncPayments(total){
+        let remaining = Math.round(total*100)/100, received = 0, cash = 0;
+        document.querySelectorAll('#payments-body [data-payment]').forEach(row=>{
+            const amount = parseFloat(row.querySelector('[name="pay_amount[]"]').value||0);
+            if(!(amount > 0)) return;
+            received += amount;
+            if(row.querySelector('[name="pay_method[]"]').value === 'cash'){ cash += amount; }
+            else { remaining -= amount; }
+        });
+        const change = Math.max(0, cash - Math.max(0, remaining));
+        remaining = Math.max(0, remaining - cash);
+        document.getElementById('p-received').textContent = received.toFixed(2);
+        document.getElementById('p-due').textContent = remaining.toFixed(2);
+        document.getElementById('p-change').innerHTML = `<strong>${change.toFixed(2)}</strong>`;
     }
-    
-    function sync(){
-        let subtotal=0, tax=0, total=0;
-        const rows = [...document.querySelectorAll('#items-body tr')];
-        rows.forEach(tr=>{
-            const [sku, desc, qty, price, taxrate] = [...tr.querySelectorAll('input')].map(i=>i.value);
-            const q = parseFloat(qty||0), p = parseFloat(price||0), t = parseFloat(taxrate||0);
-            const line = Math.max(0, (q*p) * (1+t));
-            tr.querySelector('[data-importe]').textContent = line.toFixed(2);
-            subtotal += q*p;
-            tax += (q*p)*t;
-            total += line;
+
+    function addPaymentRow(){
+        const body = document.getElementById('payments-body');
+        const row = body.querySelector('[data-payment]').cloneNode(true);
+        row.querySelectorAll('input').forEach(i=>{ i.value = ''; });
+        body.appendChild(row);
+    }
+
+    const saleForm = document.getElementById('sale-form');
+    if(saleForm){  // sales.js se carga en todas las páginas
+        document.getElementById('add-payment').addEventListener('click', addPaymentRow);
+        document.getElementById('payments-body').addEventListener('click', e=>{
+            const btn = e.target.closest('[data-remove-payment]');
+            const rows = document.querySelectorAll('#payments-body [data-payment]');
+            if(!btn) return;
+            if(rows.length > 1){ btn.closest('[data-payment]').remove(); }
+            else { rows[0].querySelectorAll('input').forEach(i=>{ i.value = ''; }); }
+            syncPayments(cartTotal);
+        });
+        const onEdit = ()=>syncPayments(cartTotal);
+        saleForm.addEventListener('input', onEdit);
+        saleForm.addEventListener('change', onEdit);
+        document.body.addEventListener('cart-priced', e=>{
+            cartTotal = e.detail.total;
+            syncPayments(cartTotal);
+        });
+        syncPayments(cartTotal);
+    }
+
+    // Búsqueda de productos en el catálogo local (catalog.js): sin ida y vuelta
+    // al servidor; si todavía no hay catálogo guardado se deja pasar el request de htmx
+    function renderProducts(products){
+        const ul = document.createElement('ul');
+        ul.style.cssText = 'list-style:none; padding:0; margin:0;';
+        products.forEach(p=>{
+            const li = document.createElement('li');
+            li.dataset.sku = p.sku;
+            li.dataset.payload = JSON.stringify({sku: p.sku, description: p.description, price: p.price, tax_rate: p.tax_rate});
+            li.style.cssText = 'padding:8px; border-bottom:1px solid #eee; cursor:pointer';
+            const title = document.createElement('div');
+            const sku = document.createElement('strong');
+            sku.textContent = p.sku;
+            title.append(sku, ` — ${p.description}`);
+            const small = document.createElement('small');
+            small.textContent = `$${Number(p.price).toFixed(2)} · IVA ${Math.round(p.tax_rate*100)}%`;
+            li.append(title, small);
+            ul.appendChild(li);
         });
-        document.getElementById('t-subtotal').textContent = subtotal.toFixed(2);
-        document.getElementById('t-tax').textContent = tax.toFixed(2);
-        document.getElementById('t-total').textContent = total.toFixed(2);
+        if(!products.length){
+            const li = document.createElement('li');
+            li.style.cssText = 'padding:8px; color:#666;';
+            li.textContent = 'Sin resultados…';
+            ul.appendChild(li);
+        }
+        document.getElementById('search-results').replaceChildren(ul);
+    }
 
-        // empaquetar arrays para POST
-        const hidden = document.getElementById('hidden-arrays');
-        hidden.innerHTML = '';
-        rows.forEach(tr=>{
-            const [sku, desc, qty, price, taxrate] = [...tr.querySelectorAll('input')].map(i=>i.value);
-            ["sku","desc","qty","price","tax"].forEach((k,idx)=>{
-                const v = [sku,desc,qty,price,taxrate][idx];
-                const input = document.createElement('input');
-                input.type = 'hidden';
-                input.name = k + '[]';
-                input.value = v;
-                hidden.appendChild(input);
-            });
+    const productSearch = document.getElementById('product-search');
+    if(productSearch && window.posCatalog){
+        posCatalog.init();
+        productSearch.addEventListener('htmx:beforeRequest', e=>{
+            if(!posCatalog.isReady()) return;
+            e.preventDefault();
+            renderProducts(posCatalog.search(productSearch.value));
         });
     }
 
@@ -104,6 +131,8 @@ document.addEventListener('DOMContentLoaded', function() {
     document.addEventListener('click', e=>{
         const li = e.target.closest('[data-sku]');
         if(li){ addRowFromProduct(JSON.parse(li.dataset.payload)); }
+        const customer = e.target.closest('[data-customer-id]');
+        if(customer){ updateCustomerData(customer); }
     });
 
     // Inicializar todo
@@ -0,0 +1,69 @@
+# tests/test_spooler.py
+"""
+Spooler contra la impresora falsa (printing/fake_printer.py): reintentos con
+backoff y reconexión sin imprimir un ticket dos veces.
+"""
+import socket
+import time
+import pytest
+from printing.fake_printer import FakePrinter, CUT
+from printing.spooler import PrintSpooler, parse_printers
+
+
+@pytest.fixture
+def printer():
+    fp = FakePrinter(drop=1).start()  # la primera conexión se cierra sin leer
+    yield fp
+    fp.stop()
+
+
+@pytest.fixture
+def spooler(printer):
+    sp = PrintSpooler(parse_printers(f"caja=tcp://127.0.0.1:{printer.port}"),
+                      max_retries=3, backoff=0.01, timeout=2)
+    yield sp
+    sp.stop()
+
+
+def _ticket(i: int) -> bytes:
+    return f"ticket {i}\n".encode() + CUT
+
+
+def _wait_done(sp: PrintSpooler, ids: list[str], timeout: float = 5.0) -> list[dict]:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        jobs = [sp.job(j) for j in ids]
+        if all(j["status"] in ("done", "failed") for j in jobs):
+            return jobs
+        time.sleep(0.01)
+    return [sp.job(j) for j in ids]
+
+
+def test_reintenta_tras_conexion_cortada(printer, spooler):
+    ids = [spooler.submit(_ticket(i)) for i in range(5)]
+    jobs = _wait_done(spooler, ids)
+
+    assert [j["status"] for j in jobs] == ["done"] * 5
+    assert jobs[0]["attempts"] == 2  # el primer intento cae en la conexión tirada
+    assert all(j["attempts"] == 1 for j in jobs[1:])  # después reutiliza la conexión
+    assert printer.wait_tickets(5) == [_ticket(i) for i in range(5)]
+    assert printer.connections == 2
+    assert spooler.status()["printers"]["caja"]["online"] is True
+
+
+def test_reconecta_si_la_impresora_cierra(printer, spooler):
+    first = [spooler.submit(_ticket(i)) for i in range(3)]
+    _wait_done(spooler, first)
+    printer.wait_tickets(3)
+
+    # la impresora corta las conexiones ociosas (apagada / reinicio)
+    with printer.lock:
+        for s in list(printer.active):
+            s.shutdown(socket.SHUT_RDWR)
+    later = [spooler.submit(_ticket(i)) for i in range(3, 6)]
+    jobs = _wait_done(spooler, later)
+
+    assert [j["status"] for j in jobs] == ["done"] * 3
+    tickets = printer.wait_tickets(6)
+    assert tickets == [_ticket(i) for i in range(6)]  # cada uno exactamente una vez
+    assert printer.connections == 3